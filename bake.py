@@ -2,32 +2,373 @@ import bpy
 import numpy as np
 import json
 import os
-import subprocess
-import tifffile as tiff
+import sys
+import time
+import shutil
+import argparse
 from .main import get_selected_zone
-from .xml import create_xml_file
-from .utils import setup_bake_settings , calculate_sphere_counts
+from .core.xml import create_xml_file
+from .utils import setup_bake_settings , update_bake_progress, ensure_addon_enabled
+from .core.grid import calculate_sphere_counts
+from .core.hemisphere import HemisphereReducer
+from .core.volume import create_amv_volumes, release_volume, has_nan
+from .core.dds import write_r11g11b10_volume_dds
+from .core.encode import EncodeError, run_encode_jobs, resolve_worker_count
+from .core.shards import ShardError, split_slabs, shard_output_path, save_shard, run_shards
+from .core.checkpoint import SliceCheckpoint, bake_settings_hash, missing_runs, zone_checkpoint
+from .core.bake_cache import BakeCache, hash_parts
+from .scene_hash import scene_bake_hash, scene_object_records, world_hash
+from .core.incremental import changed_object_bounds, affected_probe_mask
+from .cells import CELL_EMPTY, build_scene_bvh, classify_cells
+from .core.dilate import dilate_nearest
+from .raycast import IrradianceEstimator
+from .core.irradiance import engine_error_stats
+from .core.probe_locations import get_probe_locations, probe_locations_digest
+from .core.zone_index import scene_zone_index
 
+SPHERE_SEGMENTS = 32
+SPHERE_RING_COUNT = 16
 
-def process_colors_3d(colors_3d, intuuid, index, new_folder_path, texconv_path):
-    images = []
-    if isinstance(colors_3d, list):
-        for two_d_array in colors_3d:
-            image_data = np.array(two_d_array, dtype=np.float32)
-            images.append(image_data)
-            
-        output_tiff_path = os.path.join(new_folder_path, f"{intuuid}_{index}.tiff")
-        tiff.imwrite(output_tiff_path, np.array(images, dtype=np.float32))
 
-        subprocess.run([
-            texconv_path,
-            '-f', 'R11G11B10_FLOAT',
-            '-y',
-            '-m', '1',
-            '-o', new_folder_path,
-            output_tiff_path
-        ])
-        os.remove(output_tiff_path)
+def volume_dds_path(new_folder_path, intuuid, index):
+    return os.path.join(new_folder_path, f"{intuuid}_{index}.dds")
+
+
+def get_probe_centers(zone, num_spheres, probe_locations):
+    # probe_locations: the zone's saved (nz, ny, nx, 3) locations, or None for the regular grid.
+    num_x_spheres, num_y_spheres, num_z_spheres = num_spheres
+    if probe_locations is not None:
+        return np.array(probe_locations, dtype=np.float64).reshape(num_z_spheres, num_y_spheres, num_x_spheres, 3)
+
+    centers = np.empty((num_z_spheres, num_y_spheres, num_x_spheres, 3), dtype=np.float64)
+    centers[..., 0] = zone.bb_min[0] + np.arange(num_x_spheres)[None, None, :] * zone.interval + zone.offset[0]
+    centers[..., 1] = zone.bb_min[1] + np.arange(num_y_spheres)[None, :, None] * zone.interval + zone.offset[1]
+    centers[..., 2] = zone.bb_min[2] + np.arange(num_z_spheres)[:, None, None] * zone.interval + zone.offset[2]
+    return centers
+
+
+def read_mesh_co(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co
+
+
+def create_batched_probes_mesh(name, template_mesh, centers):
+    num_verts = len(template_mesh.vertices)
+    num_loops = len(template_mesh.loops)
+    num_polygons = len(template_mesh.polygons)
+    count = len(centers)
+
+    co = read_mesh_co(template_mesh)
+    loop_vertex_index = np.empty(num_loops, dtype=np.int32)
+    template_mesh.loops.foreach_get("vertex_index", loop_vertex_index)
+    loop_start = np.empty(num_polygons, dtype=np.int32)
+    template_mesh.polygons.foreach_get("loop_start", loop_start)
+    use_smooth = np.empty(num_polygons, dtype=bool)
+    template_mesh.polygons.foreach_get("use_smooth", use_smooth)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(count * num_verts)
+    mesh.loops.add(count * num_loops)
+    mesh.polygons.add(count * num_polygons)
+
+    verts = co.reshape(1, num_verts, 3) + np.asarray(centers, dtype=np.float32).reshape(count, 1, 3)
+    mesh.vertices.foreach_set("co", verts.ravel())
+    vertex_offsets = np.arange(count, dtype=np.int32)[:, None] * num_verts
+    mesh.loops.foreach_set("vertex_index", (loop_vertex_index[None, :] + vertex_offsets).ravel())
+    loop_offsets = np.arange(count, dtype=np.int32)[:, None] * num_loops
+    mesh.polygons.foreach_set("loop_start", (loop_start[None, :] + loop_offsets).ravel())
+    mesh.polygons.foreach_set("use_smooth", np.tile(use_smooth, count))
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def bake_probes_batched(context, template_mesh, centers, reducer, colors):
+    # All probes of the batch are baked in one Cycles session, results are split back
+    # per probe by vertex-index ranges (every probe owns reducer.num_verts vertices).
+    mesh = create_batched_probes_mesh("AMV_Bake_Batch", template_mesh, centers)
+    batch_obj = bpy.data.objects.new("AMV_Bake_Batch", mesh)
+    # The spheres must not shadow or light each other; a single probe sphere is convex and never
+    # sees itself, so hiding the batch from secondary rays keeps the per-probe result.
+    batch_obj.visible_diffuse = False
+    batch_obj.visible_glossy = False
+    batch_obj.visible_shadow = False
+    batch_obj.visible_transmission = False
+    context.scene.collection.objects.link(batch_obj)
+
+    for obj in context.selected_objects:
+        obj.select_set(False)
+    batch_obj.select_set(True)
+    context.view_layer.objects.active = batch_obj
+
+    bpy.ops.geometry.color_attribute_add()
+    bpy.ops.object.bake(type='DIFFUSE')
+
+    colors = colors[:len(centers) * reducer.num_verts * 4]
+    mesh.color_attributes.active.data.foreach_get("color", colors)
+    results = reducer.reduce(colors)
+
+    bpy.data.objects.remove(batch_obj, do_unlink=True)
+    bpy.data.meshes.remove(mesh)
+    return results
+
+
+def create_template_sphere(sphere_radius):
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=SPHERE_SEGMENTS, ring_count=SPHERE_RING_COUNT, radius=sphere_radius)
+    sphere_obj = bpy.context.object
+    sphere_obj.select_set(True)
+    bpy.context.view_layer.objects.active = sphere_obj
+    return sphere_obj
+
+
+def zone_bake_settings(scene, zone, batched):
+    # Everything besides the scene geometry that changes the baked colors; checkpoints are only
+    # reused when these match.
+    return {
+        "bb_min": list(zone.bb_min),
+        "bb_max": list(zone.bb_max),
+        "interval": zone.interval,
+        "offset": list(zone.offset),
+        "sphere_radius": zone.sphere_radius,
+        "probes_location_3d": probe_locations_digest(zone),
+        "bounces": scene.bounces,
+        "light_strength": scene.light_strength,
+        "batch_slices": scene.bake_batch_slices if batched else 0,
+        "adaptive_probes": scene.adaptive_probes,
+        "bake_engine": scene.bake_engine,
+        "raycast_samples": scene.raycast_samples if scene.bake_engine == 'RAYCAST' else 0,
+    }
+
+
+def create_estimator(context, sphere_obj):
+    # The ray-cast engine for this bake, or None when it bakes with Cycles. The template sphere
+    # only lends its vertices for the hemispheres and is left out of the scene.
+    scene = context.scene
+    if scene.bake_engine != 'RAYCAST':
+        return None
+    co = read_mesh_co(sphere_obj.data)
+    return IrradianceEstimator.from_scene(context, co, scene.raycast_samples, scene.bounces, exclude={sphere_obj.name})
+
+
+def bake_probe_batch(context, sphere_obj, centers, reducer, colors, estimator):
+    if estimator is not None:
+        return estimator.estimate(centers)
+    return bake_probes_batched(context, sphere_obj.data, centers, reducer, colors)
+
+
+def valid_probe_mask(context, centers):
+    # Probes in empty interior cells; the others (inside walls, outside the shell) are not baked
+    # and get filled by dilate_nearest instead.
+    cells = classify_cells(build_scene_bvh(context), centers)
+    valid = cells == CELL_EMPTY
+    print(f"{np.count_nonzero(valid)}/{valid.size} probes in empty interior cells.")
+    return valid
+
+
+def restore_cached_bake(entry_path, dds_paths):
+    for index, dds_path in enumerate(dds_paths):
+        shutil.copyfile(os.path.join(entry_path, f"volume_{index}.dds"), dds_path)
+
+
+def store_cached_bake(cache, key, volumes, dds_paths, metadata):
+    # The raw color volumes are kept next to the encoded DDS files for incremental re-bakes.
+    try:
+        with cache.writer(key, metadata) as entry_path:
+            for index, (volume, dds_path) in enumerate(zip(volumes, dds_paths)):
+                np.save(os.path.join(entry_path, f"volume_{index}.npy"), volume)
+                shutil.copyfile(dds_path, os.path.join(entry_path, f"volume_{index}.dds"))
+    except OSError as error:
+        print(f"Could not store the bake in the bake cache: {error}")
+
+
+def bake_probe_list(context, sphere_obj, centers, batched, batch_size, estimator=None):
+    # centers: (P, 3) probes in any order, e.g. the ones an incremental bake has to redo.
+    # Returns their (P, 6) hemisphere averages. With an estimator the probes are ray-cast
+    # instead of baked in Cycles.
+    reducer = HemisphereReducer(read_mesh_co(sphere_obj.data))
+    results = np.empty((len(centers), 6), dtype=np.float32)
+
+    if batched or estimator is not None:
+        sphere_obj.hide_render = True
+        colors = reducer.color_buffer(batch_size) if estimator is None else None
+        for i in range(0, len(centers), batch_size):
+            results[i:i + batch_size] = bake_probe_batch(context, sphere_obj, centers[i:i + batch_size], reducer, colors, estimator)
+            update_bake_progress(context.scene, min(i + batch_size, len(centers)), len(centers))
+    else:
+        colors = reducer.color_buffer()
+        for i, center in enumerate(centers):
+            sphere_obj.location = tuple(center)
+
+            bpy.ops.geometry.color_attribute_add()
+
+            bpy.ops.object.bake(type='DIFFUSE')
+
+            sphere_obj.data.color_attributes.active.data.foreach_get("color", colors)
+            reducer.reduce(colors, out=results[i:i + 1])
+
+            bpy.ops.geometry.color_attribute_remove()
+
+            update_bake_progress(context.scene, i + 1, len(centers))
+    return results
+
+
+def bake_slices(context, sphere_obj, centers, batched, batch_slices, on_slab, first_slice=0, valid=None, estimator=None):
+    # centers: (nz, ny, nx, 3). on_slab(z, results) receives the (slices, ny, nx, 6) hemisphere
+    # averages of the z-slices starting at z, in order; z counts from first_slice. Probes where
+    # the (nz, ny, nx) valid mask is False are skipped and come back as NaN. With an estimator
+    # the probes are ray-cast instead of baked in Cycles.
+    num_z_spheres, num_y_spheres, num_x_spheres = centers.shape[:3]
+    total_spheres = num_z_spheres * num_y_spheres * num_x_spheres
+    current = 0
+    reducer = HemisphereReducer(read_mesh_co(sphere_obj.data))
+
+    if batched or estimator is not None:
+        # The template sphere only provides topology, it must not occlude the batch.
+        sphere_obj.hide_render = True
+        colors = reducer.color_buffer(batch_slices * num_y_spheres * num_x_spheres) if estimator is None else None
+
+        for i in range(0, num_z_spheres, batch_slices):
+            slab = centers[i:i + batch_slices]
+            if valid is None:
+                results = bake_probe_batch(context, sphere_obj, slab.reshape(-1, 3), reducer, colors, estimator)
+                results = results.reshape(len(slab), num_y_spheres, num_x_spheres, 6)
+            else:
+                slab_valid = valid[i:i + batch_slices]
+                results = np.full((len(slab), num_y_spheres, num_x_spheres, 6), np.nan, dtype=np.float32)
+                if slab_valid.any():
+                    results[slab_valid] = bake_probe_batch(context, sphere_obj, slab[slab_valid], reducer, colors, estimator)
+            on_slab(first_slice + i, results)
+
+            current += len(slab) * num_y_spheres * num_x_spheres
+            update_bake_progress(context.scene, current, total_spheres)
+    else:
+        colors = reducer.color_buffer()
+        results = np.empty((1, num_y_spheres, num_x_spheres, 6), dtype=np.float32)
+        for i in range(num_z_spheres):
+            for j in range(num_y_spheres):
+                for k in range(num_x_spheres):
+                    if valid is not None and not valid[i, j, k]:
+                        results[0, j, k] = np.nan
+                        continue
+
+                    sphere_obj.location = tuple(centers[i, j, k])
+
+                    bpy.ops.geometry.color_attribute_add()
+
+                    bpy.ops.object.bake(type='DIFFUSE')
+
+                    sphere_obj.data.color_attributes.active.data.foreach_get("color", colors)
+                    reducer.reduce(colors, out=results[0, j, k:k + 1])
+                    current += 1
+
+                    bpy.ops.geometry.color_attribute_remove()
+
+                update_bake_progress(context.scene, current, total_spheres)
+            on_slab(first_slice + i, results)
+
+
+def bake_sharded(context, zone_index, num_z_spheres, volumes, folder_path, checkpoint, adaptive):
+    # Splits the z-slices over background Blender processes baking a saved copy of this file,
+    # then merges their results into the volumes. With adaptive the workers skip probes outside
+    # empty interior cells. Workers checkpoint every slice, so a retried
+    # shard or a restarted bake only bakes what is missing; fully checkpointed slabs are skipped.
+    scene = context.scene
+    workers = resolve_worker_count(scene.bake_workers, num_z_spheres)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    completed = {z for z in checkpoint.completed() if z < num_z_spheres}
+    for z in completed:
+        results = checkpoint.load(z)
+        volumes[0][z] = results[..., :3]
+        volumes[1][z] = results[..., 3:]
+    slabs = [
+        (z_start, z_stop) for z_start, z_stop in split_slabs(num_z_spheres, workers)
+        if not completed.issuperset(range(z_start, z_stop))
+    ]
+    if not slabs:
+        return
+
+    shard_folder = os.path.join(folder_path, "shards")
+    os.makedirs(shard_folder, exist_ok=True)
+    blend_path = os.path.join(shard_folder, "bake.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+
+    worker_expression = f"import sys, {__package__}.bake as bake; sys.exit(bake.run_bake_shard())"
+    shards = []
+    for index, (z_start, z_stop) in enumerate(slabs):
+        output_path = shard_output_path(shard_folder, index)
+        argv = [
+            bpy.app.binary_path, "-b", blend_path, "--threads", str(threads),
+            "--python-exit-code", "1", "--python-expr", worker_expression, "--",
+            "--zone-index", str(zone_index), "--z-start", str(z_start), "--z-stop", str(z_stop), "--output", output_path,
+            "--checkpoint", checkpoint.path,
+        ]
+        if adaptive:
+            argv.append("--adaptive")
+        shards.append((argv, output_path))
+
+    slice_size = volumes[0][0, ..., 0].size
+    done = set(completed)
+
+    def merge_shard(index):
+        z_start, z_stop = slabs[index]
+        results = np.load(shard_output_path(shard_folder, index))
+        volumes[0][z_start:z_stop] = results[..., :3]
+        volumes[1][z_start:z_stop] = results[..., 3:]
+        done.update(range(z_start, z_stop))
+        update_bake_progress(scene, len(done) * slice_size, num_z_spheres * slice_size)
+
+    run_shards(shards, workers, scene.bake_shard_retries, merge_shard)
+    shutil.rmtree(shard_folder)
+
+
+def parse_shard_args(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="amv_tools.bake", description="Bake one z-slab of an AMV zone.")
+    parser.add_argument("--zone-index", type=int, required=True)
+    parser.add_argument("--z-start", type=int, required=True)
+    parser.add_argument("--z-stop", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--adaptive", action="store_true", help="skip probes outside empty interior cells")
+    return parser.parse_args(argv)
+
+
+def run_bake_shard(argv=None):
+    # Entry point of the background workers started by bake_sharded.
+    args = parse_shard_args(argv)
+    ensure_addon_enabled()
+    context = bpy.context
+    context.scene.zone_index = args.zone_index
+    zone = get_selected_zone(context)
+
+    setup_bake_settings()
+    num_spheres = calculate_sphere_counts(zone.interval, zone.bb_min, zone.bb_max)
+    centers = get_probe_centers(zone, num_spheres, get_probe_locations(zone))[args.z_start:args.z_stop]
+    results = np.empty(centers.shape[:3] + (6,), dtype=np.float32)
+    checkpoint = SliceCheckpoint(args.checkpoint) if args.checkpoint else None
+    completed = set()
+    if checkpoint is not None:
+        completed = {z - args.z_start for z in checkpoint.completed() if args.z_start <= z < args.z_stop}
+    for i in completed:
+        results[i] = checkpoint.load(args.z_start + i)
+
+    def store(i, slab):
+        results[i:i + len(slab)] = slab
+        if checkpoint is not None:
+            checkpoint.save_slab(args.z_start + i, slab)
+
+    valid = valid_probe_mask(context, centers) if args.adaptive else None
+
+    sphere_obj = create_template_sphere(zone.sphere_radius)
+    estimator = create_estimator(context, sphere_obj)
+    for start, stop in missing_runs(completed, len(centers)):
+        slab_valid = valid[start:stop] if valid is not None else None
+        bake_slices(context, sphere_obj, centers[start:stop], True, context.scene.bake_batch_slices, store, start, slab_valid, estimator)
+    bpy.data.objects.remove(sphere_obj, do_unlink=True)
+
+    save_shard(args.output, results)
+    return 0
 
 
 class AMV_OT_BakeAMVToJSON(bpy.types.Operator):
@@ -52,119 +393,16 @@ class AMV_OT_BakeAMVToJSON(bpy.types.Operator):
 
         zone = get_selected_zone(context) 
 
+        overlapping = set(scene_zone_index(context.scene).overlapping(zone.id))
+        if overlapping:
+            names = ", ".join(other.name for other in context.scene.zones if other.id in overlapping)
+            print(f"Warning: {zone.name} overlaps {names}.")
+            self.report({'WARNING'}, f"{zone.name} overlaps {names}")
+
         interval, sphere_radius, offset, force_color = zone.interval , zone.sphere_radius , zone.offset, zone.force_color
 
         num_x_spheres, num_y_spheres, num_z_spheres = calculate_sphere_counts(interval, zone.bb_min, zone.bb_max)
 
-        total_spheres = num_x_spheres * num_y_spheres * num_z_spheres
-        
-        colors_3d_0 = []
-        colors_3d_1 = []
-        current = 0
-
-        bpy.ops.mesh.primitive_uv_sphere_add(segments=32, ring_count=16, radius=sphere_radius)
-        sphere_obj = bpy.context.object
-        sphere_obj.select_set(True)
-        bpy.context.view_layer.objects.active = sphere_obj
-
-        probes_location_3d = json.loads(zone.probes_location_3d)
-        should_use_saved_data = len(probes_location_3d) > 0
-
-        for i in range(num_z_spheres):
-            colors_2d_0 = []
-            colors_2d_1 = []
-            for j in range(num_y_spheres):
-                row_colors_0 = []
-                row_colors_1 = []
-                for k in range(num_x_spheres):
-                    if should_use_saved_data:
-                        x, y, z = probes_location_3d[i][j][k]
-                        sphere_obj.location = (x, y, z)
-                    else:
-                        x = zone.bb_min[0] + k * interval + offset[0]
-                        y = zone.bb_min[1] + j * interval + offset[1]
-                        z = zone.bb_min[2] + i * interval + offset[2]
-                        sphere_obj.location = (x, y, z)
-                    if force_color > 0:
-                        output_color_0 = [force_color,force_color,force_color]
-                        output_color_1 = [force_color,force_color,force_color] 
-                        
-                        row_colors_0.append(output_color_0)
-                        row_colors_1.append(output_color_1)   
-
-                    else:    
-                        bpy.ops.geometry.color_attribute_add()
-                                
-                        bpy.ops.object.bake(type='DIFFUSE')
-                                    
-                        vertices = sphere_obj.data.vertices
-                        vertex_colors = sphere_obj.data.color_attributes.active.data
-                                
-                        median_x = sum([v.co.x for v in vertices]) / len(vertices)
-                        median_y = sum([v.co.y for v in vertices]) / len(vertices)
-                        median_z = sum([v.co.z for v in vertices]) / len(vertices)
-                        
-                        color_array = [[],[],[],[],[],[]]
-                        
-                        for v in vertices:
-
-                            if v.co.x >= median_x:
-                                color_array[0].append(vertex_colors[v.index].color[:])
-                            else:
-                                color_array[1].append(vertex_colors[v.index].color[:])   
-                        
-                        for v in vertices:
-                            if v.co.y >= median_y:
-                                color_array[2].append(vertex_colors[v.index].color[:])
-                            else:
-                                color_array[3].append(vertex_colors[v.index].color[:])   
-                        
-                        for v in vertices:
-                            if v.co.z >= median_z:
-                                color_array[4].append(vertex_colors[v.index].color[:])
-                            else:
-                                color_array[5].append(vertex_colors[v.index].color[:])
-                                
-                    
-                        r_0 =  np.mean(np.array(color_array[0]), axis=0)
-                        g_0 =  np.mean(np.array(color_array[1]), axis=0)
-                        b_0 =  np.mean(np.array(color_array[2]), axis=0)
-                        
-                        r_1 =  np.mean(np.array(color_array[3]), axis=0)
-                        g_1 =  np.mean(np.array(color_array[4]), axis=0)
-                        b_1 =  np.mean(np.array(color_array[5]), axis=0)
-                    
-                        r_0 =  np.mean(r_0[:3])
-                        g_0 =  np.mean(g_0[:3])
-                        b_0 =  np.mean(b_0[:3])
-                        
-                        r_1 =  np.mean(r_1[:3])
-                        g_1 =  np.mean(g_1[:3])
-                        b_1 =  np.mean(b_1[:3])
-    
-                        current += 1
-                        output_color_0 = [r_0,g_0,b_0]
-                        output_color_1 = [r_1,g_1,b_1]
-                                
-                        bpy.ops.geometry.color_attribute_remove() 
-                        
-                        row_colors_0.append(output_color_0)
-                        row_colors_1.append(output_color_1)
-                    
-                colors_2d_0.append(row_colors_0)
-                colors_2d_1.append(row_colors_1)
-                
-                bpy.context.scene.proggress = f"{total_spheres}/{current}"
-                print(f"{current}/{total_spheres} spheres created", end='\r')
-                bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
-
-            colors_3d_0.append(colors_2d_0)
-            colors_3d_1.append(colors_2d_1)
-
-        bpy.data.objects.remove(sphere_obj, do_unlink=True)
-
-        print("\nSpheres baking finished.")
-
         filepath_full = bpy.path.abspath(bpy.context.scene.output_directory)
         
         uuid = zone.uuid
@@ -175,21 +413,228 @@ class AMV_OT_BakeAMVToJSON(bpy.types.Operator):
             os.makedirs(new_folder_path)
          
         intuuid = str(int(uuid, 16))
-        addon_directory = os.path.dirname(__file__)
-        texconv_path = os.path.join(addon_directory, "[CONVERTER]", "texconv.exe")
-       
-        process_colors_3d(colors_3d_0, intuuid, 0, new_folder_path, texconv_path)
-        process_colors_3d(colors_3d_1, intuuid, 1, new_folder_path, texconv_path)
-        
+        dds_paths = [volume_dds_path(new_folder_path, intuuid, index) for index in range(2)]
         xml_filepath = os.path.join(new_folder_path, uuid + ".xml")
+        batched = context.scene.bake_mode != 'SINGLE'
+
+        # Scene and settings hash: the bake cache key, and it keeps checkpoints of an older scene
+        # from being resumed.
+        settings_hash = bake_settings_hash(zone_bake_settings(context.scene, zone, batched))
+        records = scene_object_records(context)
+        world_digest = world_hash(context.scene)
+        cache_key = hash_parts(settings_hash, scene_bake_hash(records, world_digest))
+        cache_metadata = {"settings_hash": settings_hash, "world_hash": world_digest, "objects": records}
+
+        cache = None
+        if context.scene.use_bake_cache and force_color == 0:
+            cache = BakeCache(os.path.join(filepath_full, "bake_cache"), context.scene.bake_cache_size * 1024 * 1024)
+            entry_path = cache.get(cache_key)
+            if entry_path is not None:
+                restore_cached_bake(entry_path, dds_paths)
+                print("Unchanged scene and settings, AMV volumes restored from the bake cache.")
+                create_xml_file(xml_filepath, zone)
+                return {'FINISHED'}
+
+        colors_3d_0, colors_3d_1 = create_amv_volumes((num_x_spheres, num_y_spheres, num_z_spheres), new_folder_path, intuuid)
+        try:
+            centers = get_probe_centers(zone, (num_x_spheres, num_y_spheres, num_z_spheres), get_probe_locations(zone))
+
+            checkpoint = zone_checkpoint(new_folder_path, cache_key)
+
+            valid = None
+            if context.scene.adaptive_probes and force_color == 0:
+                valid = valid_probe_mask(context, centers)
+                if not valid.any():
+                    # Nothing to dilate from, e.g. a shell whose normals face outwards.
+                    print("No probe is in an empty interior cell, baking every probe.")
+                    self.report({'WARNING'}, "No probe is in an empty interior cell, check the normals of the shell; baking every probe")
+                    valid = None
+
+            # Incremental bake: start from the latest cached bake with the same probes and world, and
+            # only redo the probes near meshes that were added, removed or changed since.
+            rebake_mask = None
+            if cache is not None and context.scene.incremental_bake:
+                previous = cache.latest(lambda info: info.get("settings_hash") == settings_hash and info.get("world_hash") == world_digest)
+                if previous is not None:
+                    previous_path, previous_info = previous
+                    boxes = changed_object_bounds(previous_info.get("objects", {}), records)
+                    if boxes is not None:
+                        rebake_mask = affected_probe_mask(centers, boxes, context.scene.incremental_radius)
+                        if valid is not None:
+                            rebake_mask &= valid
+            if not context.scene.resume_bake:
+                checkpoint.clear()
+
+            def store(i, results):
+                colors_3d_0[i:i + len(results)] = results[..., :3]
+                colors_3d_1[i:i + len(results)] = results[..., 3:]
+
+            def store_and_checkpoint(i, results):
+                store(i, results)
+                checkpoint.save_slab(i, results)
+
+            try:
+                if force_color > 0:
+                    colors_3d_0[...] = force_color
+                    colors_3d_1[...] = force_color
+
+                elif rebake_mask is not None:
+                    colors_3d_0[...] = np.load(os.path.join(previous_path, "volume_0.npy"))
+                    colors_3d_1[...] = np.load(os.path.join(previous_path, "volume_1.npy"))
+                    print(f"Incremental bake, {np.count_nonzero(rebake_mask)}/{rebake_mask.size} probes near changed objects.")
+                    if rebake_mask.any():
+                        sphere_obj = create_template_sphere(sphere_radius)
+                        estimator = create_estimator(context, sphere_obj)
+                        batch_size = context.scene.bake_batch_slices * num_y_spheres * num_x_spheres
+                        results = bake_probe_list(context, sphere_obj, centers[rebake_mask], batched, batch_size, estimator)
+                        bpy.data.objects.remove(sphere_obj, do_unlink=True)
+                        colors_3d_0[rebake_mask] = results[:, :3]
+                        colors_3d_1[rebake_mask] = results[:, 3:]
+
+                elif context.scene.bake_mode == 'SHARDED':
+                    bake_sharded(context, context.scene.zone_index, num_z_spheres, (colors_3d_0, colors_3d_1), new_folder_path, checkpoint, valid is not None)
+                else:
+                    completed = {z for z in checkpoint.completed() if z < num_z_spheres}
+                    if completed:
+                        print(f"Resuming bake, {len(completed)}/{num_z_spheres} z-slices restored from checkpoints.")
+                    for z in completed:
+                        store(z, checkpoint.load(z)[None])
+
+                    runs = missing_runs(completed, num_z_spheres)
+                    if runs:
+                        sphere_obj = create_template_sphere(sphere_radius)
+                        estimator = create_estimator(context, sphere_obj)
+                        for start, stop in runs:
+                            slab_valid = valid[start:stop] if valid is not None else None
+                            bake_slices(context, sphere_obj, centers[start:stop], batched, context.scene.bake_batch_slices, store_and_checkpoint, start, slab_valid, estimator)
+                        bpy.data.objects.remove(sphere_obj, do_unlink=True)
+            except ShardError as error:
+                self.report({'ERROR'}, str(error))
+                bpy.context.scene.proggress = "Bake AMV"
+                return {'CANCELLED'}
+
+            if valid is not None:
+                dilate_nearest(colors_3d_0, valid)
+                dilate_nearest(colors_3d_1, valid)
+
+            print("\nSpheres baking finished.")
+
+            if has_nan(colors_3d_0) or has_nan(colors_3d_1):
+                # Unbaked probes left over, e.g. from checkpoints of an older adaptive bake; never
+                # encoded or cached.
+                checkpoint.clear()
+                self.report({'ERROR'}, "The baked volumes contain probes without colors, bake again")
+                bpy.context.scene.proggress = "Bake AMV"
+                return {'CANCELLED'}
+
+            try:
+                run_encode_jobs([
+                    (write_r11g11b10_volume_dds, (dds_paths[0], colors_3d_0)),
+                    (write_r11g11b10_volume_dds, (dds_paths[1], colors_3d_1)),
+                ], context.scene.encode_workers)
+                if cache is not None:
+                    store_cached_bake(cache, cache_key, (colors_3d_0, colors_3d_1), dds_paths, cache_metadata)
+            except EncodeError as error:
+                self.report({'ERROR'}, str(error))
+                bpy.context.scene.proggress = "Bake AMV"
+                return {'CANCELLED'}
+        finally:
+            # Also when the bake or the encode raise, so memmapped volumes never outlive the bake.
+            release_volume(colors_3d_0)
+            release_volume(colors_3d_1)
+
+        # The volumes are on disk now; stale checkpoints would only be reused by mistake after the
+        # scene changes.
+        checkpoint.clear()
+
         create_xml_file(xml_filepath, zone)     
             
         bpy.context.scene.proggress = "Bake AMV"
         return {'FINISHED'}
     
 
+class AMV_OT_CompareBakeEngines(bpy.types.Operator):
+    bl_idname = "amv.compare_bake_engines"
+    bl_label = "Compare Bake Engines"
+
+    @classmethod
+    def poll(cls, context):
+        return AMV_OT_BakeAMVToJSON.poll(context)
+
+    def execute(self, context):
+        # Bakes a random sample of the zone's probes with both engines and reports how far the
+        # ray-cast estimate is from Cycles, and how long each took.
+        setup_bake_settings()
+        scene = context.scene
+        zone = get_selected_zone(context)
+
+        num_spheres = calculate_sphere_counts(zone.interval, zone.bb_min, zone.bb_max)
+        centers = get_probe_centers(zone, num_spheres, get_probe_locations(zone)).reshape(-1, 3)
+        rng = np.random.default_rng(0)
+        sample = centers[rng.choice(len(centers), min(scene.compare_probe_count, len(centers)), replace=False)]
+
+        sphere_obj = create_template_sphere(zone.sphere_radius)
+        start = time.perf_counter()
+        reference = bake_probe_list(context, sphere_obj, sample, True, len(sample))
+        cycles_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        estimator = IrradianceEstimator.from_scene(context, read_mesh_co(sphere_obj.data), scene.raycast_samples, scene.bounces, exclude={sphere_obj.name})
+        estimate = estimator.estimate(sample)
+        raycast_seconds = time.perf_counter() - start
+        bpy.data.objects.remove(sphere_obj, do_unlink=True)
+
+        stats = engine_error_stats(reference, estimate)
+        stats.update(cycles_seconds=cycles_seconds, raycast_seconds=raycast_seconds)
+        print(json.dumps(stats, indent=2))
+        self.report({'INFO'}, f"{stats['probes']} probes: mean error {stats['mean_abs_error']:.4f} (max {stats['max_abs_error']:.4f}, scale {stats['scale']:.3f}), Cycles {cycles_seconds:.1f}s, ray-cast {raycast_seconds:.1f}s")
+        scene.proggress = "Bake AMV"
+        return {'FINISHED'}
+
+
+class AMV_OT_CompareBakeModes(bpy.types.Operator):
+    bl_idname = "amv.compare_bake_modes"
+    bl_label = "Compare Bake Modes"
+
+    @classmethod
+    def poll(cls, context):
+        return AMV_OT_BakeAMVToJSON.poll(context)
+
+    def execute(self, context):
+        # Bakes a random sample of the zone's probes one at a time and in one batch, and reports
+        # how far the batched colors are from the per-probe ones.
+        setup_bake_settings()
+        scene = context.scene
+        zone = get_selected_zone(context)
+
+        num_spheres = calculate_sphere_counts(zone.interval, zone.bb_min, zone.bb_max)
+        centers = get_probe_centers(zone, num_spheres, get_probe_locations(zone)).reshape(-1, 3)
+        rng = np.random.default_rng(0)
+        sample = centers[rng.choice(len(centers), min(scene.compare_probe_count, len(centers)), replace=False)]
+
+        # Per probe first, the batched bake hides the template sphere.
+        sphere_obj = create_template_sphere(zone.sphere_radius)
+        start = time.perf_counter()
+        reference = bake_probe_list(context, sphere_obj, sample, False, len(sample))
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = bake_probe_list(context, sphere_obj, sample, True, len(sample))
+        batched_seconds = time.perf_counter() - start
+        bpy.data.objects.remove(sphere_obj, do_unlink=True)
+
+        stats = engine_error_stats(reference, batched)
+        stats.update(single_seconds=single_seconds, batched_seconds=batched_seconds)
+        print(json.dumps(stats, indent=2))
+        self.report({'INFO'}, f"{stats['probes']} probes: mean error {stats['mean_abs_error']:.4f} (max {stats['max_abs_error']:.4f}, scale {stats['scale']:.3f}), per probe {single_seconds:.1f}s, batched {batched_seconds:.1f}s")
+        scene.proggress = "Bake AMV"
+        return {'FINISHED'}
+
+
 classes = (
     AMV_OT_BakeAMVToJSON,
+    AMV_OT_CompareBakeEngines,
+    AMV_OT_CompareBakeModes,
 )
   
 
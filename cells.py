@@ -0,0 +1,87 @@
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+CELL_EMPTY = 0
+CELL_SOLID = 1
+CELL_EXTERIOR = 2
+
+# Axis and diagonal directions for the exterior test.
+RAY_DIRECTIONS = [
+    Vector(direction).normalized() for direction in (
+        (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1),
+        (1, 1, 1), (1, 1, -1), (1, -1, 1), (1, -1, -1), (-1, 1, 1), (-1, 1, -1), (-1, -1, 1), (-1, -1, -1),
+    )
+]
+EXTERIOR_FRACTION = 0.5
+
+
+def scene_mesh_polygons(context, exclude=()):
+    # World space vertices, polygons (vertex index lists) and per object (object, polygon material
+    # indices) of the evaluated meshes of every render visible object not named in exclude.
+    # Polygons are numbered in object order, so a BVH face index maps back to its material.
+    depsgraph = context.evaluated_depsgraph_get()
+    vertices = []
+    polygons = []
+    owners = []
+    offset = 0
+    for obj in context.scene.objects:
+        if obj.type != 'MESH' or obj.hide_render or obj.name in exclude:
+            continue
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", co)
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        vertices.append(co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3])
+
+        vertex_index = np.empty(len(mesh.loops), dtype=np.int64)
+        mesh.loops.foreach_get("vertex_index", vertex_index)
+        loop_start = np.empty(len(mesh.polygons), dtype=np.int64)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        polygons.extend(polygon.tolist() for polygon in np.split(vertex_index + offset, loop_start[1:]))
+        material_index = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", material_index)
+        owners.append((obj, material_index))
+
+        offset += len(mesh.vertices)
+        evaluated.to_mesh_clear()
+
+    if not vertices:
+        return None, polygons, owners
+    return np.concatenate(vertices), polygons, owners
+
+
+def build_scene_bvh(context):
+    # One world space BVH over the evaluated meshes of every render visible object.
+    vertices, polygons, _ = scene_mesh_polygons(context)
+    if vertices is None:
+        return None
+    return BVHTree.FromPolygons(vertices.tolist(), polygons)
+
+
+def classify_cell(bvh, center):
+    location, normal, _, _ = bvh.find_nearest(center)
+    if location is None:
+        return CELL_EXTERIOR
+    # Behind the closest surface: inside a wall, or outside an interior shell whose faces point
+    # into the rooms.
+    if (center - location).dot(normal) < 0:
+        return CELL_SOLID
+    escaped = sum(1 for direction in RAY_DIRECTIONS if bvh.ray_cast(center, direction)[0] is None)
+    if escaped > EXTERIOR_FRACTION * len(RAY_DIRECTIONS):
+        return CELL_EXTERIOR
+    return CELL_EMPTY
+
+
+def classify_cells(bvh, centers):
+    # centers: (..., 3). Returns a uint8 array of CELL_* values in the same layout.
+    centers = np.asarray(centers, dtype=np.float64)
+    cells = np.full(centers.shape[:-1], CELL_EXTERIOR, dtype=np.uint8)
+    if bvh is None:
+        return cells
+    flat = cells.reshape(-1)
+    for i, center in enumerate(centers.reshape(-1, 3)):
+        flat[i] = classify_cell(bvh, Vector(center))
+    return cells
@@ -0,0 +1,142 @@
+import bpy
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from .utils import ensure_addon_enabled
+
+# Headless batch baker, run inside Blender with the add-on installed:
+#
+#   blender -b --python-expr "import sys, AMV_TOOLS.cli as cli; sys.exit(cli.main())" -- manifest.json --report report.json
+#
+# Manifest:
+#   {
+#     "output_directory": "//bakes",              optional, default for every blend
+#     "settings": {"bounces": 1},                 optional scene properties, default for every blend
+#     "blends": [
+#       {"path": "interior.blend",                relative to the manifest
+#        "zones": ["Zone.0"],                     optional, every zone when missing
+#        "amv": true, "reflection": true,         optional, both baked by default
+#        "output_directory": "...", "settings": {...}}
+#     ]
+#   }
+
+
+def parse_args(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="amv_tools.cli", description="Bake AMV volumes and reflection probes for every zone of a manifest.")
+    parser.add_argument("manifest", help="JSON manifest of .blend files and zones")
+    parser.add_argument("--report", help="write the JSON results report to this file instead of stdout")
+    parser.add_argument("--skip-amv", action="store_true", help="do not bake AMV volumes")
+    parser.add_argument("--skip-reflection", action="store_true", help="do not bake reflection probes")
+    return parser.parse_args(argv)
+
+
+def load_manifest(path):
+    with open(path, "r") as file:
+        manifest = json.load(file)
+    base_path = os.path.dirname(os.path.abspath(path))
+    for blend in manifest.get("blends", []):
+        blend["path"] = os.path.join(base_path, blend["path"])
+    return manifest
+
+
+def apply_scene_settings(scene, settings):
+    for name, value in settings.items():
+        if not hasattr(scene, name):
+            raise ValueError(f"Unknown scene setting {name}")
+        setattr(scene, name, value)
+
+
+def run_operator(operator):
+    start = time.perf_counter()
+    result = {"status": "FAILED", "seconds": 0.0, "error": None}
+    try:
+        status = operator()
+        result["status"] = "FINISHED" if 'FINISHED' in status else "CANCELLED"
+    except Exception as error:
+        # Poll failures and errors raised inside execute both surface as exceptions.
+        result["error"] = str(error)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def bake_zone(scene, zone_index, bake_amv, bake_reflection):
+    scene.zone_index = zone_index
+    result = {}
+
+    if bake_amv:
+        if "Emission" not in bpy.data.worlds["World"].node_tree.nodes:
+            bpy.ops.amv.setup_light()
+        result["amv"] = run_operator(bpy.ops.amv.bake_amv_to_json)
+    if bake_reflection:
+        result["reflection"] = run_operator(bpy.ops.amv.bake_reflection_probes)
+    return result
+
+
+def bake_blend(blend, defaults, bake_amv, bake_reflection):
+    results = []
+    bpy.ops.wm.open_mainfile(filepath=blend["path"])
+    scene = bpy.context.scene
+
+    apply_scene_settings(scene, {**defaults.get("settings", {}), **blend.get("settings", {})})
+    output_directory = blend.get("output_directory", defaults.get("output_directory"))
+    if output_directory is not None:
+        scene.output_directory = output_directory
+
+    zone_names = [zone.name for zone in scene.zones]
+    for name in blend.get("zones", zone_names):
+        result = {"blend": blend["path"], "zone": name, "error": None}
+        if name not in zone_names:
+            result["error"] = "Zone not found"
+        else:
+            try:
+                result.update(bake_zone(
+                    scene, zone_names.index(name),
+                    bake_amv and blend.get("amv", True),
+                    bake_reflection and blend.get("reflection", True),
+                ))
+            except Exception:
+                result["error"] = traceback.format_exc()
+        results.append(result)
+    return results
+
+
+def zone_failed(result):
+    if result["error"] is not None:
+        return True
+    return any(result[bake]["status"] != "FINISHED" for bake in ("amv", "reflection") if bake in result)
+
+
+def main(argv=None):
+    # Returns the process exit code: 0 when every zone of every blend baked.
+    args = parse_args(argv)
+    ensure_addon_enabled()
+    manifest = load_manifest(args.manifest)
+
+    start = time.perf_counter()
+    results = []
+    for blend in manifest.get("blends", []):
+        try:
+            results.extend(bake_blend(blend, manifest, not args.skip_amv, not args.skip_reflection))
+        except Exception:
+            results.append({"blend": blend["path"], "zone": None, "error": traceback.format_exc()})
+
+    failed = sum(1 for result in results if zone_failed(result))
+    report = {
+        "manifest": os.path.abspath(args.manifest),
+        "seconds": time.perf_counter() - start,
+        "zones": len(results),
+        "failed": failed,
+        "results": results,
+    }
+
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 1 if failed else 0
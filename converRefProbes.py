@@ -1,41 +1,39 @@
 import os
 import numpy as np
-import tifffile as tiff
-import subprocess
 
-from .xml import create_xml_file_reflection_probes
+from .dependencies import require_module
+from .core.xml import create_xml_file_reflection_probes
+from .core.bcn import QUALITY_FAST, encode_bc3
+from .core.pyramid import box_pyramid
+from .core.postprocess import allocate_cube, load_cube, process_color_cube, process_normal_cube, process_depth_cube
+from .core.encode import run_encode_jobs
+from .core.dds import DXGI_FORMAT_BC3_UNORM, DXGI_FORMAT_BC3_UNORM_SRGB, DXGI_FORMAT_R16_UNORM, write_cubemap_dds
+
+ENCODE_FORMATS = {
+    "color": DXGI_FORMAT_BC3_UNORM_SRGB,
+    "normal": DXGI_FORMAT_BC3_UNORM,
+    "depth": DXGI_FORMAT_R16_UNORM,
+}
+CUBE_CHANNELS = {"color": 4, "normal": 4, "depth": 1}
+
+FACE_NAMES = ['x-', 'x+', 'y-', 'y+', 'z-', 'z+']
 
 def load_png_files(folder_path):
-    filenames = ['x-.tif', 'x+.tif', 'y-.tif', 'y+.tif', 'z-.tif', 'z+.tif']
+    filenames = [f"{name}.tif" for name in FACE_NAMES]
     files = [os.path.join(folder_path, filename) for filename in filenames]
     return files
 
 def png_to_array(png_file):
-    with tiff.TiffFile(png_file) as tif:
+    with require_module("tifffile").TiffFile(png_file) as tif:
         numpy_array = tif.asarray()
     return numpy_array
 
-def replace_white_with_alpha(array):
-
-    if array.shape[2] == 3:
-        alpha_channel = np.full((array.shape[0], array.shape[1], 1), 65535, dtype=array.dtype)
-        array = np.concatenate((array, alpha_channel), axis=2)
-
-    white_color = np.array([32767, 32767, 32767])
-    tolerance = 10
-
-    diff = np.abs(array[:, :, :3] - white_color)
-    mask = np.all(diff <= tolerance, axis=-1)
-    array[mask] = [0, 0, 0, 0]
-    return array
-
-def set_alpha_from_r(array, array_ao):
-    if array.shape[2] == 3:
-        alpha_channel = np.full((array.shape[0], array.shape[1], 1), 65535, dtype=array.dtype)
-        array = np.concatenate((array, alpha_channel), axis=2)
-    alpha_channel = array_ao[:, :, 0]
-    array[:, :, 3] = alpha_channel
-    return array
+def encode_face(face, dxgi_format, quality):
+    # face is a (H, W, C) level in uint16 units, float32 or the uint16 face itself; returns the
+    # encoded surface.
+    if dxgi_format == DXGI_FORMAT_R16_UNORM:
+        return np.rint(face[:, :, 0]).astype("<u2").tobytes()
+    return encode_bc3(np.multiply(face, 255.0 / 65535.0, dtype=np.float32), quality)
 
 
 def create_output_folder(start_path, uuid, size_name):
@@ -47,74 +45,47 @@ def create_output_folder(start_path, uuid, size_name):
     return texture_folder_path
 
 
+def load_ref_probe_faces(start_path):
+    # {type: {face name: (H, W, 3) uint16}} from the TIFFs of a previous bake.
+    faces = {}
+    for folder_name in ["color", "normal", "depth", "ao"]:
+        files = load_png_files(os.path.join(start_path, folder_name))
+        faces[folder_name] = {name: png_to_array(file) for name, file in zip(FACE_NAMES, files)}
+    return faces
 
-def convertRefProbes(start_path, uuid):
 
+def convert_ref_probe_faces(start_path, uuid, faces, quality=QUALITY_FAST, max_workers=0):
+    # faces: {type: {face name: (H, W, 3) uint16}} for "color", "normal", "depth" and "ao", straight
+    # from the renderer or from load_ref_probe_faces. The faces themselves are left untouched.
     sizes = {"_ul": (1024, 1024), "_hi": (512, 512), "_lo": (128, 128), "": (256, 256)}
+    height, width = faces["color"][FACE_NAMES[0]].shape[:2]
+    # One buffer for all three cubes: box_pyramid is done reading it before the next one is loaded.
+    buffer = allocate_cube(height, width)
 
     for folder_name in ["color", "normal", "depth"]:
-        folder_path = os.path.join(start_path, folder_name)
-        files = load_png_files(folder_path)
-        images = []
-
-        for file in files:
-            if folder_name == "color":
-                array = png_to_array(file)
-
-                black_color = np.array([0, 0, 0])
-                tolerance = 10
-                diff = np.abs(array[:, :, :3] - black_color)
-                mask = np.all(diff <= tolerance, axis=-1)
-                max_value = (int(np.iinfo(array.dtype).max/2))
-                array[mask] = [max_value, max_value, max_value]
-
-                # array = np.clip(array, 0, 255).astype(np.uint8)
-                array_ao = png_to_array(os.path.join(start_path, "ao", os.path.basename(file))) * 0.5
-
-                black_color = np.array([0, 0, 0])
-                tolerance = 10
-                diff = np.abs(array_ao[:, :, :3] - black_color)
-                mask = np.all(diff <= tolerance, axis=-1)
-                max_value = np.iinfo(array.dtype).max
-                array_ao[mask] = [max_value, max_value, max_value]
-
-                array = set_alpha_from_r(array, array_ao)
-            elif folder_name == "depth":
-                array = png_to_array(file)
-                array[array == max_value] = max_value - 10
-            elif folder_name == "normal":
-                array = png_to_array(file)
-                array = replace_white_with_alpha(array)
-            images.append(array)
+        cube = load_cube([faces[folder_name][name] for name in FACE_NAMES], buffer[..., :CUBE_CHANNELS[folder_name]])
+        if folder_name == "color":
+            process_color_cube(cube, [faces["ao"][name] for name in FACE_NAMES])
+        elif folder_name == "depth":
+            process_depth_cube(cube)
+        elif folder_name == "normal":
+            process_normal_cube(cube)
 
         index = 'd' if folder_name == "depth" else ('0' if folder_name == "color" else '1')
-        
-        output_tiff = os.path.join(start_path, f"{uuid}_{index}.tiff")
-
-        tiff.imwrite(output_tiff, [np.array(image) for image in images], dtype=np.uint16)
-
-        for size_name, size in sizes.items():
-
-            output_folder = create_output_folder(start_path, uuid, size_name)
-            addon_directory = os.path.dirname(__file__)
-            texconv_path = os.path.join(addon_directory, "[CONVERTER]", "texconv.exe")
-
-            args = [
-                texconv_path,
-                '-f', 'R16_UNORM' if folder_name == "depth" else ('BC3_UNORM_SRGB' if folder_name == "color" else 'BC3_UNORM'),
-                '-y', 
-                '-w', str(size[0]),
-                '-h', str(size[0]),
-                '-m', '1',
-                '-o', output_folder,
-            ]
-
-            
-            if folder_name == "color":
-                args.append('-srgb')
-            args.append(output_tiff)
-            subprocess.run(args)
-            xml_ytd_filename = os.path.join(start_path, "output", f"{uuid}{size_name}.ytd.xml")
-            create_xml_file_reflection_probes(xml_ytd_filename, uuid)
-        os.remove(output_tiff)
+        dxgi_format = ENCODE_FORMATS[folder_name]
+
+        for size, level in box_pyramid(cube, sizes.values()):
+            # Each level is encoded, one job per face, and written before the pyramid moves on, so
+            # only one level of one cube is held at a time.
+            encoded = run_encode_jobs([(encode_face, (face, dxgi_format, quality)) for face in level], max_workers)
+            for size_name in [name for name, value in sizes.items() if value == size]:
+                output_folder = create_output_folder(start_path, uuid, size_name)
+                write_cubemap_dds(os.path.join(output_folder, f"{uuid}_{index}.dds"), encoded, size[0], size[1], dxgi_format)
+
+                xml_ytd_filename = os.path.join(start_path, "output", f"{uuid}{size_name}.ytd.xml")
+                create_xml_file_reflection_probes(xml_ytd_filename, uuid)
+            del encoded
+
 
+def convertRefProbes(start_path, uuid, quality=QUALITY_FAST, max_workers=0):
+    convert_ref_probe_faces(start_path, uuid, load_ref_probe_faces(start_path), quality, max_workers)
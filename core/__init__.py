@@ -0,0 +1,3 @@
+# Blender independent part of the add-on: hashing, grid math, probe location storage, volume
+# buffers, post-processing, encoders and the XML emitters. Nothing in here imports bpy or
+# mathutils, so it runs under plain CPython; see benchmark.py.
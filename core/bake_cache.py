@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from contextlib import contextmanager
+
+ENTRY_INFO = "entry.json"
+
+
+def hash_parts(*parts):
+    # sha1 over str/bytes parts, length prefixed so the boundaries between parts matter.
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def directory_size(path):
+    size = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            size += os.path.getsize(os.path.join(folder, name))
+    return size
+
+
+class BakeCache:
+    # Content addressed store of bake results: one directory per key under root, holding whatever
+    # files the bake wrote plus entry.json with the size and last use time. Entries are evicted
+    # least recently used first once the total size exceeds max_bytes. Only depends on the file
+    # system, so it can be pointed at any temporary directory.
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def _read_info(self, path):
+        try:
+            with open(os.path.join(path, ENTRY_INFO), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_info(self, path, info):
+        with open(os.path.join(path, ENTRY_INFO), "w") as file:
+            json.dump(info, file)
+
+    def get(self, key):
+        # Entry directory of key, or None on a miss. A hit counts as a use for eviction.
+        path = self.entry_path(key)
+        info = self._read_info(path)
+        if info is None:
+            return None
+        info["last_used"] = time.time()
+        self._write_info(path, info)
+        return path
+
+    def latest(self, predicate):
+        # (entry directory, info) of the most recently used entry whose info matches, or None.
+        entries = [(key, info) for key, info in self.entries() if predicate(info)]
+        if not entries:
+            return None
+        key, info = max(entries, key=lambda entry: entry[1]["last_used"])
+        return self.get(key), info
+
+    @contextmanager
+    def writer(self, key, metadata=None):
+        # Yields a staging directory to write the entry into; it replaces any previous entry of key
+        # only once the block finishes without an exception. metadata (JSON serializable) is kept
+        # in the entry info.
+        os.makedirs(self.root, exist_ok=True)
+        staging_path = self.entry_path(f"{key}.partial")
+        shutil.rmtree(staging_path, ignore_errors=True)
+        os.makedirs(staging_path)
+        try:
+            yield staging_path
+        except BaseException:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+
+        info = dict(metadata or {})
+        info.update(size=directory_size(staging_path), last_used=time.time())
+        self._write_info(staging_path, info)
+        path = self.entry_path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging_path, path)
+        self.evict()
+
+    def entries(self):
+        # [(key, info)] of the complete entries.
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for key in os.listdir(self.root):
+            if key.endswith(".partial"):
+                continue
+            info = self._read_info(self.entry_path(key))
+            if info is not None:
+                entries.append((key, info))
+        return entries
+
+    def total_size(self):
+        return sum(info["size"] for _, info in self.entries())
+
+    def evict(self):
+        # Removes least recently used entries until the cache fits in max_bytes; returns their keys.
+        entries = sorted(self.entries(), key=lambda entry: entry[1]["last_used"])
+        total = sum(info["size"] for _, info in entries)
+        evicted = []
+        for key, info in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total -= info["size"]
+            evicted.append(key)
+        return evicted
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
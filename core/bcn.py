@@ -0,0 +1,216 @@
+import time
+import numpy as np
+
+# Encoder quality knob: FAST is a principal-axis range fit, HIGH refines the range fit endpoints
+# with least-squares passes over the chosen indices (cluster-fit style, vectorized over blocks).
+QUALITY_FAST = 'FAST'
+QUALITY_HIGH = 'HIGH'
+REFINE_ITERATIONS = {QUALITY_FAST: 0, QUALITY_HIGH: 2}
+
+BC1_BLOCK = np.dtype([("c0", "<u2"), ("c1", "<u2"), ("indices", "<u4")])
+BC3_BLOCK = np.dtype([("a0", "u1"), ("a1", "u1"), ("alpha_indices", "u1", (6,)), ("c0", "<u2"), ("c1", "<u2"), ("indices", "<u4")])
+
+# Fraction of color0 in each of the four BC1 palette entries (4-color mode).
+_BC1_WEIGHTS = np.array([1.0, 0.0, 2.0 / 3.0, 1.0 / 3.0], dtype=np.float32)
+_BC1_SWAPPED_INDEX = np.array([1, 0, 3, 2], dtype=np.uint32)
+
+
+def image_to_blocks(image):
+    # (H, W, C) -> (H/4 * W/4, 16, C), blocks in row-major order, pixels row-major in a block.
+    pad_h, pad_w = -image.shape[0] % 4, -image.shape[1] % 4
+    if pad_h or pad_w:
+        image = np.pad(image, ((0, pad_h), (0, pad_w), (0, 0)), mode="edge")
+    height, width, channels = image.shape
+    blocks = image.reshape(height // 4, 4, width // 4, 4, channels).swapaxes(1, 2)
+    return blocks.reshape(-1, 16, channels)
+
+
+def blocks_to_image(blocks, height, width):
+    channels = blocks.shape[-1]
+    padded_h, padded_w = height + (-height % 4), width + (-width % 4)
+    image = blocks.reshape(padded_h // 4, padded_w // 4, 4, 4, channels).swapaxes(1, 2)
+    return image.reshape(padded_h, padded_w, channels)[:height, :width]
+
+
+def quantize_565(rgb):
+    rgb = np.clip(np.rint(rgb * (np.array([31.0, 63.0, 31.0], dtype=np.float32) / 255.0)), 0, (31, 63, 31))
+    rgb = rgb.astype(np.uint16)
+    return (rgb[..., 0] << 11) | (rgb[..., 1] << 5) | rgb[..., 2]
+
+
+def expand_565(color):
+    r = (color >> 11) & 31
+    g = (color >> 5) & 63
+    b = color & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1).astype(np.float32)
+
+
+def _bc1_palette(c0, c1):
+    e0, e1 = expand_565(c0), expand_565(c1)
+    return _BC1_WEIGHTS[None, :, None] * e0[:, None, :] + (1.0 - _BC1_WEIGHTS)[None, :, None] * e1[:, None, :]
+
+
+def _bc1_fit_indices(blocks, c0, c1):
+    palette = _bc1_palette(c0, c1)
+    distances = np.square(blocks[:, :, None, :] - palette[:, None, :, :]).sum(axis=-1)
+    indices = distances.argmin(axis=-1)
+    error = np.take_along_axis(distances, indices[..., None], axis=-1)[..., 0].sum(axis=-1)
+    return indices.astype(np.uint32), error
+
+
+def _range_fit_endpoints(blocks):
+    mean = blocks.mean(axis=1, keepdims=True)
+    centered = blocks - mean
+    covariance = np.einsum("npi,npj->nij", centered, centered)
+
+    axis = blocks.max(axis=1) - blocks.min(axis=1)
+    for _ in range(8):
+        axis = np.einsum("nij,nj->ni", covariance, axis)
+        norm = np.linalg.norm(axis, axis=-1, keepdims=True)
+        axis = np.where(norm > 1e-12, axis / np.maximum(norm, 1e-12), 1.0 / np.sqrt(3.0))
+
+    projection = np.einsum("npc,nc->np", centered, axis)
+    rows = np.arange(len(blocks))
+    start = blocks[rows, projection.argmax(axis=1)]
+    end = blocks[rows, projection.argmin(axis=1)]
+    return quantize_565(start), quantize_565(end)
+
+
+def _least_squares_endpoints(blocks, indices):
+    alpha = _BC1_WEIGHTS[indices]
+    beta = 1.0 - alpha
+    aa = (alpha * alpha).sum(axis=1)
+    bb = (beta * beta).sum(axis=1)
+    ab = (alpha * beta).sum(axis=1)
+    ax = np.einsum("np,npc->nc", alpha, blocks)
+    bx = np.einsum("np,npc->nc", beta, blocks)
+
+    det = aa * bb - ab * ab
+    valid = np.abs(det) > 1e-6
+    det = np.where(valid, det, 1.0)[:, None]
+    start = np.clip((ax * bb[:, None] - bx * ab[:, None]) / det, 0.0, 255.0)
+    end = np.clip((bx * aa[:, None] - ax * ab[:, None]) / det, 0.0, 255.0)
+    return quantize_565(start), quantize_565(end), valid
+
+
+def encode_bc1_blocks(blocks, quality=QUALITY_FAST):
+    # blocks: (N, 16, 3) float32 in 0..255. Always emits 4-color blocks (color0 > color1),
+    # which is also how the color half of BC3 is decoded.
+    blocks = np.asarray(blocks, dtype=np.float32)
+    c0, c1 = _range_fit_endpoints(blocks)
+    indices, error = _bc1_fit_indices(blocks, c0, c1)
+
+    for _ in range(REFINE_ITERATIONS[quality]):
+        new_c0, new_c1, valid = _least_squares_endpoints(blocks, indices)
+        new_indices, new_error = _bc1_fit_indices(blocks, new_c0, new_c1)
+        better = valid & (new_error < error)
+        c0 = np.where(better, new_c0, c0)
+        c1 = np.where(better, new_c1, c1)
+        indices = np.where(better[:, None], new_indices, indices)
+        error = np.where(better, new_error, error)
+
+    swap = c0 < c1
+    c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+    indices = np.where(swap[:, None], _BC1_SWAPPED_INDEX[indices], indices)
+    indices = np.where((c0 == c1)[:, None], 0, indices).astype(np.uint32)
+
+    encoded = np.empty(len(blocks), dtype=BC1_BLOCK)
+    encoded["c0"] = c0
+    encoded["c1"] = c1
+    encoded["indices"] = (indices << (2 * np.arange(16, dtype=np.uint32))).sum(axis=1, dtype=np.uint32)
+    return encoded
+
+
+def _alpha_palette(a0, a1):
+    steps = np.arange(1, 7, dtype=np.float32)
+    interpolated = ((7.0 - steps) * a0[:, None] + steps * a1[:, None]) / 7.0
+    return np.concatenate([a0[:, None], a1[:, None], interpolated], axis=1)
+
+
+def encode_bc3_blocks(blocks, quality=QUALITY_FAST):
+    # blocks: (N, 16, 4) float32 in 0..255.
+    blocks = np.asarray(blocks, dtype=np.float32)
+    color = encode_bc1_blocks(blocks[:, :, :3], quality)
+
+    alpha = blocks[:, :, 3]
+    a0 = np.clip(np.rint(alpha.max(axis=1)), 0, 255)
+    a1 = np.clip(np.rint(alpha.min(axis=1)), 0, 255)
+    palette = _alpha_palette(a0, a1)
+    alpha_indices = np.abs(alpha[:, :, None] - palette[:, None, :]).argmin(axis=-1).astype(np.uint64)
+    alpha_indices[a0 == a1] = 0
+    alpha_bits = (alpha_indices << (3 * np.arange(16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+
+    encoded = np.empty(len(blocks), dtype=BC3_BLOCK)
+    encoded["a0"] = a0
+    encoded["a1"] = a1
+    encoded["alpha_indices"] = alpha_bits.astype("<u8").view(np.uint8).reshape(-1, 8)[:, :6]
+    encoded["c0"] = color["c0"]
+    encoded["c1"] = color["c1"]
+    encoded["indices"] = color["indices"]
+    return encoded
+
+
+def decode_bc1_blocks(encoded, four_color=False):
+    c0, c1 = encoded["c0"], encoded["c1"]
+    palette = _bc1_palette(c0, c1)
+    if not four_color:
+        three_color = c0 <= c1
+        e0, e1 = expand_565(c0[three_color]), expand_565(c1[three_color])
+        palette[three_color, 2] = (e0 + e1) / 2.0
+        palette[three_color, 3] = 0.0
+    indices = (encoded["indices"][:, None] >> (2 * np.arange(16, dtype=np.uint32))) & 3
+    return np.take_along_axis(palette, indices[..., None].astype(np.intp), axis=1)
+
+
+def decode_bc3_blocks(encoded):
+    color = decode_bc1_blocks(encoded, four_color=True)
+    a0 = encoded["a0"].astype(np.float32)
+    a1 = encoded["a1"].astype(np.float32)
+    palette = _alpha_palette(a0, a1)
+    six_value = a0 <= a1
+    steps = np.arange(1, 5, dtype=np.float32)
+    palette[six_value, 2:6] = ((5.0 - steps) * a0[six_value, None] + steps * a1[six_value, None]) / 5.0
+    palette[six_value, 6] = 0.0
+    palette[six_value, 7] = 255.0
+    alpha_bits = np.zeros(len(encoded), dtype=np.uint64)
+    alpha_bits.view(np.uint8).reshape(-1, 8)[:, :6] = encoded["alpha_indices"]
+    indices = (alpha_bits[:, None] >> (3 * np.arange(16, dtype=np.uint64))) & 7
+    alpha = np.take_along_axis(palette, indices.astype(np.intp), axis=1)
+    return np.concatenate([color, alpha[..., None]], axis=-1)
+
+
+def encode_bc1(image, quality=QUALITY_FAST):
+    return encode_bc1_blocks(image_to_blocks(np.asarray(image, dtype=np.float32)[..., :3]), quality).tobytes()
+
+
+def encode_bc3(image, quality=QUALITY_FAST):
+    return encode_bc3_blocks(image_to_blocks(np.asarray(image, dtype=np.float32)), quality).tobytes()
+
+
+def psnr(reference, test, peak=255.0):
+    mse = np.mean(np.square(np.asarray(reference, dtype=np.float64) - np.asarray(test, dtype=np.float64)))
+    if mse == 0:
+        return float("inf")
+    return float(10.0 * np.log10(peak * peak / mse))
+
+
+def benchmark_bc3(faces, reference_faces=None):
+    # faces: (6, H, W, 4) images in 0..255. reference_faces: BC3 block data per face (e.g. read
+    # from a texconv DDS with dds.read_dds). Returns PSNR and timing per quality level.
+    faces = np.asarray(faces, dtype=np.float32)
+    height, width = faces.shape[1:3]
+    results = {}
+    for quality in REFINE_ITERATIONS:
+        start = time.perf_counter()
+        encoded = [encode_bc3_blocks(image_to_blocks(face), quality) for face in faces]
+        elapsed = time.perf_counter() - start
+        decoded = np.stack([blocks_to_image(decode_bc3_blocks(face), height, width) for face in encoded])
+        results[quality] = {"psnr": psnr(faces, decoded), "seconds": elapsed}
+
+    if reference_faces is not None:
+        decoded = np.stack([
+            blocks_to_image(decode_bc3_blocks(np.frombuffer(face, dtype=BC3_BLOCK)), height, width)
+            for face in reference_faces
+        ])
+        results["REFERENCE"] = {"psnr": psnr(faces, decoded), "seconds": None}
+    return results
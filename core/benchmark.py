@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from .bcn import benchmark_bc3
+from .postprocess import benchmark_postprocess
+from .dds import DXGI_FORMAT_BC3_UNORM, DXGI_FORMAT_BC3_UNORM_SRGB, read_dds, write_r11g11b10_volume_dds
+from .hemisphere import HemisphereReducer
+from .zone_index import PlainZone, ZoneIndex, zone_bounds
+
+# Run from the folder containing the add-on, with plain CPython:
+#     python -m AMV_TOOLS.core.benchmark [--only postprocess bc3 ...] [--output results.json]
+# The BC3 PSNR is only meaningful on real probe faces: pass the bake's face TIFFs with --faces and
+# texconv's BC3 encode of the same faces with --reference to compare FAST and HIGH against it.
+
+BENCHMARKS = ["postprocess", "bc3", "volume_dds", "hemisphere", "zone_index"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="amv_tools.core.benchmark", description="Time the Blender independent bake and encode code.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--cube-size", type=int, default=512, help="face size of the reflection probe cube benchmarks")
+    parser.add_argument("--volume-size", type=int, default=64, help="probes along each axis of the AMV volume benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--faces", nargs="+", help="source faces of the BC3 benchmark: one TIFF per face in x-, x+, y-, y+, z-, z+ order, a six page TIFF or a (6, H, W, C) .npy")
+    parser.add_argument("--reference", nargs="+", help="texconv BC3 DDS of the --faces: one cube DDS or one DDS per face, in the same order")
+    args = parser.parse_args(argv)
+    if args.reference and not args.faces:
+        parser.error("--reference needs the --faces it was encoded from")
+    return args
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def synthetic_probe_faces(size, seed):
+    # Six RGBA faces in 0..255 shaped like rendered probe faces (smooth falloff, flat walls with hard
+    # edges, a little render noise) when no real faces are given.
+    rng = np.random.default_rng(seed)
+    y, x = (np.mgrid[0:size, 0:size] + 0.5) / size
+    faces = np.empty((6, size, size, 4), dtype=np.float32)
+    for face in faces:
+        center = rng.uniform(0, 1, 2)
+        falloff = 1.0 - 0.6 * ((x - center[0]) ** 2 + (y - center[1]) ** 2)
+        face[..., :3] = rng.uniform(40, 200, 3) * falloff[..., None]
+        for _ in range(4):
+            top, left = rng.integers(0, size, 2)
+            height, width = rng.integers(size // 8 + 1, size // 2 + 2, 2)
+            face[top:top + height, left:left + width, :3] *= rng.uniform(0.4, 1.3, 3)
+        face[..., :3] += rng.normal(0, 2, (size, size, 3))
+        face[..., 3] = 255 * falloff
+    return np.clip(faces, 0, 255)
+
+
+def load_faces(paths):
+    # (6, H, W, 4) float32 in 0..255; integer faces (the bake's uint16 TIFFs) are scaled from their
+    # full range, RGB faces get an opaque alpha.
+    if len(paths) == 1 and paths[0].endswith(".npy"):
+        faces = np.load(paths[0])
+    else:
+        import tifffile
+        pages = [tifffile.imread(path) for path in paths]
+        faces = np.concatenate([page.reshape((-1,) + page.shape[-3:]) for page in pages])
+    if faces.shape[0] != 6 or faces.ndim != 4 or faces.shape[-1] not in (3, 4):
+        raise ValueError(f"Expected six (H, W, 3 or 4) faces, got {faces.shape}")
+    scale = 255.0 / np.iinfo(faces.dtype).max if np.issubdtype(faces.dtype, np.integer) else 1.0
+    faces = np.multiply(faces, scale, dtype=np.float32)
+    if faces.shape[-1] == 3:
+        faces = np.concatenate([faces, np.full(faces.shape[:3] + (1,), 255, dtype=np.float32)], axis=-1)
+    return faces
+
+
+def load_reference(paths, faces):
+    # BC3 block data per face from texconv DDS files, checked against the source faces.
+    surfaces = []
+    for path in paths:
+        width, height, _, dxgi_format, data = read_dds(path)
+        if dxgi_format not in (DXGI_FORMAT_BC3_UNORM, DXGI_FORMAT_BC3_UNORM_SRGB):
+            raise ValueError(f"{path} is not a BC3 DDS (DXGI format {dxgi_format})")
+        if (height, width) != faces.shape[1:3]:
+            raise ValueError(f"{path} is {width}x{height}, the faces are {faces.shape[2]}x{faces.shape[1]}")
+        surfaces.extend(data)
+    if len(surfaces) != len(faces):
+        raise ValueError(f"The reference has {len(surfaces)} faces, expected {len(faces)}")
+    return surfaces
+
+
+def benchmark_volume_dds(size, repeat, seed):
+    volume = np.random.default_rng(seed).random((size, size, size, 3), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "volume.dds")
+        seconds = timed(lambda: write_r11g11b10_volume_dds(path, volume), repeat)
+    return {"probes": volume.shape[0] ** 3, "seconds": seconds}
+
+
+def benchmark_hemisphere(size, repeat, seed):
+    # One z-slice batch of 32x16 probe spheres, as the batched bake reduces it.
+    rng = np.random.default_rng(seed)
+    reducer = HemisphereReducer(rng.standard_normal((482, 3)).astype(np.float32))
+    colors = rng.random(size * size * reducer.num_verts * 4, dtype=np.float32)
+    return {"probes": size * size, "seconds": timed(lambda: reducer.reduce(colors), repeat)}
+
+
+def benchmark_zone_index(repeat, seed, zone_count=200, query_count=10000):
+    rng = np.random.default_rng(seed)
+    low = rng.uniform(-200, 200, (zone_count, 3))
+    zones = [PlainZone(index, tuple(bb_min), tuple(bb_min + extent)) for index, (bb_min, extent) in enumerate(zip(low, rng.uniform(2, 30, (zone_count, 3))))]
+    points = rng.uniform(-220, 220, (query_count, 3)).tolist()
+    bounds = zone_bounds(zones)
+
+    def build():
+        index = ZoneIndex()
+        index.sync(bounds)
+        return index
+
+    results = {"zones": zone_count, "queries": query_count}
+    results["build_seconds"] = timed(build, repeat)
+    results["build_and_overlap_seconds"] = timed(lambda: build().overlapping_pairs(), repeat)
+    index = build()
+    results["point_seconds"] = timed(lambda: [index.query_point(point) for point in points], repeat)
+    results["nearest_seconds"] = timed(lambda: [index.nearest(point) for point in points], repeat)
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    if "postprocess" in args.only:
+        results["postprocess"] = benchmark_postprocess(args.cube_size, args.repeat, args.seed)
+    if "bc3" in args.only:
+        faces = load_faces(args.faces) if args.faces else synthetic_probe_faces(args.cube_size, args.seed)
+        reference = load_reference(args.reference, faces) if args.reference else None
+        results["bc3"] = benchmark_bc3(faces, reference)
+    if "volume_dds" in args.only:
+        results["volume_dds"] = benchmark_volume_dds(args.volume_size, args.repeat, args.seed)
+    if "hemisphere" in args.only:
+        results["hemisphere"] = benchmark_hemisphere(args.volume_size, args.repeat, args.seed)
+    if "zone_index" in args.only:
+        results["zone_index"] = benchmark_zone_index(args.repeat, args.seed)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+from .shards import save_shard
+
+
+def bake_settings_hash(settings):
+    # settings: JSON serializable dict of everything that changes the baked colors.
+    encoded = json.dumps(settings, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def missing_runs(completed, count):
+    # [start, stop) runs of the indices in range(count) that are not in completed.
+    runs = []
+    start = None
+    for index in range(count):
+        if index in completed:
+            if start is not None:
+                runs.append((start, index))
+                start = None
+        elif start is None:
+            start = index
+    if start is not None:
+        runs.append((start, count))
+    return runs
+
+
+def zone_checkpoint(folder_path, settings_hash):
+    return SliceCheckpoint(os.path.join(folder_path, "checkpoints", settings_hash))
+
+
+class SliceCheckpoint:
+    # Finished z-slices of a bake, one (ny, nx, 6) .npy per slice in path, normally
+    # <zone output folder>/checkpoints/<settings hash>. A slice file only appears once it is
+    # fully written.
+
+    def __init__(self, path):
+        self.path = path
+
+    def slice_path(self, z):
+        return os.path.join(self.path, f"slice_{z:05d}.npy")
+
+    def completed(self):
+        if not os.path.isdir(self.path):
+            return set()
+        return {
+            int(name[6:-4]) for name in os.listdir(self.path)
+            if name.startswith("slice_") and name.endswith(".npy")
+        }
+
+    def load(self, z):
+        return np.load(self.slice_path(z))
+
+    def save(self, z, results):
+        os.makedirs(self.path, exist_ok=True)
+        save_shard(self.slice_path(z), results)
+
+    def save_slab(self, z, results):
+        for offset, results_slice in enumerate(results):
+            self.save(z + offset, results_slice)
+
+    def clear(self):
+        # Drops every checkpoint of the zone, whatever settings it was made with.
+        shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
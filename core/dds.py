@@ -0,0 +1,210 @@
+import struct
+import numpy as np
+
+DDS_MAGIC = b"DDS "
+
+DDSD_CAPS = 0x1
+DDSD_HEIGHT = 0x2
+DDSD_WIDTH = 0x4
+DDSD_PITCH = 0x8
+DDSD_PIXELFORMAT = 0x1000
+DDSD_MIPMAPCOUNT = 0x20000
+DDSD_LINEARSIZE = 0x80000
+DDSD_DEPTH = 0x800000
+
+DDSCAPS_COMPLEX = 0x8
+DDSCAPS_TEXTURE = 0x1000
+DDSCAPS2_CUBEMAP_ALLFACES = 0xFE00
+DDSCAPS2_VOLUME = 0x200000
+
+DDPF_FOURCC = 0x4
+DDPF_LUMINANCE = 0x20000
+
+D3D10_RESOURCE_DIMENSION_TEXTURE2D = 3
+D3D10_RESOURCE_DIMENSION_TEXTURE3D = 4
+D3D10_RESOURCE_MISC_TEXTURECUBE = 0x4
+
+DXGI_FORMAT_R11G11B10_FLOAT = 26
+DXGI_FORMAT_R16_UNORM = 56
+DXGI_FORMAT_BC1_UNORM = 71
+DXGI_FORMAT_BC1_UNORM_SRGB = 72
+DXGI_FORMAT_BC3_UNORM = 77
+DXGI_FORMAT_BC3_UNORM_SRGB = 78
+
+# Bytes per 4x4 block for the block compressed formats.
+BLOCK_COMPRESSED_BYTES = {
+    DXGI_FORMAT_BC1_UNORM: 8,
+    DXGI_FORMAT_BC1_UNORM_SRGB: 8,
+    DXGI_FORMAT_BC3_UNORM: 16,
+    DXGI_FORMAT_BC3_UNORM_SRGB: 16,
+}
+PIXEL_BYTES = {
+    DXGI_FORMAT_R11G11B10_FLOAT: 4,
+    DXGI_FORMAT_R16_UNORM: 2,
+}
+FOURCC_FORMATS = {
+    b"DXT1": DXGI_FORMAT_BC1_UNORM,
+    b"DXT5": DXGI_FORMAT_BC3_UNORM,
+}
+
+
+def pack_pixel_format(flags, fourcc=b"\0\0\0\0", rgb_bit_count=0, masks=(0, 0, 0, 0)):
+    return struct.pack("<II4sI4I", 32, flags, fourcc, rgb_bit_count, *masks)
+
+
+def legacy_pixel_format(dxgi_format):
+    # Formats with a pre-DX10 description get the legacy header, like texconv writes them;
+    # everything else (sRGB variants, packed floats) needs the DX10 extension.
+    if dxgi_format == DXGI_FORMAT_R16_UNORM:
+        return pack_pixel_format(DDPF_LUMINANCE, rgb_bit_count=16, masks=(0xFFFF, 0, 0, 0))
+    for fourcc, fourcc_format in FOURCC_FORMATS.items():
+        if fourcc_format == dxgi_format:
+            return pack_pixel_format(DDPF_FOURCC, fourcc)
+    return None
+
+
+def surface_size(width, height, dxgi_format):
+    if dxgi_format in BLOCK_COMPRESSED_BYTES:
+        row_pitch = max(1, (width + 3) // 4) * BLOCK_COMPRESSED_BYTES[dxgi_format]
+        return row_pitch, row_pitch * max(1, (height + 3) // 4)
+    row_pitch = width * PIXEL_BYTES[dxgi_format]
+    return row_pitch, row_pitch * height
+
+
+def dds_header(width, height, pixel_format, depth=1, pitch=0, compressed=False, cubemap=False, dxgi_format=None):
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_MIPMAPCOUNT
+    flags |= DDSD_LINEARSIZE if compressed else DDSD_PITCH
+    caps = DDSCAPS_TEXTURE
+    caps2 = 0
+    if depth > 1:
+        flags |= DDSD_DEPTH
+        caps2 |= DDSCAPS2_VOLUME
+    if cubemap:
+        caps |= DDSCAPS_COMPLEX
+        caps2 |= DDSCAPS2_CUBEMAP_ALLFACES
+
+    header = struct.pack(
+        "<7I44s32s5I",
+        124, flags, height, width, pitch, depth if depth > 1 else 0, 1,
+        b"\0" * 44, pixel_format,
+        caps, caps2, 0, 0, 0,
+    )
+
+    if dxgi_format is not None:
+        if depth > 1:
+            dimension = D3D10_RESOURCE_DIMENSION_TEXTURE3D
+        else:
+            dimension = D3D10_RESOURCE_DIMENSION_TEXTURE2D
+        misc_flag = D3D10_RESOURCE_MISC_TEXTURECUBE if cubemap else 0
+        header += struct.pack("<5I", dxgi_format, dimension, misc_flag, 1, 0)
+
+    return DDS_MAGIC + header
+
+
+def _pack_unsigned_float(bits, bit_count, too_large, too_small):
+    # Port of DirectXMath XMStoreFloat3PK for one channel, the packing texconv uses. Operates on
+    # the raw float32 bits: 5 exponent bits, bit_count - 5 mantissa bits, no sign (negatives clamp
+    # to zero). Values below too_small are flushed to zero.
+    mantissa_bits = bit_count - 5
+    mantissa_shift = 23 - mantissa_bits
+    mask = (1 << bit_count) - 1
+    inf_value = 0x1F << mantissa_bits
+
+    sign = bits & 0x80000000
+    magnitude = bits & 0x7FFFFFFF
+
+    exponent = (magnitude >> 23).astype(np.int32)
+    denormal = magnitude < 0x38800000
+    shift = np.clip(113 - exponent, 0, 31).astype(np.uint32)
+    # The rebias wraps around uint32 on purpose, as in the C code.
+    with np.errstate(over="ignore"):
+        value = np.where(
+            denormal,
+            (0x800000 | (magnitude & 0x7FFFFF)) >> shift,
+            magnitude + np.uint32(0xC8000000),
+        )
+    rounding = (1 << (mantissa_shift - 1)) - 1
+    result = ((value + rounding + ((value >> mantissa_shift) & 1)) >> mantissa_shift) & mask
+
+    result = np.where(magnitude > too_large, inf_value - 1, result)
+    result = np.where((sign != 0) | (magnitude < too_small), 0, result)
+
+    special = (magnitude & 0x7F800000) == 0x7F800000
+    special_result = np.where((magnitude & 0x7FFFFF) != 0, mask, np.where(sign != 0, 0, inf_value))
+    return np.where(special, special_result, result).astype(np.uint32)
+
+
+def pack_r11g11b10(rgb):
+    bits = np.ascontiguousarray(rgb, dtype=np.float32).view(np.uint32)
+    r = _pack_unsigned_float(bits[..., 0], 11, 0x477E0000, 0x35800000)
+    g = _pack_unsigned_float(bits[..., 1], 11, 0x477E0000, 0x35800000)
+    # DirectXMath has no lower bound for blue; below 2^-45 its denormal shift reaches 32, which x86
+    # wraps mod 32 into garbage. Those values are flushed to zero instead, everywhere else the
+    # output matches texconv.
+    b = _pack_unsigned_float(bits[..., 2], 10, 0x477C0000, 0x29000000)
+    return r | (g << 11) | (b << 22)
+
+
+def write_r11g11b10_volume_dds(path, volume):
+    # volume is a (depth, height, width, 3) float32 array; packed one z-slice at a time so
+    # memmapped volumes never have to be fully resident.
+    depth, height, width = volume.shape[:3]
+    pixel_format = pack_pixel_format(DDPF_FOURCC, b"DX10")
+    header = dds_header(width, height, pixel_format, depth=depth, pitch=width * 4, dxgi_format=DXGI_FORMAT_R11G11B10_FLOAT)
+
+    with open(path, "wb") as file:
+        file.write(header)
+        for z in range(depth):
+            file.write(pack_r11g11b10(volume[z]).astype("<u4").tobytes())
+
+
+def write_cubemap_dds(path, faces, width, height, dxgi_format):
+    # faces: six already encoded surfaces (bytes-like), written in the given order, one mip level.
+    row_pitch, slice_size = surface_size(width, height, dxgi_format)
+    compressed = dxgi_format in BLOCK_COMPRESSED_BYTES
+    pixel_format = legacy_pixel_format(dxgi_format)
+    extension_format = None
+    if pixel_format is None:
+        pixel_format = pack_pixel_format(DDPF_FOURCC, b"DX10")
+        extension_format = dxgi_format
+    header = dds_header(
+        width, height, pixel_format,
+        pitch=slice_size if compressed else row_pitch,
+        compressed=compressed, cubemap=True, dxgi_format=extension_format,
+    )
+
+    with open(path, "wb") as file:
+        file.write(header)
+        for face in faces:
+            face = memoryview(face).cast("B")
+            if len(face) != slice_size:
+                raise ValueError(f"Cubemap face is {len(face)} bytes, expected {slice_size}")
+            file.write(face)
+
+
+def read_dds(path):
+    # Minimal reader for single-mip 2D, cube and volume DDS files, enough to compare against
+    # reference texconv outputs. Returns (width, height, depth, dxgi_format, surfaces).
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:4] != DDS_MAGIC:
+        raise ValueError(f"{path} is not a DDS file")
+
+    height, width, _, depth = struct.unpack_from("<4I", data, 12)
+    pixel_flags, fourcc = struct.unpack_from("<I4s", data, 80)
+    caps2 = struct.unpack_from("<I", data, 112)[0]
+    offset = 128
+    if pixel_flags & DDPF_FOURCC and fourcc == b"DX10":
+        dxgi_format = struct.unpack_from("<I", data, 128)[0]
+        offset += 20
+    elif pixel_flags & DDPF_FOURCC:
+        dxgi_format = FOURCC_FORMATS[fourcc]
+    elif pixel_flags & DDPF_LUMINANCE:
+        dxgi_format = DXGI_FORMAT_R16_UNORM
+    else:
+        raise ValueError(f"Unsupported DDS pixel format in {path}")
+
+    _, slice_size = surface_size(width, height, dxgi_format)
+    count = 6 if caps2 & DDSCAPS2_CUBEMAP_ALLFACES else max(depth, 1)
+    surfaces = [data[offset + i * slice_size:offset + (i + 1) * slice_size] for i in range(count)]
+    return width, height, max(depth, 1), dxgi_format, surfaces
@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def _shifted(array, axis, step):
+    # (target, source) views pairing every cell with its neighbour step cells along axis.
+    length = array.shape[axis]
+    target = [slice(None)] * array.ndim
+    source = [slice(None)] * array.ndim
+    target[axis] = slice(max(step, 0), length + min(step, 0))
+    source[axis] = slice(max(-step, 0), length - max(step, 0))
+    return tuple(target), tuple(source)
+
+
+# Float values of the neighbour sums kept at once; slabs of z-slices are sized to stay below it.
+SLAB_VALUES = 1 << 22
+
+
+def _has_valid_neighbour(valid):
+    neighbour = np.zeros(valid.shape, dtype=bool)
+    for axis in range(3):
+        for step in (1, -1):
+            target, source = _shifted(valid, axis, step)
+            neighbour[target] |= valid[source]
+    return neighbour
+
+
+def _fill_slab(volume, valid, ring, start, stop):
+    # Averages the valid face neighbours of the ring cells in z-slices start:stop, read from the
+    # slab and one slice on each side, and writes them straight into volume.
+    ring_slab = ring[start:stop]
+    if not ring_slab.any():
+        return
+    low, high = max(start - 1, 0), min(stop + 1, volume.shape[0])
+    block_valid = valid[low:high]
+    dtype = np.result_type(volume.dtype, np.float32)
+    block = np.where(block_valid[..., None], volume[low:high], dtype.type(0))
+    total = np.zeros(block.shape, dtype=dtype)
+    count = np.zeros(block_valid.shape, dtype=np.int8)
+    for axis in range(3):
+        for step in (1, -1):
+            target, source = _shifted(block_valid, axis, step)
+            total[target] += block[source]
+            count[target] += block_valid[source]
+    inner = slice(start - low, stop - low)
+    total, count = total[inner], count[inner]
+    volume[start:stop][ring_slab] = total[ring_slab] / count[ring_slab][:, None]
+
+
+def dilate_nearest(volume, valid, slab_depth=None):
+    # Fills the cells of a (nz, ny, nx, C) volume where valid is False with the average of their
+    # already filled face neighbours, one ring at a time outwards from the valid cells, so every
+    # cell ends up with the colors of its nearest valid cells. The sums are taken slab by slab of
+    # z-slices, so volume can be the float32 memmap of a bake and only the masks are volume sized.
+    valid = np.array(valid, dtype=bool)
+    if not valid.any():
+        return volume
+    if slab_depth is None:
+        slab_depth = max(1, SLAB_VALUES // max(1, volume[0].size))
+    while not valid.all():
+        # Every ring cell only reads cells that were valid before the ring, so the slabs of one
+        # ring can be written in any order.
+        ring = ~valid & _has_valid_neighbour(valid)
+        for start in range(0, volume.shape[0], slab_depth):
+            _fill_slab(volume, valid, ring, start, min(start + slab_depth, volume.shape[0]))
+        valid |= ring
+    return volume
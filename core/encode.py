@@ -0,0 +1,103 @@
+import os
+import mmap
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+class EncodeError(Exception):
+    def __init__(self, failures, job_count):
+        self.failures = failures
+        details = "; ".join(f"job {index}: {error!r}" for index, error in failures)
+        super().__init__(f"{len(failures)} of {job_count} encode jobs failed ({details})")
+
+
+class MappedArray:
+    # A whole .npy memmap passed to a worker process by path; the worker maps the file again
+    # read-only instead of receiving a pickled copy of the array.
+
+    def __init__(self, array):
+        if array.mode in ("r+", "w+"):
+            array.flush()
+        self.path = array.filename
+        self.shape = array.shape
+        self.dtype = array.dtype
+
+    def load(self):
+        array = np.load(self.path, mmap_mode="r")
+        if array.shape != self.shape or array.dtype != self.dtype:
+            raise ValueError(f"{self.path} holds a {array.dtype} {array.shape} array, expected {self.dtype} {self.shape}")
+        return array
+
+
+def is_mapped_file(array):
+    # Only a memmap that owns its mapping covers the whole file; slices of it can't be sent by path.
+    return isinstance(array, np.memmap) and array.filename is not None and isinstance(array.base, mmap.mmap)
+
+
+def _run_mapped(function, args):
+    return function(*(arg.load() if isinstance(arg, MappedArray) else arg for arg in args))
+
+
+def resolve_worker_count(max_workers, job_count):
+    if max_workers <= 0:
+        max_workers = os.cpu_count() or 1
+    return max(1, min(max_workers, job_count))
+
+
+def _collect(executor, jobs, pending, results, failures):
+    futures = {executor.submit(function, *args): index for index, (function, args) in jobs.items() if index in pending}
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            results[index] = future.result()
+        except BrokenProcessPool:
+            raise
+        except Exception as error:
+            failures.append((index, error))
+        pending.discard(index)
+
+
+def run_encode_jobs(jobs, max_workers=0):
+    # jobs is a list of (function, args); functions must be module level so they can be sent to
+    # worker processes. Results come back in job order, whatever order the workers finish in.
+    # Every failing job is reported through a single EncodeError once all jobs have run.
+    # Arrays are never pickled into workers: .npy memmaps are sent by path and mapped again by the
+    # worker, and jobs holding other arrays run on threads (NumPy releases the GIL for the heavy
+    # parts).
+    jobs = dict(enumerate(jobs))
+    results = [None] * len(jobs)
+    failures = []
+    pending = set(jobs)
+    if not jobs:
+        return results
+
+    workers = resolve_worker_count(max_workers, len(jobs))
+    in_memory = any(isinstance(arg, np.ndarray) and not is_mapped_file(arg) for _, args in jobs.values() for arg in args)
+    if workers == 1:
+        for index, (function, args) in jobs.items():
+            try:
+                results[index] = function(*args)
+            except Exception as error:
+                failures.append((index, error))
+    else:
+        if not in_memory:
+            mapped_jobs = {
+                index: (_run_mapped, (function, tuple(MappedArray(arg) if is_mapped_file(arg) else arg for arg in args)))
+                for index, (function, args) in jobs.items()
+            }
+            try:
+                with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    _collect(executor, mapped_jobs, pending, results, failures)
+            except BrokenProcessPool:
+                # Worker processes could not start the interpreter (e.g. Blender started with a
+                # script that cannot be re-imported); the remaining jobs run on threads.
+                print("Encode worker processes unavailable, falling back to threads.")
+        if pending:
+            with ThreadPoolExecutor(workers) as executor:
+                _collect(executor, jobs, pending, results, failures)
+
+    if failures:
+        raise EncodeError(sorted(failures, key=lambda failure: failure[0]), len(jobs))
+    return results
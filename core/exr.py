@@ -0,0 +1,84 @@
+import struct
+import numpy as np
+
+EXR_MAGIC = 20000630
+
+EXR_UINT = 0
+EXR_HALF = 1
+EXR_FLOAT = 2
+
+EXR_NO_COMPRESSION = 0
+
+_PIXEL_DTYPES = {
+    EXR_UINT: np.dtype("<u4"),
+    EXR_HALF: np.dtype("<f2"),
+    EXR_FLOAT: np.dtype("<f4"),
+}
+
+
+def _read_cstring(data, offset):
+    end = data.index(b"\0", offset)
+    return data[offset:end].decode("latin1"), end + 1
+
+
+def _parse_channels(value):
+    channels = []
+    offset = 0
+    while value[offset] != 0:
+        name, offset = _read_cstring(value, offset)
+        pixel_type, _, x_sampling, y_sampling = struct.unpack_from("<iB3xii", value, offset)
+        offset += 16
+        if x_sampling != 1 or y_sampling != 1:
+            raise ValueError(f"Subsampled EXR channel {name} is not supported")
+        channels.append((name, pixel_type))
+    return channels
+
+
+def read_exr_header(data):
+    magic, version = struct.unpack_from("<iI", data, 0)
+    if magic != EXR_MAGIC:
+        raise ValueError("Not an OpenEXR file")
+    if version & 0x1A00:
+        raise ValueError("Only single part scanline OpenEXR files are supported")
+
+    header = {}
+    offset = 8
+    while data[offset] != 0:
+        name, offset = _read_cstring(data, offset)
+        _, offset = _read_cstring(data, offset)
+        size = struct.unpack_from("<i", data, offset)[0]
+        offset += 4
+        header[name] = data[offset:offset + size]
+        offset += size
+    return header, offset + 1
+
+
+def read_exr_channels(path):
+    # Minimal reader for the uncompressed scanline EXRs the add-on writes itself (Blender multilayer
+    # output with exr_codec 'NONE'). Returns {channel name: (height, width) array}, top row first.
+    with open(path, "rb") as file:
+        data = file.read()
+
+    header, offset = read_exr_header(data)
+    if header["compression"][0] != EXR_NO_COMPRESSION:
+        raise ValueError(f"{path} is compressed, only uncompressed OpenEXR files can be read")
+
+    channels = _parse_channels(header["channels"])
+    x_min, y_min, x_max, y_max = struct.unpack("<4i", header["dataWindow"])
+    width, height = x_max - x_min + 1, y_max - y_min + 1
+
+    # One scanline per chunk without compression: y, byte count, then every channel's row.
+    line_dtype = np.dtype([(name, _PIXEL_DTYPES[pixel_type], (width,)) for name, pixel_type in channels])
+    chunk_dtype = np.dtype([("y", "<i4"), ("size", "<i4"), ("pixels", line_dtype)])
+    chunk_offsets = np.frombuffer(data, dtype="<u8", count=height, offset=offset)
+    first_chunk = int(chunk_offsets.min())
+    chunks = np.frombuffer(data, dtype=chunk_dtype, count=height, offset=first_chunk)
+    if np.any(np.sort(chunk_offsets) - first_chunk != np.arange(height) * chunk_dtype.itemsize):
+        raise ValueError(f"{path} has an unexpected chunk layout")
+
+    rows = np.argsort(chunks["y"], kind="stable")
+    return {name: chunks["pixels"][name][rows].astype(np.float32) for name, _ in channels}
+
+
+def get_exr_pass(channels, layer, pass_name, components):
+    return np.stack([channels[f"{layer}.{pass_name}.{component}"] for component in components], axis=-1)
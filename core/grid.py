@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def bbox_center(min_coords, max_coords):
+    center = np.array(min_coords) + np.array(max_coords)
+    center /= 2
+    return center
+
+def rotate_point_around_center(point, center, angle):
+    rotation_matrix = np.array([[np.cos(angle), -np.sin(angle)],
+                                [np.sin(angle), np.cos(angle)]])
+    translated_point = point - center
+    rotated_point = np.dot(rotation_matrix, translated_point)
+    return rotated_point + center
+
+def rotate_bbox(bbox, center, angle):
+    rotated_bbox = []
+    for point in bbox:
+        rotated_point = point.copy()
+        rotated_point[0], rotated_point[1] = rotate_point_around_center(point[:2], center[:2], angle)[:2]
+        rotated_bbox.append(rotated_point)
+    return np.array(rotated_bbox)
+
+def bbox_dimensions(bbox):
+    min_coords = np.min(bbox, axis=0)
+    max_coords = np.max(bbox, axis=0)
+    return (max_coords - min_coords) / 2
+
+
+def calculate_sphere_counts(interval, min_bound, max_bound):
+    for i in range(3):
+        if min_bound[i] > max_bound[i]:
+            min_bound[i], max_bound[i] = max_bound[i], min_bound[i]
+    num_spheres = [round((max_bound[i] - min_bound[i]) / interval) for i in range(3)]
+    return tuple(num_spheres)
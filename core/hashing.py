@@ -0,0 +1,64 @@
+def rot(x, k):
+    return ((x << k) & 0xFFFFFFFF) | (x >> (32 - k))
+
+def mix(a, b, c):
+    a = (a - c) & 0xFFFFFFFF; a ^= rot(c, 4); c = (c + b) & 0xFFFFFFFF
+    b = (b - a) & 0xFFFFFFFF; b ^= rot(a, 6); a = (a + c) & 0xFFFFFFFF
+    c = (c - b) & 0xFFFFFFFF; c ^= rot(b, 8); b = (b + a) & 0xFFFFFFFF
+    a = (a - c) & 0xFFFFFFFF; a ^= rot(c, 16); c = (c + b) & 0xFFFFFFFF
+    b = (b - a) & 0xFFFFFFFF; b ^= rot(a, 19); a = (a + c) & 0xFFFFFFFF
+    c = (c - b) & 0xFFFFFFFF; c ^= rot(b, 4); b = (b + a) & 0xFFFFFFFF
+    return a, b, c
+
+def final(a, b, c):
+    c ^= b; c = (c - rot(b, 14)) & 0xFFFFFFFF
+    a ^= c; a = (a - rot(c, 11)) & 0xFFFFFFFF
+    b ^= a; b = (b - rot(a, 25)) & 0xFFFFFFFF
+    c ^= b; c = (c - rot(b, 16)) & 0xFFFFFFFF
+    a ^= c; a = (a - rot(c, 4)) & 0xFFFFFFFF
+    b ^= a; b = (b - rot(a, 14)) & 0xFFFFFFFF
+    c ^= b; c = (c - rot(b, 24)) & 0xFFFFFFFF
+    return a, b, c
+
+def compute_probe_hash(k, initval = 0):
+    length = len(k)
+    a = b = c = (0xdeadbeef + (length << 2) + initval) & 0xFFFFFFFF
+
+    while length > 3:
+        a = (a + k[0]) & 0xFFFFFFFF
+        b = (b + k[1]) & 0xFFFFFFFF
+        c = (c + k[2]) & 0xFFFFFFFF
+        a, b, c = mix(a, b, c)
+        length -= 3
+        k = k[3:]
+
+    if length == 3:
+        c = (c + k[2]) & 0xFFFFFFFF
+    if length >= 2:
+        b = (b + k[1]) & 0xFFFFFFFF
+    if length >= 1:
+        a = (a + k[0]) & 0xFFFFFFFF
+        a, b, c = final(a, b, c)
+
+    return c
+
+def gen_hash(text):
+    if text is None:
+        return 0
+    h = 0
+    for char in text:
+        h += ord(char)
+        h &= 0xFFFFFFFF
+        h += (h << 10)
+        h &= 0xFFFFFFFF
+        h ^= (h >> 6)
+        h &= 0xFFFFFFFF
+    
+    h += (h << 3)
+    h &= 0xFFFFFFFF
+    h ^= (h >> 11)
+    h &= 0xFFFFFFFF
+    h += (h << 15)
+    h &= 0xFFFFFFFF
+
+    return h & 0xFFFFFFFF
@@ -0,0 +1,40 @@
+import numpy as np
+
+# Output order of the six directional averages: +X, -X, +Y, -Y, +Z, -Z.
+# The first three go to AMV volume 0 (r, g, b), the last three to volume 1.
+HEMISPHERE_COUNT = 6
+
+
+def hemisphere_masks(co):
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    # Sequential double sums, as sum() over v.co would give; vertices lying exactly on the
+    # median plane are sensitive to the rounding.
+    median = np.array([sum(axis) for axis in co.T.tolist()]) / len(co)
+    upper = co >= median
+    masks = np.empty((HEMISPHERE_COUNT, len(co)), dtype=bool)
+    masks[0::2] = upper.T
+    masks[1::2] = ~upper.T
+    return masks
+
+
+class HemisphereReducer:
+    # Reduces baked vertex colors of probe spheres sharing one topology to the six half-space
+    # averages. Half-space membership and the RGB mean are folded into a single
+    # (num_verts * 4, 6) weight matrix, so a whole batch of probes is one matrix multiply
+    # over the flat RGBA buffer filled by foreach_get.
+
+    def __init__(self, co):
+        masks = hemisphere_masks(co)
+        self.num_verts = masks.shape[1]
+
+        vertex_weights = masks / masks.sum(axis=1, keepdims=True)
+        weights = np.zeros((self.num_verts, 4, HEMISPHERE_COUNT), dtype=np.float32)
+        weights[:, :3, :] = vertex_weights.T[:, None, :] / 3.0
+        self.weights = weights.reshape(self.num_verts * 4, HEMISPHERE_COUNT)
+
+    def color_buffer(self, probe_count=1):
+        return np.empty(probe_count * self.num_verts * 4, dtype=np.float32)
+
+    def reduce(self, colors, out=None):
+        colors = colors.reshape(-1, self.num_verts * 4)
+        return np.matmul(colors, self.weights, out=out)
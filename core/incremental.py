@@ -0,0 +1,28 @@
+import numpy as np
+
+
+def changed_object_bounds(previous, current):
+    # previous, current: {object name: record} as made by scene_hash.scene_object_records.
+    # Returns the (bb_min, bb_max) boxes touched by the edit (old and new bounds of every added,
+    # removed or modified object), or None when a light changed and every probe has to be baked.
+    boxes = []
+    for name in previous.keys() | current.keys():
+        old, new = previous.get(name), current.get(name)
+        if old is not None and new is not None and old["hash"] == new["hash"]:
+            continue
+        if any(record is not None and record["type"] == 'LIGHT' for record in (old, new)):
+            return None
+        for record in (old, new):
+            if record is not None:
+                boxes.append((record["bb_min"], record["bb_max"]))
+    return boxes
+
+
+def affected_probe_mask(centers, boxes, radius):
+    # centers: (..., 3) probe positions. True for every probe closer than radius to any box.
+    centers = np.asarray(centers, dtype=np.float64)
+    mask = np.zeros(centers.shape[:-1], dtype=bool)
+    for bb_min, bb_max in boxes:
+        outside = np.maximum(np.asarray(bb_min) - centers, 0.0) + np.maximum(centers - np.asarray(bb_max), 0.0)
+        mask |= np.einsum("...i,...i->...", outside, outside) <= radius * radius
+    return mask
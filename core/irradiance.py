@@ -0,0 +1,50 @@
+import math
+import numpy as np
+
+from .hemisphere import hemisphere_masks
+
+
+def stratified_sphere_directions(count):
+    # Cell midpoints of an equal area (cos theta, phi) grid over the whole sphere. Every probe uses
+    # the same set, so neighbouring probes don't pick up different noise.
+    rows = max(1, int(round(math.sqrt(count / 2))))
+    columns = max(1, count // rows)
+    z = 1.0 - (np.arange(rows) + 0.5) * 2.0 / rows
+    phi = (np.arange(columns) + 0.5) * 2.0 * math.pi / columns
+    z, phi = np.meshgrid(z, phi, indexing="ij")
+    r = np.sqrt(1.0 - z * z)
+    return np.stack([r * np.cos(phi), r * np.sin(phi), z], axis=-1).reshape(-1, 3)
+
+
+def sphere_normals(co):
+    co = np.asarray(co, dtype=np.float64).reshape(-1, 3)
+    normals = co - co.mean(axis=0)
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+def hemisphere_cosine_weights(co, directions):
+    # (len(directions), 6) weights turning the radiance seen along uniformly spread directions into
+    # what HemisphereReducer makes of a Cycles bake of the probe sphere co: per half of the sphere
+    # vertices, the mean over their normals of irradiance / pi.
+    masks = hemisphere_masks(co).astype(np.float64)
+    cosines = np.maximum(sphere_normals(co) @ np.asarray(directions, dtype=np.float64).T, 0.0)
+    weights = (masks @ cosines) / masks.sum(axis=1, keepdims=True)
+    return weights.T * (4.0 / len(directions))
+
+
+def engine_error_stats(reference, estimate):
+    # Accuracy of estimate against reference (both (P, 6)), e.g. the ray-cast engine against Cycles.
+    # scale is the least squares factor estimate * scale ~ reference, to tell a brightness offset
+    # from noise.
+    reference = np.asarray(reference, dtype=np.float64)
+    estimate = np.asarray(estimate, dtype=np.float64)
+    error = estimate - reference
+    denominator = float(np.sum(estimate * estimate))
+    return {
+        "probes": len(reference),
+        "mean_abs_error": float(np.mean(np.abs(error))),
+        "max_abs_error": float(np.max(np.abs(error))),
+        "rmse": float(np.sqrt(np.mean(error * error))),
+        "mean_relative_error": float(np.mean(np.abs(error) / np.maximum(np.abs(reference), 1e-6))),
+        "scale": float(np.sum(estimate * reference)) / denominator if denominator > 0.0 else 0.0,
+    }
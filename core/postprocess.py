@@ -0,0 +1,115 @@
+import time
+import tracemalloc
+import numpy as np
+
+# In-place post-processing of reflection probe cubes: a (6, H, W, 4) uint16 buffer, RGB from the
+# renderer and alpha filled here. Everything is done face by face with two (H, W) bool scratch
+# masks, comparisons stay in uint16 and nothing is promoted to float or signed types.
+
+CUBE_FACES = 6
+TOLERANCE = 10
+NORMAL_BACKGROUND = 32767
+DEPTH_FAR = 65535
+
+
+def allocate_cube(height, width, channels=4, dtype=np.uint16):
+    return np.empty((CUBE_FACES, height, width, channels), dtype=dtype)
+
+
+def load_cube(faces, out):
+    # Copies six (H, W, C) faces into the cube buffer, as many channels as both have.
+    channels = min(out.shape[-1], faces[0].shape[-1])
+    for i, face in enumerate(faces):
+        out[i, :, :, :channels] = face[:, :, :channels]
+    return out
+
+
+def value_range(value, tolerance, dtype):
+    # [value - tolerance, value + tolerance] clamped to what the dtype can hold, so the bounds can
+    # be compared against unsigned data without wrapping around.
+    info = np.iinfo(dtype)
+    return max(value - tolerance, info.min), min(value + tolerance, info.max)
+
+
+def match_rgb(rgb, low, high, mask, scratch):
+    # mask = every channel of rgb within [low, high].
+    mask.fill(True)
+    for channel in range(3):
+        np.greater_equal(rgb[:, :, channel], low, out=scratch)
+        mask &= scratch
+        np.less_equal(rgb[:, :, channel], high, out=scratch)
+        mask &= scratch
+    return mask
+
+
+def _scratch(cube):
+    shape = cube.shape[1:3]
+    return np.empty(shape, dtype=bool), np.empty(shape, dtype=bool)
+
+
+def process_color_cube(cube, ao_faces, tolerance=TOLERANCE):
+    # Near black diffuse color becomes mid grey; alpha is half the AO, or opaque where the AO is
+    # near black too.
+    info = np.iinfo(cube.dtype)
+    mask, scratch = _scratch(cube)
+    black_low, black_high = value_range(0, tolerance, cube.dtype)
+    # ao * 0.5 <= tolerance, kept in integers.
+    ao_low, ao_high = value_range(0, 2 * tolerance, cube.dtype)
+
+    for face, ao in zip(cube, ao_faces):
+        rgb = face[:, :, :3]
+        match_rgb(rgb, black_low, black_high, mask, scratch)
+        np.copyto(rgb, info.max // 2, where=mask[:, :, None])
+
+        alpha = face[:, :, 3]
+        np.right_shift(ao[:, :, 0], 1, out=alpha)
+        match_rgb(ao, ao_low, ao_high, mask, scratch)
+        np.copyto(alpha, info.max, where=mask)
+    return cube
+
+
+def process_normal_cube(cube, tolerance=TOLERANCE):
+    # Background normals (0.5 grey) become fully transparent black.
+    info = np.iinfo(cube.dtype)
+    mask, scratch = _scratch(cube)
+    low, high = value_range(NORMAL_BACKGROUND, tolerance, cube.dtype)
+
+    for face in cube:
+        face[:, :, 3] = info.max
+        match_rgb(face, low, high, mask, scratch)
+        np.copyto(face, 0, where=mask[:, :, None])
+    return cube
+
+
+def process_depth_cube(cube):
+    # Pulls the far plane just below the maximum, per channel.
+    mask = np.empty(cube.shape[1:], dtype=bool)
+    for face in cube:
+        np.equal(face, DEPTH_FAR, out=mask)
+        np.copyto(face, DEPTH_FAR - TOLERANCE, where=mask)
+    return cube
+
+
+def benchmark_postprocess(size=1024, repeat=3, seed=0):
+    # Times the color, normal and depth kernels on a random cube and reports the tracemalloc
+    # high-water mark of each pass; the cube buffer itself is allocated beforehand.
+    rng = np.random.default_rng(seed)
+    faces = rng.integers(0, 65536, (CUBE_FACES, size, size, 3), dtype=np.uint16)
+    cube = allocate_cube(size, size)
+
+    passes = {
+        "color": lambda: process_color_cube(load_cube(faces, cube), faces),
+        "normal": lambda: process_normal_cube(load_cube(faces, cube)),
+        "depth": lambda: process_depth_cube(load_cube(faces, cube[:, :, :, :1])),
+    }
+    results = {"cube_bytes": cube.nbytes}
+    for name, function in passes.items():
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        elapsed = (time.perf_counter() - start) / repeat
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {"seconds": elapsed, "peak_bytes": peak}
+    return results
@@ -0,0 +1,72 @@
+import json
+import base64
+import hashlib
+import functools
+import numpy as np
+
+# Zone_Properties.probes_location_3d holds the saved probe positions as
+# "f32le:<nz>,<ny>,<nx>:<base64 of the little endian float32 (nz, ny, nx, 3) array>".
+# Scenes saved before used a JSON [z][y][x][3] list, which is still read and gets migrated on load.
+FORMAT_TAG = "f32le"
+LOCATION_DTYPE = np.dtype("<f4")
+
+
+def encode_locations(locations):
+    if locations is None:
+        return ""
+    locations = np.ascontiguousarray(locations, dtype=LOCATION_DTYPE)
+    nz, ny, nx = locations.shape[:3]
+    payload = base64.b64encode(locations.tobytes()).decode("ascii")
+    return f"{FORMAT_TAG}:{nz},{ny},{nx}:{payload}"
+
+
+def is_legacy(text):
+    return text.lstrip().startswith("[")
+
+
+@functools.lru_cache(maxsize=8)
+def decode_locations(text):
+    # (nz, ny, nx, 3) float32 array, or None when no locations are saved. Decoded arrays are cached
+    # by their string and shared, so they are read-only; copy before editing.
+    if is_legacy(text):
+        nested = json.loads(text)
+        if len(nested) == 0:
+            return None
+        locations = np.array(nested, dtype=LOCATION_DTYPE)
+    elif text:
+        tag, shape, payload = text.split(":", 2)
+        if tag != FORMAT_TAG:
+            raise ValueError(f"Unknown probe location format {tag!r}")
+        shape = tuple(int(size) for size in shape.split(",")) + (3,)
+        locations = np.frombuffer(base64.b64decode(payload), dtype=LOCATION_DTYPE).reshape(shape)
+    else:
+        return None
+    locations.flags.writeable = False
+    return locations
+
+
+def get_probe_locations(zone):
+    return decode_locations(zone.probes_location_3d)
+
+
+def set_probe_locations(zone, locations):
+    # locations: (nz, ny, nx, 3) array, or None to clear them.
+    zone.probes_location_3d = encode_locations(locations)
+
+
+def probe_locations_digest(zone):
+    # Stable across the legacy and the compact format, for bake settings hashes.
+    locations = get_probe_locations(zone)
+    if locations is None:
+        return ""
+    digest = hashlib.sha1(repr(locations.shape).encode("utf-8"))
+    digest.update(locations.tobytes())
+    return digest.hexdigest()
+
+
+def migrate_zone_locations(zone):
+    # Rewrites a legacy JSON value in the compact format; returns whether it did.
+    if not is_legacy(zone.probes_location_3d):
+        return False
+    set_probe_locations(zone, get_probe_locations(zone))
+    return True
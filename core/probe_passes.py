@@ -0,0 +1,67 @@
+import numpy as np
+
+from .exr import get_exr_pass
+
+VIEW_LAYER = "ViewLayer"
+
+# Same defaults as the depth Map Range node of the per-pass compositor setup.
+DEPTH_TO_MIN = 0.99
+DEPTH_TO_MAX = 1.0
+
+
+def remap_depth(depth, from_max, from_min=0.0, to_min=DEPTH_TO_MIN, to_max=DEPTH_TO_MAX):
+    # CompositorNodeMapRange with Clamp enabled.
+    scale = (to_max - to_min) / (from_max - from_min)
+    return np.clip((depth - from_min) * scale + to_min, min(to_min, to_max), max(to_min, to_max))
+
+
+def encode_normal(normal):
+    return normal * 0.5 + 0.5
+
+
+def linear_to_srgb(linear):
+    linear = np.clip(linear, 0.0, 1.0)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * np.power(linear, 1.0 / 2.4) - 0.055)
+
+
+def to_uint16(image):
+    # Rounds like Blender's float to 16-bit image conversion.
+    return (np.clip(image, 0.0, 1.0) * 65535.0 + 0.5).astype(np.uint16)
+
+
+def grey_to_rgb(image):
+    return np.repeat(image[..., None], 3, axis=-1)
+
+
+def split_probe_passes(channels, depth_max, layer=VIEW_LAYER):
+    # Turns the passes of one multilayer EXR face into the 16-bit RGB images the per-pass
+    # compositor setup writes: {"normal", "depth", "color"} -> (H, W, 3) uint16. AO goes through
+    # the AgX view transform, which only Blender can apply, see ao_pixels.
+    depth = channels[f"{layer}.Depth.Z"]
+    return {
+        "normal": to_uint16(encode_normal(get_exr_pass(channels, layer, "Normal", "XYZ"))),
+        "depth": to_uint16(grey_to_rgb(remap_depth(depth, depth_max))),
+        "color": to_uint16(linear_to_srgb(get_exr_pass(channels, layer, "DiffCol", "RGB"))),
+    }
+
+
+def ao_pixels(channels, layer=VIEW_LAYER):
+    # The scene linear AO pass of one multilayer EXR face as opaque grey RGBA, bottom row first,
+    # ready for Image.pixels like the compositor feeds the AO socket to the composite.
+    ao = channels[f"{layer}.AO.R"][::-1]
+    pixels = np.ones(ao.shape + (4,), dtype=np.float32)
+    pixels[..., :3] = ao[..., None]
+    return pixels
+
+
+def encode_viewer_pass(type, pixels):
+    # Viewer Node pixels are scene linear RGBA, bottom row first; applies what saving the render
+    # through the per-pass view transform did (Raw for normal/depth, Standard for color) and
+    # returns (H, W, 3) uint16 like the saved TIFF. AO goes through AgX, which has no exact
+    # equivalent here, so the per-pass render saves it.
+    if type == "ao":
+        raise ValueError("The AO pass has to be saved through the AgX view transform")
+    rgb = pixels[::-1, :, :3]
+    if type == "color":
+        rgb = linear_to_srgb(rgb)
+    return to_uint16(rgb)
@@ -0,0 +1,58 @@
+import math
+import numpy as np
+
+
+def downsample_half(level, out=None):
+    # 2x2 box filter of a (faces, H, W, C) stack, accumulated in place into the float32 out; level
+    # can be the uint16 cube itself.
+    height, width = level.shape[1] // 2, level.shape[2] // 2
+    if out is None:
+        out = np.empty((level.shape[0], height, width, level.shape[3]), dtype=np.float32)
+    np.add(level[:, 0:2 * height:2, 0:2 * width:2], level[:, 1:2 * height:2, 0:2 * width:2], out=out, dtype=np.float32)
+    out += level[:, 0:2 * height:2, 1:2 * width:2]
+    out += level[:, 1:2 * height:2, 1:2 * width:2]
+    out *= 0.25
+    return out
+
+
+def downsample_box(level, width, height):
+    factor_y, factor_x = level.shape[1] // height, level.shape[2] // width
+    if factor_y * height != level.shape[1] or factor_x * width != level.shape[2]:
+        raise ValueError(f"Cannot box filter {level.shape[2]}x{level.shape[1]} faces to {width}x{height}")
+    if factor_x == 1 and factor_y == 1:
+        return level
+    shape = (level.shape[0], height, factor_y, width, factor_x, level.shape[3])
+    return level.reshape(shape).mean(axis=(2, 4), dtype=np.float32)
+
+
+def upsample_repeat(level, width, height):
+    # Nearest neighbour upscale by whole factors, for faces rendered smaller than a requested size.
+    factor_y, factor_x = height // level.shape[1], width // level.shape[2]
+    if factor_y * level.shape[1] != height or factor_x * level.shape[2] != width:
+        raise ValueError(f"Cannot upsample {level.shape[2]}x{level.shape[1]} faces to {width}x{height}")
+    return np.repeat(np.repeat(level, factor_y, axis=1), factor_x, axis=2)
+
+
+def box_pyramid(cube, sizes):
+    # Yields ((width, height), level) from the largest requested size to the smallest. Every
+    # level is filtered from the previous one, so the full resolution faces are read only once.
+    # The halved levels alternate between two float32 buffers sized by the first two of them, so
+    # a level is only valid until the next one is requested; a size equal to the cube's yields the
+    # cube itself, in its own dtype. Sizes larger than the cube (TIFFs of a bake rendered below
+    # 100%) are upsampled from it and do not feed the smaller levels.
+    level = cube
+    buffers = [None, None]
+    halvings = 0
+    for width, height in sorted(set(sizes), reverse=True):
+        if width > level.shape[2] or height > level.shape[1]:
+            yield (width, height), upsample_repeat(level, width, height)
+            continue
+        while level.shape[2] >= 2 * width and level.shape[1] >= 2 * height and level.shape[2] % 2 == 0 and level.shape[1] % 2 == 0:
+            shape = (level.shape[0], level.shape[1] // 2, level.shape[2] // 2, level.shape[3])
+            size = math.prod(shape)
+            if buffers[halvings % 2] is None:
+                buffers[halvings % 2] = np.empty(size, dtype=np.float32)
+            level = downsample_half(level, buffers[halvings % 2][:size].reshape(shape))
+            halvings += 1
+        level = downsample_box(level, width, height)
+        yield (width, height), level
@@ -0,0 +1,70 @@
+import os
+import time
+import subprocess
+from collections import deque
+import numpy as np
+
+
+class ShardError(Exception):
+    def __init__(self, failures, shard_count):
+        self.failures = failures
+        details = "; ".join(f"shard {index}: {reason}" for index, reason in failures)
+        super().__init__(f"{len(failures)} of {shard_count} bake shards failed ({details})")
+
+
+def split_slabs(count, shard_count):
+    # [start, stop) ranges covering range(count) in at most shard_count nearly equal slabs.
+    shard_count = max(1, min(shard_count, count))
+    bounds = np.linspace(0, count, shard_count + 1).round().astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def shard_output_path(folder_path, index):
+    return os.path.join(folder_path, f"shard_{index}.npy")
+
+
+def save_shard(path, results):
+    # Written under a temporary name first, so a worker killed mid-write never leaves a file
+    # the coordinator would take for a finished shard.
+    partial_path = path + ".partial"
+    with open(partial_path, "wb") as file:
+        np.save(file, results)
+    os.replace(partial_path, path)
+
+
+def run_shards(shards, max_workers, retries=1, on_done=None, poll_interval=0.2):
+    # shards: list of (argv, output_path). At most max_workers processes run at once; a shard is
+    # done when its process exits with 0 and its output exists, otherwise it is started again up
+    # to retries more times. Worker output goes to <output_path>.log. Raises ShardError listing
+    # every shard that still failed once the others have finished.
+    pending = deque(range(len(shards)))
+    attempts = [0] * len(shards)
+    running = {}
+    failures = []
+
+    while pending or running:
+        while pending and len(running) < max_workers:
+            index = pending.popleft()
+            argv, output_path = shards[index]
+            attempts[index] += 1
+            with open(output_path + ".log", "w") as log:
+                running[index] = subprocess.Popen(argv, stdout=log, stderr=subprocess.STDOUT)
+
+        time.sleep(poll_interval)
+        for index, process in list(running.items()):
+            exit_code = process.poll()
+            if exit_code is None:
+                continue
+            del running[index]
+            output_path = shards[index][1]
+            if exit_code == 0 and os.path.exists(output_path):
+                if on_done is not None:
+                    on_done(index)
+            elif attempts[index] <= retries:
+                print(f"Bake shard {index} failed with exit code {exit_code}, retrying.")
+                pending.append(index)
+            else:
+                failures.append((index, f"exit code {exit_code} after {attempts[index]} attempts, see {output_path}.log"))
+
+    if failures:
+        raise ShardError(sorted(failures), len(shards))
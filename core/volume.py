@@ -0,0 +1,45 @@
+import os
+import numpy as np
+
+# Above this size (both volumes together) the bake keeps its colors in .npy memmaps next to the
+# output instead of in RAM.
+MEMMAP_THRESHOLD_BYTES = 512 * 1024 * 1024
+
+VOLUME_CHANNELS = 3
+
+
+def volume_shape(num_spheres):
+    num_x_spheres, num_y_spheres, num_z_spheres = num_spheres
+    return (num_z_spheres, num_y_spheres, num_x_spheres, VOLUME_CHANNELS)
+
+
+def volume_nbytes(num_spheres):
+    return int(np.prod(volume_shape(num_spheres))) * np.dtype(np.float32).itemsize
+
+
+def create_volume(num_spheres, path=None):
+    shape = volume_shape(num_spheres)
+    if path is None:
+        return np.empty(shape, dtype=np.float32)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+
+
+def create_amv_volumes(num_spheres, folder_path, name, use_memmap=None):
+    # Volume 0 holds the +X, -X, +Y averages, volume 1 the -Y, +Z, -Z ones, indexed (z, y, x).
+    if use_memmap is None:
+        use_memmap = 2 * volume_nbytes(num_spheres) > MEMMAP_THRESHOLD_BYTES
+    if not use_memmap:
+        return create_volume(num_spheres), create_volume(num_spheres)
+    return tuple(create_volume(num_spheres, os.path.join(folder_path, f"{name}_{index}.npy")) for index in range(2))
+
+
+def release_volume(volume):
+    if isinstance(volume, np.memmap):
+        path = volume.filename
+        volume._mmap.close()
+        os.remove(path)
+
+
+def has_nan(volume):
+    # Checked one z-slice at a time so memmapped volumes never have to be fully resident.
+    return any(np.isnan(volume[z]).any() for z in range(len(volume)))
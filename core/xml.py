@@ -1,4 +1,3 @@
-import bpy
 import xml.etree.ElementTree as ET
 
 def create_xml_file(file_path, zone):
@@ -0,0 +1,209 @@
+import math
+
+# Default edge length of the uniform grid cells, in scene units.
+CELL_SIZE = 8.0
+# Zones covering more cells than this are kept in a list that every query scans instead.
+MAX_ZONE_CELLS = 512
+# Rings of cells nearest walks around a point before scanning the remaining zones directly.
+MAX_NEAREST_RING = 4
+
+
+class PlainZone:
+    # Stand-in for Zone_Properties outside Blender. The index only reads id, name, bb_min and bb_max.
+
+    def __init__(self, id, bb_min, bb_max, name=None):
+        self.id = id
+        self.name = name if name is not None else f"Zone.{id}"
+        self.bb_min = bb_min
+        self.bb_max = bb_max
+
+
+def normalized_bounds(bb_min, bb_max):
+    # Bounds with min <= max on every axis; zones can be drawn either way round.
+    low = tuple(min(a, b) for a, b in zip(bb_min, bb_max))
+    high = tuple(max(a, b) for a, b in zip(bb_min, bb_max))
+    return low, high
+
+
+def zone_bounds(zones):
+    # {zone id: (bb_min, bb_max)} of Zone_Properties or PlainZone items.
+    return {zone.id: normalized_bounds(zone.bb_min, zone.bb_max) for zone in zones}
+
+
+def boxes_overlap(a, b):
+    # Strict overlap; zones that only share a face, as neighbouring rooms do, don't overlap.
+    return all(a[0][axis] < b[1][axis] and b[0][axis] < a[1][axis] for axis in range(3))
+
+
+def box_contains(box, point):
+    return all(box[0][axis] <= point[axis] <= box[1][axis] for axis in range(3))
+
+
+def box_distance(box, point):
+    # Distance from point to the closest point of box, 0 inside.
+    return math.sqrt(sum(max(box[0][axis] - point[axis], 0.0, point[axis] - box[1][axis]) ** 2 for axis in range(3)))
+
+
+class ZoneIndex:
+    # Uniform grid hash over zone bounding boxes, keyed by zone id. Every zone is listed in the cells
+    # its box touches, so point, overlap and nearest queries only look at zones in nearby cells.
+    # update/remove/sync change single zones without rebuilding the index.
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.boxes = {}
+        self.cells = {}
+        self.zone_cells = {}
+        self.oversized = set()
+        self.version = 0
+        self._overlap_cache = None
+
+    def _cell(self, point):
+        return tuple(int(math.floor(value / self.cell_size)) for value in point)
+
+    def _cell_range(self, box):
+        low, high = self._cell(box[0]), self._cell(box[1])
+        return [
+            (x, y, z)
+            for x in range(low[0], high[0] + 1)
+            for y in range(low[1], high[1] + 1)
+            for z in range(low[2], high[2] + 1)
+        ]
+
+    def _cell_count(self, box):
+        low, high = self._cell(box[0]), self._cell(box[1])
+        return math.prod(high[axis] - low[axis] + 1 for axis in range(3))
+
+    def update(self, key, bb_min, bb_max):
+        # Inserts the zone, or moves it when its bounds changed. Returns whether anything changed.
+        box = normalized_bounds(bb_min, bb_max)
+        if self.boxes.get(key) == box:
+            return False
+        self.remove(key)
+        self.boxes[key] = box
+        if self._cell_count(box) > MAX_ZONE_CELLS:
+            self.oversized.add(key)
+        else:
+            cells = self._cell_range(box)
+            for cell in cells:
+                self.cells.setdefault(cell, set()).add(key)
+            self.zone_cells[key] = cells
+        self._changed()
+        return True
+
+    def remove(self, key):
+        if key not in self.boxes:
+            return False
+        del self.boxes[key]
+        self.oversized.discard(key)
+        for cell in self.zone_cells.pop(key, ()):
+            keys = self.cells[cell]
+            keys.discard(key)
+            if not keys:
+                del self.cells[cell]
+        self._changed()
+        return True
+
+    def sync(self, bounds):
+        # bounds: {key: (bb_min, bb_max)} of every zone, e.g. from zone_bounds. Only added, moved
+        # and removed zones are touched; returns their keys.
+        changed = {key for key in list(self.boxes) if key not in bounds and self.remove(key)}
+        for key, (bb_min, bb_max) in bounds.items():
+            if self.update(key, bb_min, bb_max):
+                changed.add(key)
+        return changed
+
+    def _changed(self):
+        self.version += 1
+        self._overlap_cache = None
+
+    def _candidates(self, cells):
+        keys = set(self.oversized)
+        for cell in cells:
+            keys.update(self.cells.get(cell, ()))
+        return keys
+
+    def query_point(self, point):
+        # Keys of the zones containing point.
+        return sorted(key for key in self._candidates([self._cell(point)]) if box_contains(self.boxes[key], point))
+
+    def overlapping(self, key):
+        # Keys of the zones overlapping zone key.
+        box = self.boxes[key]
+        candidates = self._candidates(self.zone_cells.get(key, ())) if key not in self.oversized else set(self.boxes)
+        return sorted(other for other in candidates if other != key and boxes_overlap(box, self.boxes[other]))
+
+    def overlapping_pairs(self):
+        # Sorted (key, other key) pairs of overlapping zones, cached until a zone changes.
+        if self._overlap_cache is None:
+            pairs = set()
+            groups = list(self.cells.values())
+            groups.extend({key} | set(self.boxes) for key in self.oversized)
+            for keys in groups:
+                keys = sorted(keys)
+                for i, key in enumerate(keys):
+                    for other in keys[i + 1:]:
+                        if boxes_overlap(self.boxes[key], self.boxes[other]):
+                            pairs.add((key, other))
+            self._overlap_cache = sorted(pairs)
+        return self._overlap_cache
+
+    def overlapping_keys(self):
+        return {key for pair in self.overlapping_pairs() for key in pair}
+
+    def _ring(self, center, ring):
+        # Cells at Chebyshev distance ring from center.
+        if ring == 0:
+            return [center]
+        cx, cy, cz = center
+        cells = []
+        for x in range(-ring, ring + 1):
+            for y in range(-ring, ring + 1):
+                z_range = range(-ring, ring + 1) if abs(x) == ring or abs(y) == ring else (-ring, ring)
+                cells.extend((cx + x, cy + y, cz + z) for z in z_range)
+        return cells
+
+    def nearest(self, point):
+        # (key, distance) of the zone closest to point (0 inside it), or None without zones.
+        # Cells are visited ring by ring around the point's cell, stopping once no further ring can
+        # hold anything closer; past MAX_NEAREST_RING the remaining zones are scanned directly.
+        if not self.boxes:
+            return None
+        best = None
+        seen = set(self.oversized)
+        for key in self.oversized:
+            distance = box_distance(self.boxes[key], point)
+            if best is None or distance < best[1]:
+                best = (key, distance)
+
+        center = self._cell(point)
+        ring = 0
+        while len(seen) < len(self.boxes):
+            # Anything in ring r or further is at least (r - 1) cells away.
+            if best is not None and best[1] <= (ring - 1) * self.cell_size:
+                break
+            if ring > MAX_NEAREST_RING:
+                keys = self.boxes.keys() - seen
+            else:
+                keys = [key for cell in self._ring(center, ring) for key in self.cells.get(cell, ()) if key not in seen]
+            for key in keys:
+                if key in seen:
+                    continue
+                seen.add(key)
+                distance = box_distance(self.boxes[key], point)
+                if best is None or distance < best[1]:
+                    best = (key, distance)
+            ring += 1
+        return best
+
+
+# One index per scene, kept between calls so redraws only re-insert zones whose bounds changed.
+_scene_indexes = {}
+
+
+def scene_zone_index(scene):
+    index = _scene_indexes.get(scene.name)
+    if index is None:
+        index = _scene_indexes[scene.name] = ZoneIndex()
+    index.sync(zone_bounds(scene.zones))
+    return index
@@ -1,69 +1,48 @@
 import bpy
 from bpy.types import Gizmo, GizmoGroup
-from mathutils import Vector
+import numpy as np
 
 from .main import get_selected_zone
+from .core.zone_index import scene_zone_index
 
-def get_verts(bbmin, bbmax):
-    return [
-        bbmin,
-        Vector((bbmin.x, bbmin.y, bbmax.z)),
+# The 12 edges of a box as pairs of corners; per axis 0 takes bb_min, 1 takes bb_max.
+BOX_EDGES = np.array([
+    ((0, 0, 0), (1, 0, 0)), ((0, 1, 0), (1, 1, 0)), ((0, 0, 1), (1, 0, 1)), ((0, 1, 1), (1, 1, 1)),
+    ((0, 0, 0), (0, 1, 0)), ((1, 0, 0), (1, 1, 0)), ((0, 0, 1), (0, 1, 1)), ((1, 0, 1), (1, 1, 1)),
+    ((0, 0, 0), (0, 0, 1)), ((1, 0, 0), (1, 0, 1)), ((0, 1, 0), (0, 1, 1)), ((1, 1, 0), (1, 1, 1)),
+], dtype=bool).reshape(24, 3)
 
-        bbmin,
-        Vector((bbmax.x, bbmin.y, bbmin.z)),
 
-        bbmin,
-        Vector((bbmin.x, bbmax.y, bbmin.z)),
+def box_lines(bb_min, bb_max):
+    # LINES vertices of one box per row of the (N, 3) bounds, as a single (N * 24, 3) array.
+    bb_min = np.asarray(bb_min, dtype=np.float32).reshape(-1, 1, 3)
+    bb_max = np.asarray(bb_max, dtype=np.float32).reshape(-1, 1, 3)
+    return np.where(BOX_EDGES, bb_max, bb_min).reshape(-1, 3)
 
-        Vector((bbmax.x, bbmin.y, bbmax.z)),
-        Vector((bbmax.x, bbmin.y, bbmin.z)),
-
-        Vector((bbmin.x, bbmin.y, bbmax.z)),
-        Vector((bbmin.x, bbmax.y, bbmax.z)),
-
-        Vector((bbmin.x, bbmax.y, bbmin.z)),
-        Vector((bbmin.x, bbmax.y, bbmax.z)),
-
-        Vector((bbmax.x, bbmin.y, bbmax.z)),
-        Vector((bbmax.x, bbmin.y, bbmax.z)),
-
-        Vector((bbmax.x, bbmin.y, bbmax.z)),
-        Vector((bbmin.x, bbmin.y, bbmax.z)),
-
-        Vector((bbmax.x, bbmin.y, bbmin.z)),
-        Vector((bbmax.x, bbmax.y, bbmin.z)),
-
-        Vector((bbmin.x, bbmax.y, bbmin.z)),
-        Vector((bbmax.x, bbmax.y, bbmin.z)),
-
-        Vector((bbmax.x, bbmin.y, bbmax.z)),
-        bbmax,
-
-        Vector((bbmin.x, bbmax.y, bbmax.z)),
-        bbmax,
-
-        Vector((bbmax.x, bbmax.y, bbmin.z)),
-        bbmax
-    ]
 
 class BoundingBoxGizmo(bpy.types.Gizmo):
     bl_idname = "OBJECT_GT_bounding_box"
 
     def __init__(self):
         super().__init__()
-        self.linked_zone = None
+        self.shape_key = None
 
     def draw(self, context):
-        obj = context.active_object
-        if obj:
-            box = self.linked_zone.interval/2
-            for obj in context.selected_objects:
-                self.color = 0.9, 0.55, 0.55
-                self.use_draw_scale = False
-                bb_min = obj.location - Vector((box,box,box))
-                bb_max = obj.location + Vector((box,box,box))
-                self.custom_shape = self.new_custom_shape("LINES", get_verts(bb_min, bb_max))
-                self.draw_custom_shape(self.custom_shape)
+        # Boxes of every selected probe in one shape, only rebuilt when the selection, a selected
+        # probe or the zone interval changed.
+        zone = get_selected_zone(context)
+        if zone is None:
+            return
+        centers = tuple(tuple(obj.matrix_world.translation) for obj in context.selected_objects)
+        if not centers:
+            return
+        key = (zone.interval, centers)
+        if key != self.shape_key:
+            half = zone.interval / 2
+            lines = box_lines(np.array(centers) - half, np.array(centers) + half)
+            self.custom_shape = self.new_custom_shape("LINES", lines.tolist())
+            self.shape_key = key
+        self.draw_custom_shape(self.custom_shape)
         
 
 class BoundingBoxGizmoGroup(bpy.types.GizmoGroup):
@@ -79,14 +58,9 @@ class BoundingBoxGizmoGroup(bpy.types.GizmoGroup):
         return obj and obj.type == 'MESH' and 'probe' in obj.name.lower()
 
     def setup(self, context):
-        pass
-
-    def draw_prepare(self, context):
-        selected_zone = get_selected_zone(context)
-        self.gizmos.clear()
-        for obj in context.selected_objects:
-            bbox_gizmo = self.gizmos.new("OBJECT_GT_bounding_box")
-            bbox_gizmo.linked_zone = selected_zone
+        bbox_gizmo = self.gizmos.new(BoundingBoxGizmo.bl_idname)
+        bbox_gizmo.color = 0.9, 0.55, 0.55
+        bbox_gizmo.use_draw_scale = False
 
 
 
@@ -96,22 +70,29 @@ class ZoneGizmo(bpy.types.Gizmo):
 
     def __init__(self):
         super().__init__()
-        self.linked_zone = None
+        self.zone_index = 0
+        self.overlapping = False
+        self.shape_key = None
 
     def draw(self, context):
-        selected_zone = get_selected_zone(context)
-        
-        zone = self.linked_zone
+        zones = context.scene.zones
+        if self.zone_index >= len(zones):
+            return
+        zone = zones[self.zone_index]
 
-        self.color = 0.31, 0.38, 1
+        self.color = (1, 0.45, 0.2) if self.overlapping else (0.31, 0.38, 1)
         self.alpha = 0.7
         self.use_draw_scale = False
 
-        if zone == selected_zone:
+        if self.zone_index == context.scene.zone_index:
             self.color = self.color * 2
             self.alpha = 0.9
 
-        self.custom_shape = self.new_custom_shape("LINES", get_verts(zone.bb_min, zone.bb_max))
+        # The shape is only rebuilt when the zone bounds or interval changed.
+        key = (tuple(zone.bb_min), tuple(zone.bb_max), zone.interval)
+        if key != self.shape_key:
+            self.custom_shape = self.new_custom_shape("LINES", box_lines(zone.bb_min, zone.bb_max).tolist())
+            self.shape_key = key
         self.draw_custom_shape(self.custom_shape)
 
 
@@ -133,11 +114,18 @@ class ZoneGizmoGroup(bpy.types.GizmoGroup):
         pass
 
     def draw_prepare(self, context):
+        # One gizmo per zone, kept between redraws; only adding or removing zones recreates them.
         zones = context.scene.zones
-        self.gizmos.clear()
-        for zone in zones:
-            gz = self.gizmos.new(ZoneGizmo.bl_idname)
-            gz.linked_zone = zone
+        if len(self.gizmos) != len(zones):
+            self.gizmos.clear()
+            for index in range(len(zones)):
+                gz = self.gizmos.new(ZoneGizmo.bl_idname)
+                gz.zone_index = index
+
+        # Zones overlapping another one are drawn in orange.
+        overlapping = scene_zone_index(context.scene).overlapping_keys()
+        for gz, zone in zip(self.gizmos, zones):
+            gz.overlapping = zone.id in overlapping
 
 classes = (
     BoundingBoxGizmo,
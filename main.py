@@ -3,7 +3,10 @@ import numpy as np
 import time
 from mathutils import Vector, Quaternion
 
-from .utils import draw_list_with_add_remove , bbox_center, rotate_bbox, bbox_dimensions, get_new_item_id, update_light_strength, get_selected_vertices, gen_hash, compute_probe_hash
+from .core.bcn import QUALITY_FAST, QUALITY_HIGH
+from .utils import draw_list_with_add_remove , get_new_item_id, update_light_strength, get_selected_vertices
+from .core.grid import bbox_center, rotate_bbox, bbox_dimensions
+from .core.hashing import gen_hash, compute_probe_hash
 
 
 class AMV_PT_Tools(bpy.types.Panel):
@@ -49,6 +52,9 @@ class AMV_PT_Tools(bpy.types.Panel):
         pie = row.menu_pie()
         pie.operator("amv.save_probes", icon="FILE_TICK")
         pie.operator("amv.clear_probes", icon="TRASH")
+        row = list_col.row()
+        row.prop(context.scene, "probe_display_mode", text="")
+        row.operator("amv.realize_probes", text="Realize Selected")
         
         
 
@@ -181,6 +187,37 @@ class AMV_PT_General_Tools(bpy.types.Panel):
         row.operator("amv.setup_light", text="Setup Light", icon="LIGHT")
         row.prop(context.scene, "light_strength", text="Strength")
         layout.prop(context.scene, "bounces", text="Bounces")
+        row = layout.row()
+        row.prop(context.scene, "bake_engine", text="Engine")
+        if context.scene.bake_engine == 'RAYCAST':
+            row.prop(context.scene, "raycast_samples", text="Samples")
+        row = layout.row()
+        row.operator("amv.compare_bake_engines", text="Compare Engines")
+        row.prop(context.scene, "compare_probe_count", text="Probes")
+        row = layout.row()
+        row.prop(context.scene, "bake_mode", text="Bake Mode")
+        if context.scene.bake_mode != 'SINGLE':
+            row.prop(context.scene, "bake_batch_slices", text="Slices")
+        row = layout.row()
+        row.operator("amv.compare_bake_modes", text="Compare Bake Modes")
+        layout.prop(context.scene, "resume_bake", text="Resume From Checkpoints")
+        layout.prop(context.scene, "adaptive_probes", text="Skip Probes Outside Rooms")
+        row = layout.row()
+        row.prop(context.scene, "use_bake_cache", text="Bake Cache")
+        row.prop(context.scene, "bake_cache_size", text="Size (MB)")
+        if context.scene.use_bake_cache:
+            row = layout.row()
+            row.prop(context.scene, "incremental_bake", text="Incremental")
+            row.prop(context.scene, "incremental_radius", text="Radius")
+        if context.scene.bake_mode == 'SHARDED':
+            row = layout.row()
+            row.prop(context.scene, "bake_workers", text="Workers")
+            row.prop(context.scene, "bake_shard_retries", text="Retries")
+        row = layout.row()
+        row.prop(context.scene, "reflection_render_mode", text="Probe Render")
+        row.prop(context.scene, "save_probe_intermediates", text="Save Faces")
+        layout.prop(context.scene, "probe_encode_quality", text="Probe Encoding")
+        layout.prop(context.scene, "encode_workers", text="Encode Workers")
 
         layout.use_property_split = True
         layout.prop(context.scene, "output_directory", text="Output Directory")
@@ -300,6 +337,13 @@ def update_probes_offset(self, context):
     selected_zone = get_selected_zone(context)
     offset = selected_zone.offset
 
+    offset_empty = bpy.data.objects.get('Offset-' + selected_zone.name)
+    if offset_empty is not None:
+        # Probes are parented to the zone's offset empty, one transform update moves all of them.
+        offset_empty.location = offset
+        return
+
+    # Probes displayed before the offset empty existed carry their own applied offset.
     collection_name = 'Probes-'+ selected_zone.name
 
     if collection_name in bpy.data.collections:
@@ -326,7 +370,8 @@ class Zone_Properties(bpy.types.PropertyGroup):
 
     id: bpy.props.IntProperty(name="Id")
     size: bpy.props.IntVectorProperty(name="Size", default=(0, 0, 0))
-    probes_location_3d: bpy.props.StringProperty(name="Probes Location 3D Array", default="[]")
+    # Compact float32 encoding, see probe_locations.py.
+    probes_location_3d: bpy.props.StringProperty(name="Probes Location 3D Array", default="")
 
 
 classes = (
@@ -358,6 +403,60 @@ def register():
     bpy.types.Scene.zone_index = bpy.props.IntProperty(name="Zone Index", default=0)
     bpy.types.Scene.proggress = bpy.props.StringProperty(default="Bake AMV")
     bpy.types.Scene.bounces = bpy.props.IntProperty(name="Bounces", default=0)
+    bpy.types.Scene.probe_display_mode = bpy.props.EnumProperty(
+        name="Probe Display",
+        items=[
+            ('INSTANCED', "Instanced", "Draw the probes as geometry node instances of one point cloud, select points in edit mode and realize them to move them"),
+            ('REAL', "Real Objects", "Create a sphere object per probe, slow above a few thousand probes"),
+        ],
+        default='INSTANCED',
+    )
+    bpy.types.Scene.bake_engine = bpy.props.EnumProperty(
+        name="Bake Engine",
+        items=[
+            ('CYCLES', "Cycles", "Bake a probe sphere per probe in Cycles"),
+            ('RAYCAST', "Ray-cast", "Estimate the probes by casting rays against the scene, much faster but only uses untextured material colors"),
+        ],
+        default='CYCLES',
+    )
+    bpy.types.Scene.raycast_samples = bpy.props.IntProperty(name="Ray-cast Samples", description="Rays cast around every probe by the ray-cast engine", default=128, min=8)
+    bpy.types.Scene.compare_probe_count = bpy.props.IntProperty(name="Compared Probes", description="Random probes of the zone baked both ways by Compare Engines and Compare Bake Modes", default=16, min=1)
+    bpy.types.Scene.bake_mode = bpy.props.EnumProperty(
+        name="Bake Mode",
+        items=[
+            ('BATCHED', "Batched", "Bake every probe of a z-slice in one Cycles bake"),
+            ('SINGLE', "Per Probe", "Bake one probe at a time"),
+            ('SHARDED', "Sharded", "Split the z-slices over background Blender processes, each baking batched"),
+        ],
+        default='SINGLE',
+    )
+    bpy.types.Scene.bake_batch_slices = bpy.props.IntProperty(name="Slices Per Bake", default=1, min=1)
+    bpy.types.Scene.resume_bake = bpy.props.BoolProperty(name="Resume Bake", description="Reuse the z-slices checkpointed by an interrupted bake with the same settings", default=True)
+    bpy.types.Scene.adaptive_probes = bpy.props.BoolProperty(name="Adaptive Probes", description="Only bake probes in empty interior space, fill the ones inside walls or outside the shell from their nearest baked neighbours", default=False)
+    bpy.types.Scene.use_bake_cache = bpy.props.BoolProperty(name="Bake Cache", description="Reuse the AMV volumes of an earlier bake of the same geometry with the same settings", default=False)
+    bpy.types.Scene.bake_cache_size = bpy.props.IntProperty(name="Bake Cache Size", description="Size in MB above which the least recently used cached bakes are removed", default=4096, min=0)
+    bpy.types.Scene.incremental_bake = bpy.props.BoolProperty(name="Incremental Bake", description="Start from the last cached bake of the zone and only re-bake probes near changed meshes", default=False)
+    bpy.types.Scene.incremental_radius = bpy.props.FloatProperty(name="Incremental Radius", description="Probes closer than this to a changed mesh are baked again", default=2.0, min=0.0, subtype='DISTANCE')
+    bpy.types.Scene.bake_workers = bpy.props.IntProperty(name="Bake Workers", description="Background Blender processes for sharded bakes, 0 uses every CPU core", default=0, min=0)
+    bpy.types.Scene.bake_shard_retries = bpy.props.IntProperty(name="Shard Retries", description="How many times a failed shard is baked again", default=1, min=0)
+    bpy.types.Scene.reflection_render_mode = bpy.props.EnumProperty(
+        name="Probe Render",
+        items=[
+            ('SINGLE', "Single Render", "Render every pass of a face at once into a multilayer EXR"),
+            ('PER_PASS', "Per Pass", "Render each pass separately through the compositor, like the original bake"),
+        ],
+        default='SINGLE',
+    )
+    bpy.types.Scene.save_probe_intermediates = bpy.props.BoolProperty(name="Save Probe Faces", description="Also write the rendered faces as TIFFs next to the bake, for debugging", default=False)
+    bpy.types.Scene.probe_encode_quality = bpy.props.EnumProperty(
+        name="Probe Encoding",
+        items=[
+            (QUALITY_FAST, "Fast", "Range fit BC3 compression"),
+            (QUALITY_HIGH, "High", "Range fit refined with least-squares passes, slower"),
+        ],
+        default=QUALITY_FAST,
+    )
+    bpy.types.Scene.encode_workers = bpy.props.IntProperty(name="Encode Workers", description="Parallel texture encode jobs, 0 uses every CPU core", default=0, min=0)
 
     bpy.types.Scene.door_uuid = bpy.props.StringProperty(name="Door UUID", default="00000000000000000000")
     bpy.types.Scene.door_model_name = bpy.props.StringProperty(name="Door Model Name")
@@ -375,6 +474,24 @@ def unregister():
     del bpy.types.Scene.light_strength
     del bpy.types.Scene.zones
     del bpy.types.Scene.zone_index
+    del bpy.types.Scene.probe_display_mode
+    del bpy.types.Scene.bake_engine
+    del bpy.types.Scene.raycast_samples
+    del bpy.types.Scene.compare_probe_count
+    del bpy.types.Scene.bake_mode
+    del bpy.types.Scene.bake_batch_slices
+    del bpy.types.Scene.resume_bake
+    del bpy.types.Scene.adaptive_probes
+    del bpy.types.Scene.use_bake_cache
+    del bpy.types.Scene.bake_cache_size
+    del bpy.types.Scene.incremental_bake
+    del bpy.types.Scene.incremental_radius
+    del bpy.types.Scene.bake_workers
+    del bpy.types.Scene.bake_shard_retries
+    del bpy.types.Scene.reflection_render_mode
+    del bpy.types.Scene.save_probe_intermediates
+    del bpy.types.Scene.probe_encode_quality
+    del bpy.types.Scene.encode_workers
 
 
 if __name__ == "__main__":
@@ -1,10 +1,151 @@
 import bpy
 import bmesh
 import numpy as np
-import json
+from bpy.app.handlers import persistent
 
 from .main import  get_selected_zone
-from .utils import calculate_sphere_counts 
+from .core.grid import calculate_sphere_counts
+from .core.probe_locations import get_probe_locations, set_probe_locations, migrate_zone_locations
+
+PROBE_INSTANCES_GROUP = "AMV Probe Instances"
+# Point attribute of the instance cloud marking probes that were realized for editing.
+REALIZED_ATTRIBUTE = "realized"
+SPHERE_SEGMENTS = 32
+SPHERE_RING_COUNT = 16
+
+
+def probe_instances_name(zone):
+    return "Instances-" + zone.name
+
+
+def get_probe_instances(zone):
+    return bpy.data.objects.get(probe_instances_name(zone))
+
+
+def create_offset_empty(zone, probes_collection):
+    # Every displayed probe is parented to this empty; update_probes_offset moves only the empty.
+    empty = bpy.data.objects.new("Offset-" + zone.name, None)
+    empty.empty_display_type = 'PLAIN_AXES'
+    empty.empty_display_size = zone.interval / 2
+    probes_collection.objects.link(empty)
+    return empty
+
+
+def grid_positions(zone, num_spheres):
+    # (nz * ny * nx, 3) regular grid from bb_min, z slowest, without the zone offset.
+    num_x_spheres, num_y_spheres, num_z_spheres = num_spheres
+    z, y, x = np.mgrid[0:num_z_spheres, 0:num_y_spheres, 0:num_x_spheres]
+    positions = np.stack([x, y, z], axis=-1).reshape(-1, 3) * zone.interval + np.array(zone.bb_min)
+    return positions.astype(np.float32)
+
+
+def probe_instances_group():
+    # Geometry nodes instancing a UV sphere on every point of the cloud that is not realized.
+    group = bpy.data.node_groups.get(PROBE_INSTANCES_GROUP)
+    if group is not None:
+        return group
+
+    group = bpy.data.node_groups.new(PROBE_INSTANCES_GROUP, 'GeometryNodeTree')
+    group.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    group.interface.new_socket(name="Radius", in_out='INPUT', socket_type='NodeSocketFloat')
+    group.interface.new_socket(name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    nodes, links = group.nodes, group.links
+
+    group_input = nodes.new('NodeGroupInput')
+    group_output = nodes.new('NodeGroupOutput')
+    sphere = nodes.new('GeometryNodeMeshUVSphere')
+    sphere.inputs["Segments"].default_value = SPHERE_SEGMENTS
+    sphere.inputs["Rings"].default_value = SPHERE_RING_COUNT
+    smooth = nodes.new('GeometryNodeSetShadeSmooth')
+    realized = nodes.new('GeometryNodeInputNamedAttribute')
+    realized.data_type = 'BOOLEAN'
+    realized.inputs["Name"].default_value = REALIZED_ATTRIBUTE
+    not_realized = nodes.new('FunctionNodeBooleanMath')
+    not_realized.operation = 'NOT'
+    instance = nodes.new('GeometryNodeInstanceOnPoints')
+
+    links.new(group_input.outputs["Radius"], sphere.inputs["Radius"])
+    links.new(sphere.outputs["Mesh"], smooth.inputs["Geometry"])
+    links.new(realized.outputs["Attribute"], not_realized.inputs[0])
+    links.new(group_input.outputs["Geometry"], instance.inputs["Points"])
+    links.new(not_realized.outputs[0], instance.inputs["Selection"])
+    links.new(smooth.outputs["Geometry"], instance.inputs["Instance"])
+    links.new(instance.outputs["Instances"], group_output.inputs["Geometry"])
+    return group
+
+
+def create_probe_instances(zone, probes_collection, positions, parent):
+    # One point cloud object drawing every probe as a GPU instance, instead of a real object each.
+    mesh = bpy.data.meshes.new(probe_instances_name(zone))
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(positions, dtype=np.float32).ravel())
+    mesh.attributes.new(REALIZED_ATTRIBUTE, 'BOOLEAN', 'POINT')
+    mesh.update()
+
+    obj = bpy.data.objects.new(probe_instances_name(zone), mesh)
+    probes_collection.objects.link(obj)
+    modifier = obj.modifiers.new("Probes", 'NODES')
+    group = probe_instances_group()
+    modifier.node_group = group
+    modifier[group.interface.items_tree["Radius"].identifier] = zone.sphere_radius
+    obj.parent = parent
+    return obj
+
+
+def create_probe_sphere_mesh(sphere_radius):
+    mesh = bpy.data.meshes.new("Probe")
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(bm, u_segments=SPHERE_SEGMENTS, v_segments=SPHERE_RING_COUNT, radius=sphere_radius)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.polygons.foreach_set("use_smooth", np.ones(len(mesh.polygons), dtype=bool))
+    return mesh
+
+
+def create_probe_objects(probes_collection, positions, sphere_radius, parent):
+    # Real Objects display: one sphere object per probe, all sharing one mesh. grid_index keeps
+    # the link to the probe grid, whatever order the collection lists the objects in.
+    sphere_mesh = create_probe_sphere_mesh(sphere_radius)
+    for index, location in enumerate(positions.tolist()):
+        obj = bpy.data.objects.new(f"Probe-{index}", sphere_mesh)
+        obj.location = location
+        obj.parent = parent
+        obj["grid_index"] = index
+        probes_collection.objects.link(obj)
+
+
+def read_probe_locations(zone, probes_collection):
+    # (count, 3) world space locations in grid order and a mask of the probes that were found: the
+    # instance cloud first, then every probe object by its grid_index. World matrices include the
+    # offset empty, so the view layer must be up to date.
+    count = zone.size[0] * zone.size[1] * zone.size[2]
+    locations = np.zeros((count, 3), dtype=np.float64)
+    found = np.zeros(count, dtype=bool)
+    instances = get_probe_instances(zone)
+    if instances is not None:
+        locations[:] = read_instance_locations(instances)
+        found[:] = True
+
+    objects = [obj for obj in probes_collection.objects if "grid_index" in obj]
+    if objects:
+        indices = np.fromiter((obj["grid_index"] for obj in objects), dtype=np.int64, count=len(objects))
+        locations[indices] = [tuple(obj.matrix_world.translation) for obj in objects]
+        found[indices] = True
+    elif instances is None:
+        # Probes displayed before grid indices existed follow the collection order.
+        objects = [obj for obj in probes_collection.objects if obj.type == 'MESH'][:count]
+        locations[:len(objects)] = [tuple(obj.location) for obj in objects]
+        found[:len(objects)] = True
+    return locations, found
+
+
+def read_instance_locations(instances):
+    # World space locations of every point of the instance cloud, in grid order.
+    mesh = instances.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", co)
+    matrix = np.array(instances.matrix_world, dtype=np.float64)
+    return co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
 
 class AMV_OT_DisplayProbes(bpy.types.Operator):
     bl_idname = "amv.display_probes"
@@ -39,70 +180,26 @@ class AMV_OT_DisplayProbes(bpy.types.Operator):
             probes_collection = bpy.data.collections.new(collection_name)
             bpy.context.scene.collection.children.link(probes_collection)
 
-        bpy.ops.mesh.primitive_uv_sphere_add(segments=32, ring_count=16, radius=sphere_radius)
-        orig_sphere = bpy.context.active_object
-        orig_sphere.name = "Probe"
-        obj_old_coll = orig_sphere.users_collection
-        probes_collection.objects.link(orig_sphere)
-        
-        for ob in obj_old_coll:
-            ob.objects.unlink(orig_sphere)
-
- 
-        bpy.ops.mesh.primitive_plane_add()
-        plane = bpy.context.active_object
-        obj_old_coll = plane.users_collection
-        probes_collection.objects.link(plane)
-        for ob in obj_old_coll:
-            ob.objects.unlink(plane)
-        bpy.context.object.instance_type = 'VERTS'
-        me = plane.data
-        bm = bmesh.new()
-
-        probes_location_3d = json.loads(zone.probes_location_3d)
-
-        if len(probes_location_3d) > 0:
-            for i in range(num_z_spheres):
-                for j in range(num_y_spheres):
-                    for k in range(num_x_spheres):
-                        x = probes_location_3d[i][j][k][0]
-                        y = probes_location_3d[i][j][k][1]
-                        z = probes_location_3d[i][j][k][2]
-                        bm.verts.new().co = (x, y, z)
+        probes_location_3d = get_probe_locations(zone)
+        zone.size = (num_x_spheres, num_y_spheres, num_z_spheres)
 
+        if probes_location_3d is not None:
+            positions = probes_location_3d.reshape(-1, 3)
         else:
-            for i in range(num_z_spheres):
-                for j in range(num_y_spheres):
-                    for k in range(num_x_spheres):
-                        x = zone.bb_min[0] + k * interval
-                        y = zone.bb_min[1] + j * interval
-                        z = zone.bb_min[2] + i * interval
-                        bm.verts.new().co = (x, y, z)
-              
-
-        bm.to_mesh(me)
-
-        orig_sphere.parent = plane
-        bpy.ops.object.duplicates_make_real()
-        bpy.data.objects.remove(plane, do_unlink=True)
-        bpy.data.objects.remove(orig_sphere, do_unlink=True)
+            positions = grid_positions(zone, (num_x_spheres, num_y_spheres, num_z_spheres))
 
-        zone.size = (num_x_spheres, num_y_spheres, num_z_spheres)
-        
-        bpy.ops.object.shade_smooth()  
-         
-        for obj in bpy.context.selected_objects:
-            if obj.type == 'MESH':
-                obj["offset"] = (0, 0, 0)
-                
-        if len(probes_location_3d) > 0:
+        offset_empty = create_offset_empty(zone, probes_collection)
+        if context.scene.probe_display_mode == 'INSTANCED':
+            create_probe_instances(zone, probes_collection, positions, offset_empty)
+        else:
+            create_probe_objects(probes_collection, positions, sphere_radius, offset_empty)
+
+        if probes_location_3d is not None:
             zone.offset = (0.0,0.0,0.0)
         else:
             start_offset = interval/2
             zone.offset = (start_offset,start_offset,start_offset)
-                
-  
-     
+
         return {'FINISHED'}
     
 
@@ -150,24 +247,69 @@ class AMV_OT_SaveProbesLocation(bpy.types.Operator):
     def execute(self, context):
         zone = get_selected_zone(context) 
 
-        probes_location_3d = []
         size = zone.size
+        probes_collection = bpy.data.collections.get('Probes-' + zone.name)
 
-        probes_location_3d = [[[0 for k in range(size[0])] for j in range(size[1])] for i in range(size[2])]
+        context.view_layer.update()
+        locations, found = read_probe_locations(zone, probes_collection)
+        if not found.all():
+            self.report({'ERROR'}, f"{np.count_nonzero(~found)} probes are missing from {probes_collection.name}")
+            return {'CANCELLED'}
+
+        set_probe_locations(zone, locations.reshape(size[2], size[1], size[0], 3))
+        return {'FINISHED'}
 
-        collection_name = 'Probes-' + zone.name
-        if collection_name in bpy.data.collections:
-            probes_collection = bpy.data.collections.get(collection_name)
 
-        index = 0
-        for i in range(size[2]):
-            for j in range(size[1]):
-                for k in range(size[0]):
-                    location = probes_collection.objects[index].location
-                    probes_location_3d[i][j][k] = [location[0], location[1], location[2]]
-                    index += 1
+class AMV_OT_RealizeProbes(bpy.types.Operator):
+    bl_idname = "amv.realize_probes"
+    bl_label = "Realize Selected Probes"
 
-        zone.probes_location_3d = json.dumps(probes_location_3d)
+    @classmethod
+    def poll(cls, context):
+        zone = get_selected_zone(context)
+        if zone is None:
+            return False
+        instances = get_probe_instances(zone)
+        return instances is not None and context.active_object == instances
+
+    def execute(self, context):
+        # Turns the probes selected in edit mode on the instance cloud into real sphere objects
+        # that can be moved; their instances are hidden and Save Probes reads them back by grid index.
+        zone = get_selected_zone(context)
+        instances = get_probe_instances(zone)
+        probes_collection = bpy.data.collections.get('Probes-' + zone.name)
+        if instances.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+        mesh = instances.data
+        selected = np.empty(len(mesh.vertices), dtype=bool)
+        mesh.vertices.foreach_get("select", selected)
+        realized = np.empty(len(mesh.vertices), dtype=bool)
+        mesh.attributes[REALIZED_ATTRIBUTE].data.foreach_get("value", realized)
+        indices = np.flatnonzero(selected & ~realized)
+        if len(indices) == 0:
+            self.report({'WARNING'}, "No unrealized probes selected")
+            return {'CANCELLED'}
+
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+        sphere_mesh = create_probe_sphere_mesh(zone.sphere_radius)
+        for obj in context.selected_objects:
+            obj.select_set(False)
+        for index in indices.tolist():
+            obj = bpy.data.objects.new("Probe", sphere_mesh)
+            # Same parent as the cloud, so the local point position is the object location.
+            obj.location = co[index]
+            obj.parent = instances.parent
+            obj["grid_index"] = index
+            probes_collection.objects.link(obj)
+            obj.select_set(True)
+            context.view_layer.objects.active = obj
+
+        realized[indices] = True
+        mesh.attributes[REALIZED_ATTRIBUTE].data.foreach_set("value", realized)
+        mesh.update()
         return {'FINISHED'}
 
 
@@ -184,7 +326,7 @@ class AMV_OT_ClearProbesLocation(bpy.types.Operator):
 
     def execute(self, context):
         zone = get_selected_zone(context) 
-        zone.probes_location_3d = "[]"
+        set_probe_locations(zone, None)
         return {'FINISHED'}
 
 
@@ -193,15 +335,29 @@ classes = (
     AMV_OT_DisplayProbes,
     AMV_OT_DeleteProbes,
     AMV_OT_SaveProbesLocation,
+    AMV_OT_RealizeProbes,
     AMV_OT_ClearProbesLocation,
      
 )
   
 
+@persistent
+def migrate_probe_locations(_):
+    # One-way: scenes saved with the JSON probe locations are rewritten in the compact format.
+    migrated = 0
+    for scene in bpy.data.scenes:
+        for zone in scene.zones:
+            migrated += migrate_zone_locations(zone)
+    if migrated:
+        print(f"Migrated the saved probe locations of {migrated} zones.")
+
+
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    bpy.app.handlers.load_post.append(migrate_probe_locations)
 
 def unregister():
+    bpy.app.handlers.load_post.remove(migrate_probe_locations)
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
\ No newline at end of file
@@ -0,0 +1,185 @@
+import math
+import random
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+from .cells import scene_mesh_polygons
+from .core.hemisphere import hemisphere_masks
+from .core.irradiance import stratified_sphere_directions, sphere_normals, hemisphere_cosine_weights
+
+RAY_EPSILON = 1e-4
+# Albedo of faces without a material, as Cycles renders them.
+DEFAULT_ALBEDO = 0.8
+
+
+def grey(color):
+    # The six hemisphere averages are RGB means, so the estimator only carries grey values.
+    return sum(tuple(color)[:3]) / 3.0
+
+
+def cosine_direction(normal, rng):
+    u1, u2 = rng.random(), rng.random()
+    r = math.sqrt(u1)
+    phi = 2.0 * math.pi * u2
+    tangent = normal.orthogonal().normalized()
+    bitangent = normal.cross(tangent)
+    return tangent * (r * math.cos(phi)) + bitangent * (r * math.sin(phi)) + normal * math.sqrt(max(0.0, 1.0 - u1))
+
+
+def material_response(material):
+    # (albedo, emitted radiance) of a material as grey values, from its first shader node or the
+    # viewport color. Textures are not sampled, only unlinked socket values.
+    if material is None:
+        return DEFAULT_ALBEDO, 0.0
+    if material.use_nodes and material.node_tree is not None:
+        for node in material.node_tree.nodes:
+            if node.type == 'BSDF_PRINCIPLED':
+                # "Emission Color" since Blender 4.0, "Emission" before.
+                emission = node.inputs.get("Emission Color") or node.inputs.get("Emission")
+                strength = node.inputs.get("Emission Strength")
+                emitted = grey(emission.default_value) * (strength.default_value if strength is not None else 1.0)
+                return grey(node.inputs["Base Color"].default_value), emitted
+            if node.type == 'BSDF_DIFFUSE':
+                return grey(node.inputs["Color"].default_value), 0.0
+            if node.type == 'EMISSION':
+                return 0.0, grey(node.inputs[0].default_value) * node.inputs[1].default_value
+    return grey(material.diffuse_color), 0.0
+
+
+def world_radiance(scene):
+    world = scene.world
+    if world is None:
+        return 0.0
+    if world.use_nodes and world.node_tree is not None:
+        for node in world.node_tree.nodes:
+            if node.type in {'EMISSION', 'BACKGROUND'}:
+                return grey(node.inputs[0].default_value) * node.inputs[1].default_value
+    return grey(world.color)
+
+
+def scene_lights(context, exclude=()):
+    # (type, location, direction the light points at, grey power, cosine of the spot half angle).
+    lights = []
+    for obj in context.scene.objects:
+        if obj.type != 'LIGHT' or obj.hide_render or obj.name in exclude:
+            continue
+        light = obj.data
+        direction = (obj.matrix_world.to_3x3() @ Vector((0.0, 0.0, -1.0))).normalized()
+        cutoff = math.cos(light.spot_size / 2.0) if light.type == 'SPOT' else -1.0
+        lights.append((light.type, obj.matrix_world.translation.copy(), direction, light.energy * grey(light.color), cutoff))
+    return lights
+
+
+class IrradianceEstimator:
+    # Ray-cast replacement for baking probe spheres in Cycles. Radiance is gathered along a fixed
+    # stratified set of directions around every probe center and folded straight into the six
+    # hemisphere averages. Surfaces are grey diffuse: bounces follow one cosine weighted path per
+    # primary ray, with lights added by shadow rays at every hit. Values are irradiance / pi, the
+    # same scale as a diffuse bake without the color pass.
+
+    def __init__(self, bvh, albedo, emission, sky, lights, co, samples, bounces):
+        self.bvh = bvh
+        self.albedo = albedo
+        self.emission = emission
+        self.sky = sky
+        self.lights = lights
+        self.bounces = bounces
+        directions = stratified_sphere_directions(samples)
+        self.directions = [Vector(direction) for direction in directions]
+        self.weights = hemisphere_cosine_weights(co, directions)
+        self.masks = hemisphere_masks(co).astype(np.float64)
+        self.masks /= self.masks.sum(axis=1, keepdims=True)
+        self.normals = sphere_normals(co)
+
+    @classmethod
+    def from_scene(cls, context, co, samples, bounces, exclude=()):
+        # co: vertex positions of the probe sphere the Cycles bake would use, for the hemispheres.
+        vertices, polygons, owners = scene_mesh_polygons(context, exclude)
+        albedo = np.empty(len(polygons), dtype=np.float64)
+        emission = np.empty(len(polygons), dtype=np.float64)
+        start = 0
+        for obj, material_index in owners:
+            responses = np.array([material_response(slot.material) for slot in obj.material_slots] or [(DEFAULT_ALBEDO, 0.0)])
+            index = np.minimum(material_index, len(responses) - 1)
+            albedo[start:start + len(index)] = responses[index, 0]
+            emission[start:start + len(index)] = responses[index, 1]
+            start += len(index)
+
+        bvh = BVHTree.FromPolygons(vertices.tolist(), polygons) if vertices is not None else None
+        lights = scene_lights(context, exclude)
+        return cls(bvh, albedo.tolist(), emission.tolist(), world_radiance(context.scene), lights, co, samples, bounces)
+
+    def _cast(self, origin, direction, distance=None):
+        if self.bvh is None:
+            return None, None, None, None
+        if distance is None:
+            return self.bvh.ray_cast(origin, direction)
+        return self.bvh.ray_cast(origin, direction, distance)
+
+    def _light_samples(self, point):
+        # (unit direction towards the light, irradiance / pi facing it) of the lights visible from point.
+        for kind, location, axis, power, cutoff in self.lights:
+            if kind == 'SUN':
+                direction = -axis
+                distance = None
+                value = power / math.pi
+            else:
+                offset = location - point
+                distance = offset.length
+                if distance < RAY_EPSILON:
+                    continue
+                direction = offset / distance
+                facing = -direction.dot(axis)
+                if kind == 'SPOT' and facing < cutoff:
+                    continue
+                if kind == 'AREA':
+                    value = power * max(facing, 0.0) / (math.pi * math.pi * distance * distance)
+                else:
+                    value = power / (4.0 * math.pi * math.pi * distance * distance)
+            if value <= 0.0:
+                continue
+            if self._cast(point, direction, distance)[0] is not None:
+                continue
+            yield direction, value
+
+    def _direct(self, point, normal):
+        total = 0.0
+        for direction, value in self._light_samples(point):
+            cosine = normal.dot(direction)
+            if cosine > 0.0:
+                total += value * cosine
+        return total
+
+    def _trace(self, origin, direction, depth, rng):
+        # Radiance arriving at origin from direction.
+        location, normal, face, _ = self._cast(origin, direction)
+        if location is None:
+            return self.sky
+        if normal.dot(direction) > 0.0:
+            normal = -normal
+        radiance = self.emission[face]
+        albedo = self.albedo[face]
+        if depth > 0 and albedo > 0.0:
+            point = location + normal * RAY_EPSILON
+            incoming = self._direct(point, normal) + self._trace(point, cosine_direction(normal, rng), depth - 1, rng)
+            radiance += albedo * incoming
+        return radiance
+
+    def estimate(self, centers, out=None):
+        # centers: (P, 3). Returns the (P, 6) hemisphere averages. Bounce paths are seeded by the
+        # probe position, so a probe gets the same value whichever batch or shard bakes it.
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        if out is None:
+            out = np.empty((len(centers), 6), dtype=np.float32)
+        radiance = np.empty(len(self.directions), dtype=np.float64)
+        for i, center in enumerate(centers):
+            rng = random.Random(center.tobytes())
+            origin = Vector(center)
+            for j, direction in enumerate(self.directions):
+                radiance[j] = self._trace(origin, direction, self.bounces, rng)
+            value = radiance @ self.weights
+            for direction, light in self._light_samples(origin):
+                value += light * (self.masks @ np.maximum(self.normals @ np.array(direction), 0.0))
+            out[i] = value
+        return out
@@ -1,12 +1,17 @@
 import bpy
 import os
 import math
+import tempfile
 import numpy as np
 from mathutils import Quaternion
 from .main import get_selected_zone
-from.converRefProbes import convertRefProbes
-from.utils import gen_hash, compute_probe_hash
-from .xml import create_xml_file_reflection_probes_room
+from.converRefProbes import convert_ref_probe_faces, png_to_array
+from .core.hashing import gen_hash, compute_probe_hash
+from .dependencies import require_module
+from .core.xml import create_xml_file_reflection_probes_room
+from .core.encode import EncodeError
+from .core.exr import read_exr_channels
+from .core.probe_passes import VIEW_LAYER, split_probe_passes, ao_pixels, encode_viewer_pass
 
 camera_names = ['z+', 'z-', 'y+', 'y-', 'x+', 'x-']
 map_node = None
@@ -112,6 +117,63 @@ def SetupProbesComposting(type):
             tree.links.new(combine_xyz_2.outputs['Vector'], add.inputs[2])
             tree.links.new(add.outputs['Image'], composite.inputs['Image'])
 
+    # Mirrors the composite output so the pass can be read back without saving the render.
+    viewer = tree.nodes.new(type='CompositorNodeViewer')
+    tree.links.new(composite.inputs['Image'].links[0].from_socket, viewer.inputs['Image'])
+
+
+def SetupProbesMultilayer():
+    # All four passes come out of one render as a multilayer EXR, the compositor is not used.
+    scene = bpy.context.scene
+    scene.render.engine = 'BLENDER_EEVEE'
+    scene.render.image_settings.file_format = 'OPEN_EXR_MULTILAYER'
+    scene.render.image_settings.color_depth = '32'
+    scene.render.image_settings.exr_codec = 'NONE'
+    scene.use_nodes = False
+
+    scene.eevee.use_gtao = True
+    scene.eevee.gtao_distance = 1
+
+    view_layer = scene.view_layers[VIEW_LAYER]
+    view_layer.use_pass_z = True
+    view_layer.use_pass_normal = True
+    view_layer.use_pass_diffuse_color = True
+    view_layer.use_pass_ambient_occlusion = True
+
+
+def SetupProbesAoSave():
+    # The image and view settings the per-pass AO render is saved with.
+    scene = bpy.context.scene
+    scene.render.image_settings.file_format = 'TIFF'
+    scene.render.image_settings.color_mode = 'RGB'
+    scene.render.image_settings.color_depth = '16'
+    scene.render.image_settings.compression = 0
+    scene.view_settings.view_transform = 'AgX'
+    scene.view_settings.look = 'None'
+    scene.view_settings.exposure = 0
+    scene.view_settings.gamma = 1
+
+
+def save_ao_face(pixels, file_path):
+    # save_render applies the scene's view transform to any float image, so AO read from the EXR
+    # ends up exactly like the AO the per-pass render saves.
+    height, width = pixels.shape[:2]
+    image = bpy.data.images.new("AMV Probe AO", width, height, alpha=True, float_buffer=True)
+    try:
+        image.pixels.foreach_set(pixels.ravel())
+        image.save_render(file_path, scene=bpy.context.scene)
+    finally:
+        bpy.data.images.remove(image)
+
+
+def read_viewer_pixels():
+    # Sized from the viewer image, which follows the render resolution percentage.
+    viewer = bpy.data.images['Viewer Node']
+    width, height = viewer.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    viewer.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
+
 
 def euclidean_distance(point1, point2):
     return math.sqrt(sum((p1 - p2) ** 2 for p1, p2 in zip(point1, point2)))            
@@ -135,6 +197,33 @@ def get_max_distance(center, zone_bb_min, zone_bb_max):
     z_max_distance = max(distance_to_z_max, distance_to_z_min)
     return max_distance, z_max_distance
 
+def create_probe_cameras(center, interior_rotation):
+    # The six face cameras are built once per bake and reused by every pass.
+    cameras = []
+    for name, direction in zip(camera_names, camera_directions):
+        camera_data = bpy.data.cameras.new(name)
+        camera_data.type = 'PERSP'
+        camera_data.lens_unit = 'FOV'
+        camera_data.angle = 1.5708
+
+        camera = bpy.data.objects.new(name, camera_data)
+        bpy.context.scene.collection.objects.link(camera)
+        camera.location = center
+        # Mirrored along global Y.
+        camera.scale = (1, -1, 1)
+        camera.rotation_mode = 'XYZ'
+        camera.rotation_euler = tuple(a - b for a, b in zip(direction, interior_rotation))
+        cameras.append(camera)
+    return cameras
+
+
+def remove_probe_cameras(cameras):
+    for camera in cameras:
+        camera_data = camera.data
+        bpy.data.objects.remove(camera, do_unlink=True)
+        bpy.data.cameras.remove(camera_data)
+
+
 class AMV_OT_BakeReflectionProbes(bpy.types.Operator):
     bl_idname = "amv.bake_reflection_probes"
     bl_label = "Bake Reflection Probes"
@@ -163,60 +252,97 @@ class AMV_OT_BakeReflectionProbes(bpy.types.Operator):
 
         print(np.degrees(interior_rotation[2]))
 
-        for type in texture_types:
-
-            SetupProbesComposting(type)
-
-            for i, (name, direction) in enumerate(zip(camera_names, camera_directions)):
-                bpy.ops.object.camera_add(enter_editmode=False, align='VIEW', location=center, rotation=(0, 0, 0))
-                bpy.ops.transform.mirror(orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL', constraint_axis=(False, True, False))
-
-                camera = bpy.context.object
-                camera.name = name
-                camera.rotation_mode = 'XYZ'
-                camera.rotation_euler =  tuple(a - b for a, b in zip(direction, interior_rotation))
-
-                camera.data.type = 'PERSP'
-                # camera.data.lens = 16
-                camera.data.lens_unit = 'FOV'
-                camera.data.angle = 1.5708
-             
-                print(map_node)
-                if map_node is not None:
-
-                    if "z" in name:
-                        print(z_max_dist)
-                        map_node.inputs['From Max'].default_value = z_max_dist*2
-                    else:
-                        map_node.inputs['From Max'].default_value = max_dist*4
-
-              
-
-                bpy.context.scene.render.resolution_x = 1024
-                bpy.context.scene.render.resolution_y = 1024
-                
-                bpy.context.scene.camera = camera
-
-                bpy.ops.render.render(write_still=True)
-
-                filepath_full = bpy.path.abspath(bpy.context.scene.output_directory)
-
-                dir_name = zone.name + "_ref_probes"
- 
-                new_folder_path = os.path.join(filepath_full, dir_name)
-
-                type_folder_path = os.path.join(new_folder_path, type)
-
-                file_path = os.path.join(type_folder_path, f"{name}.tif")
-        
-                bpy.data.images['Render Result'].save_render(file_path)
-                bpy.data.objects.remove(camera, do_unlink=True)
-
-        tree = bpy.context.scene.node_tree
-        for node in tree.nodes:
-            tree.nodes.remove(node)
-
-        bpy.context.scene.use_nodes = False
+        cameras = create_probe_cameras(center, interior_rotation)
+
+        filepath_full = bpy.path.abspath(bpy.context.scene.output_directory)
+        new_folder_path = os.path.join(filepath_full, zone.name + "_ref_probes")
+        # Faces are handed to the encoder in memory; the TIFFs are only written for debugging.
+        save_intermediates = bpy.context.scene.save_probe_intermediates
+        faces = {type: {} for type in texture_types}
+
+        # The encoder builds every size from 1024x1024 faces, whatever the scene renders at.
+        render = bpy.context.scene.render
+        resolution = (render.resolution_x, render.resolution_y, render.resolution_percentage)
+        render.resolution_x = 1024
+        render.resolution_y = 1024
+        render.resolution_percentage = 100
+        try:
+            if bpy.context.scene.reflection_render_mode == 'SINGLE':
+                SetupProbesMultilayer()
+
+                if save_intermediates:
+                    for type in texture_types:
+                        os.makedirs(os.path.join(new_folder_path, type), exist_ok=True)
+
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    ao = {}
+                    for name, camera in zip(camera_names, cameras):
+                        bpy.context.scene.camera = camera
+                        bpy.ops.render.render()
+
+                        exr_path = os.path.join(temp_dir, f"{name}.exr")
+                        bpy.data.images['Render Result'].save_render(exr_path)
+                        channels = read_exr_channels(exr_path)
+                        os.remove(exr_path)
+
+                        depth_max = z_max_dist*2 if "z" in name else max_dist*4
+                        for type, image in split_probe_passes(channels, depth_max).items():
+                            faces[type][name] = image
+                            if save_intermediates:
+                                require_module("tifffile").imwrite(os.path.join(new_folder_path, type, f"{name}.tif"), image, photometric='rgb')
+                        ao[name] = ao_pixels(channels)
+
+                    # AO is saved after every face is rendered, the EXR settings are no longer needed.
+                    SetupProbesAoSave()
+                    folder = os.path.join(new_folder_path, "ao") if save_intermediates else temp_dir
+                    for name, pixels in ao.items():
+                        file_path = os.path.join(folder, f"{name}.tif")
+                        save_ao_face(pixels, file_path)
+                        faces["ao"][name] = png_to_array(file_path)
+            else:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    for type in texture_types:
+
+                        SetupProbesComposting(type)
+
+                        for name, camera in zip(camera_names, cameras):
+                            print(map_node)
+                            if map_node is not None:
+
+                                if "z" in name:
+                                    print(z_max_dist)
+                                    map_node.inputs['From Max'].default_value = z_max_dist*2
+                                else:
+                                    map_node.inputs['From Max'].default_value = max_dist*4
+
+                            bpy.context.scene.camera = camera
+
+                            bpy.ops.render.render()
+
+                            if type == "ao":
+                                # Only saving the render applies the AgX view transform, so AO is read
+                                # back from the saved TIFF.
+                                folder = os.path.join(new_folder_path, type) if save_intermediates else temp_dir
+                                file_path = os.path.join(folder, f"{name}.tif")
+                                bpy.data.images['Render Result'].save_render(file_path)
+                                faces[type][name] = png_to_array(file_path)
+                                continue
+
+                            faces[type][name] = encode_viewer_pass(type, read_viewer_pixels())
+
+                            if save_intermediates:
+                                file_path = os.path.join(new_folder_path, type, f"{name}.tif")
+                                bpy.data.images['Render Result'].save_render(file_path)
+
+                tree = bpy.context.scene.node_tree
+                for node in tree.nodes:
+                    tree.nodes.remove(node)
+
+                bpy.context.scene.use_nodes = False
+        finally:
+            render.resolution_x, render.resolution_y, render.resolution_percentage = resolution
+
+        remove_probe_cameras(cameras)
 
         interior_name = bpy.context.scene.interior_name
         interior_hash = gen_hash(interior_name)
@@ -224,7 +350,11 @@ class AMV_OT_BakeReflectionProbes(bpy.types.Operator):
         data = [guid >> 32, guid & 0xFFFFFFFF, interior_hash]
         probe_hash = compute_probe_hash(data, 0)
 
-        convertRefProbes(new_folder_path, probe_hash)
+        try:
+            convert_ref_probe_faces(new_folder_path, probe_hash, faces, bpy.context.scene.probe_encode_quality, bpy.context.scene.encode_workers)
+        except EncodeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
         xml_ytyp_filename = os.path.join(new_folder_path, "output", f"{probe_hash}_YTYP.xml")
         create_xml_file_reflection_probes_room(xml_ytyp_filename, zone)
         return {'FINISHED'}
@@ -0,0 +1,253 @@
+import hashlib
+import numpy as np
+
+
+# Per object ray visibility, each of them changes what a probe sees.
+VISIBILITY_FLAGS = (
+    "visible_camera", "visible_diffuse", "visible_glossy", "visible_transmission",
+    "visible_volume_scatter", "visible_shadow", "is_holdout", "is_shadow_catcher",
+)
+
+# Object types Cycles renders, and those of them to_mesh() turns into a mesh.
+RENDERABLE_TYPES = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META', 'CURVES', 'POINTCLOUD', 'VOLUME', 'LIGHT'}
+MESH_TYPES = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}
+
+# RNA properties left out of update_rna: sockets are hashed by their values, the others point back
+# up the tree or only change how a node is drawn.
+SKIPPED_PROPERTIES = {
+    "rna_type", "inputs", "outputs", "internal_links", "parent", "node", "id_data",
+    "select", "location", "width", "width_hidden", "height", "dimensions", "hide",
+    "show_options", "show_preview", "show_texture", "show_expanded", "preview",
+}
+MAX_RNA_DEPTH = 4
+
+
+def _update(digest, value):
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value).tobytes()
+    elif not isinstance(value, bytes):
+        value = repr(value).encode("utf-8")
+    digest.update(len(value).to_bytes(8, "little"))
+    digest.update(value)
+
+
+def _rna_value(value):
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if isinstance(value, str):
+        return value
+    try:
+        return tuple(value)
+    except TypeError:
+        return value
+
+
+def _socket_value(socket):
+    return _rna_value(getattr(socket, "default_value", None))
+
+
+def update_rna(digest, struct, depth=0):
+    # Every editable property of a node, material, light or world, following the structs they own
+    # (color ramp stops, curve mapping points, Cycles settings). Data blocks are only hashed by
+    # name; images and node groups are followed by the callers.
+    for prop in struct.bl_rna.properties:
+        identifier = prop.identifier
+        if identifier in SKIPPED_PROPERTIES:
+            continue
+        value = getattr(struct, identifier, None)
+        if prop.type == 'POINTER':
+            if value is None or hasattr(value, "name_full"):
+                _update(digest, (identifier, getattr(value, "name_full", None)))
+            elif depth < MAX_RNA_DEPTH:
+                _update(digest, identifier)
+                update_rna(digest, value, depth + 1)
+        elif prop.type == 'COLLECTION':
+            if depth < MAX_RNA_DEPTH:
+                _update(digest, (identifier, len(value)))
+                for item in value:
+                    update_rna(digest, item, depth + 1)
+        elif not prop.is_readonly:
+            _update(digest, (identifier, _rna_value(value)))
+
+
+def update_file(digest, path):
+    file_digest = hashlib.sha1()
+    try:
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                file_digest.update(chunk)
+    except OSError:
+        _update(digest, None)
+        return
+    _update(digest, file_digest.digest())
+
+
+def update_image(digest, image):
+    # Which image and its content: the bytes of the file (or of every UDIM tile) for images on
+    # disk, the packed bytes or the pixels for packed and generated ones.
+    _update(digest, (image.name, image.filepath, image.source, image.colorspace_settings.name, image.alpha_mode))
+    if image.packed_file is not None:
+        _update(digest, image.packed_file.data)
+    elif image.source in {'FILE', 'SEQUENCE', 'MOVIE', 'TILED'}:
+        path = image.filepath_from_user()
+        paths = [path.replace("<UDIM>", str(tile.number)) for tile in image.tiles] if image.source == 'TILED' else [path]
+        for path in paths:
+            update_file(digest, path)
+    else:
+        pixels = np.empty(len(image.pixels), dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        _update(digest, pixels)
+
+
+def update_node_tree(digest, node_tree):
+    # Node types and properties, unlinked input values, images and links.
+    if node_tree is None:
+        _update(digest, None)
+        return
+    for node in sorted(node_tree.nodes, key=lambda node: node.name):
+        _update(digest, (node.name, node.bl_idname))
+        update_rna(digest, node)
+        _update(digest, [_socket_value(socket) for socket in node.inputs])
+        image = getattr(node, "image", None)
+        if image is not None:
+            update_image(digest, image)
+        if node.bl_idname == 'ShaderNodeGroup':
+            update_node_tree(digest, node.node_tree)
+    for link in node_tree.links:
+        _update(digest, (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier, link.is_muted))
+
+
+def update_mesh(digest, mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    vertex_index = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", vertex_index)
+    loop_start = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    material_index = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", material_index)
+    for array in (co, vertex_index, loop_start, material_index):
+        _update(digest, array)
+    for uv_layer in mesh.uv_layers:
+        uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        uv_layer.data.foreach_get("uv", uv)
+        _update(digest, (uv_layer.name, uv_layer.active_render))
+        _update(digest, uv)
+    _update(digest, [material.name_full if material is not None else None for material in mesh.materials])
+
+
+def geometry_hash(obj):
+    # obj is an evaluated object (modifiers and geometry nodes applied).
+    digest = hashlib.sha1()
+    if obj.type in MESH_TYPES:
+        mesh = obj.to_mesh()
+        if mesh is not None:
+            update_mesh(digest, mesh)
+        obj.to_mesh_clear()
+    elif obj.type == 'LIGHT':
+        update_rna(digest, obj.data)
+        update_node_tree(digest, obj.data.node_tree if obj.data.use_nodes else None)
+    else:
+        # Hair curves, point clouds and volumes: their settings and point positions.
+        update_rna(digest, obj.data)
+        attributes = getattr(obj.data, "attributes", None)
+        if attributes is not None and "position" in attributes:
+            position = attributes["position"]
+            co = np.empty(len(position.data) * 3, dtype=np.float32)
+            position.data.foreach_get("vector", co)
+            _update(digest, co)
+    return digest.hexdigest()
+
+
+def material_hash(material):
+    digest = hashlib.sha1()
+    update_rna(digest, material)
+    update_node_tree(digest, material.node_tree if material.use_nodes else None)
+    return digest.hexdigest()
+
+
+def object_hash(obj, matrix_world, cache):
+    # Hash of one rendered object or instance: type, transform, ray visibility, evaluated
+    # geometry with its UVs, and materials. cache shares the geometry and material hashes
+    # between instances of the same data.
+    digest = hashlib.sha1()
+    _update(digest, obj.type)
+    _update(digest, np.array(matrix_world, dtype=np.float64))
+    _update(digest, tuple(getattr(obj, flag) for flag in VISIBILITY_FLAGS))
+
+    # Evaluated meshes are shared by the objects and instances that show them; the geometry of the
+    # other types is kept on the object.
+    key = ("geometry", obj.data.as_pointer() if obj.type == 'MESH' else obj.as_pointer())
+    if key not in cache:
+        cache[key] = geometry_hash(obj)
+    _update(digest, cache[key])
+    for slot in obj.material_slots:
+        material = slot.material
+        if material is None:
+            _update(digest, None)
+            continue
+        key = ("material", material.name_full)
+        if key not in cache:
+            cache[key] = material_hash(material)
+        _update(digest, (material.name_full, cache[key]))
+    return digest.hexdigest()
+
+
+def object_world_bounds(obj, matrix_world):
+    corners = np.array([tuple(corner) for corner in obj.bound_box], dtype=np.float64)
+    matrix = np.array(matrix_world, dtype=np.float64)
+    corners = corners @ matrix[:3, :3].T + matrix[:3, 3]
+    return corners.min(axis=0).tolist(), corners.max(axis=0).tolist()
+
+
+def object_record(obj, matrix_world, cache):
+    bb_min, bb_max = object_world_bounds(obj, matrix_world)
+    return {"type": obj.type, "hash": object_hash(obj, matrix_world, cache), "bb_min": bb_min, "bb_max": bb_max}
+
+
+def scene_object_records(context):
+    # {name: {"type", "hash", "bb_min", "bb_max"}} of every rendered object and instance (collection
+    # instances, particles, geometry nodes), JSON serializable so a bake can store it for later
+    # diffs. Instances are named after their instancer, object and persistent id.
+    depsgraph = context.evaluated_depsgraph_get()
+    records = {}
+    cache = {}
+    seen = set()
+    for instance in depsgraph.object_instances:
+        obj = instance.object
+        if obj.type not in RENDERABLE_TYPES:
+            continue
+        if instance.is_instance:
+            if instance.parent.original.hide_render:
+                continue
+            name = "/".join([instance.parent.original.name, obj.original.name] + [str(id) for id in instance.persistent_id])
+        else:
+            if obj.original.hide_render:
+                continue
+            name = obj.original.name
+            seen.add(name)
+        records[name] = object_record(obj, instance.matrix_world, cache)
+
+    # The viewport depsgraph leaves out objects hidden in the viewport that still render; they are
+    # hashed without their modifiers.
+    for obj in context.scene.objects:
+        if obj.type in RENDERABLE_TYPES and not obj.hide_render and obj.name not in seen:
+            records[obj.name] = object_record(obj, obj.matrix_world, cache)
+    return records
+
+
+def world_hash(scene):
+    digest = hashlib.sha1()
+    world = scene.world
+    if world is not None:
+        update_rna(digest, world)
+    update_node_tree(digest, world.node_tree if world is not None and world.use_nodes else None)
+    return digest.hexdigest()
+
+
+def scene_bake_hash(records, world_digest):
+    digest = hashlib.sha1()
+    for name, record in sorted(records.items()):
+        _update(digest, (name, record["hash"]))
+    _update(digest, world_digest)
+    return digest.hexdigest()
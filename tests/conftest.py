@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The core package never imports bpy, so the tests import it straight from the add-on folder with
+# plain CPython and NumPy.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from core.bake_cache import BakeCache, hash_parts
+
+
+def store(cache, key, size, **metadata):
+    with cache.writer(key, metadata) as path:
+        with open(os.path.join(path, "volume_0.dds"), "wb") as file:
+            file.write(b"\0" * size)
+
+
+def set_last_used(cache, key, value):
+    info = cache._read_info(cache.entry_path(key))
+    info["last_used"] = value
+    cache._write_info(cache.entry_path(key), info)
+
+
+def test_lookup(tmp_path):
+    cache = BakeCache(str(tmp_path / "cache"), 10_000)
+    assert cache.get("missing") is None
+    store(cache, "a", 100, settings_hash="s")
+    path = cache.get("a")
+    assert path == cache.entry_path("a")
+    assert os.path.getsize(os.path.join(path, "volume_0.dds")) == 100
+    assert cache.latest(lambda info: info.get("settings_hash") == "s")[0] == path
+    assert cache.latest(lambda info: info.get("settings_hash") == "other") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = BakeCache(str(tmp_path / "cache"), 2500)
+    store(cache, "a", 1000)
+    store(cache, "b", 1000)
+    set_last_used(cache, "a", 1.0)
+    set_last_used(cache, "b", 2.0)
+    # A hit makes a the most recently used entry, so b goes first.
+    cache.get("a")
+    store(cache, "c", 1000)
+
+    keys = {key for key, _ in cache.entries()}
+    assert keys == {"a", "c"}
+    assert cache.get("b") is None
+    assert cache.total_size() <= 2500
+
+
+def test_failed_write_keeps_the_previous_entry(tmp_path):
+    cache = BakeCache(str(tmp_path / "cache"), 10_000)
+    store(cache, "a", 100)
+    with pytest.raises(RuntimeError):
+        with cache.writer("a") as path:
+            open(os.path.join(path, "volume_0.dds"), "wb").close()
+            raise RuntimeError("bake failed")
+    assert os.path.getsize(os.path.join(cache.get("a"), "volume_0.dds")) == 100
+    assert [key for key, _ in cache.entries()] == ["a"]
+
+
+def test_hash_parts_separates_parts():
+    assert hash_parts("ab", "c") != hash_parts("a", "bc")
+    assert hash_parts("ab", b"c") == hash_parts(b"ab", "c")
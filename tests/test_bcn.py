@@ -0,0 +1,56 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from core import benchmark
+from core.bcn import QUALITY_FAST, QUALITY_HIGH, benchmark_bc3, encode_bc3
+from core.dds import DXGI_FORMAT_BC3_UNORM, write_cubemap_dds
+from texconv_references import FACE_REFERENCES, FACE_SOURCES, data_path, face_sources, read_tiff
+
+
+def source_paths():
+    return [data_path(name) for name in FACE_SOURCES]
+
+
+def test_face_sources_are_committed():
+    pytest.importorskip("tifffile")
+    np.testing.assert_array_equal(np.stack([read_tiff(path) for path in source_paths()]), face_sources())
+
+
+def test_bc3_psnr_against_texconv():
+    # texconv.exe BC3 of the committed faces, see tests/texconv_references.py.
+    if not all(os.path.exists(data_path(name)) for name in FACE_REFERENCES):
+        pytest.skip("no texconv reference yet, run tests/texconv_references.py on Windows")
+    pytest.importorskip("tifffile")
+    faces = benchmark.load_faces(source_paths())
+    results = benchmark_bc3(faces, benchmark.load_reference([data_path(name) for name in FACE_REFERENCES], faces))
+    assert results[QUALITY_FAST]["psnr"] > results["REFERENCE"]["psnr"] - 1.0
+    assert results[QUALITY_HIGH]["psnr"] > results["REFERENCE"]["psnr"] - 0.5
+
+
+def test_benchmark_reference_option(tmp_path):
+    # The --faces/--reference path of the benchmark, with the FAST encode standing in for texconv.
+    faces = benchmark.synthetic_probe_faces(16, seed=1)
+    np.save(tmp_path / "faces.npy", np.rint(faces * (65535.0 / 255.0)).astype(np.uint16))
+    loaded = benchmark.load_faces([str(tmp_path / "faces.npy")])
+    write_cubemap_dds(str(tmp_path / "reference.dds"), [encode_bc3(face, QUALITY_FAST) for face in loaded], 16, 16, DXGI_FORMAT_BC3_UNORM)
+
+    output = tmp_path / "results.json"
+    assert benchmark.main([
+        "--only", "bc3", "--faces", str(tmp_path / "faces.npy"), "--reference", str(tmp_path / "reference.dds"),
+        "--output", str(output),
+    ]) == 0
+    results = json.loads(output.read_text())["bc3"]
+    assert results["REFERENCE"]["psnr"] == pytest.approx(results[QUALITY_FAST]["psnr"])
+    assert results[QUALITY_FAST]["psnr"] > 30.0
+
+
+def test_reference_must_match_faces(tmp_path):
+    faces = benchmark.synthetic_probe_faces(8, seed=2)
+    write_cubemap_dds(str(tmp_path / "small.dds"), [encode_bc3(face[:4, :4]) for face in faces], 4, 4, DXGI_FORMAT_BC3_UNORM)
+    with pytest.raises(ValueError):
+        benchmark.load_reference([str(tmp_path / "small.dds")], faces)
+    with pytest.raises(SystemExit):
+        benchmark.parse_args(["--reference", str(tmp_path / "small.dds")])
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from core.checkpoint import SliceCheckpoint, bake_settings_hash, missing_runs, zone_checkpoint
+from core.shards import ShardError, run_shards, save_shard, shard_output_path, split_slabs
+
+
+def test_settings_hash_ignores_key_order():
+    settings = {"interval": 1.5, "bounces": 3, "positions": [[0, 1, 2]]}
+    assert bake_settings_hash(settings) == bake_settings_hash(dict(reversed(list(settings.items()))))
+    assert bake_settings_hash(settings) != bake_settings_hash({**settings, "bounces": 4})
+    assert len(bake_settings_hash(settings)) == 16
+
+
+@pytest.mark.parametrize("completed, count, runs", [
+    (set(), 4, [(0, 4)]),
+    ({0, 1, 2, 3}, 4, []),
+    ({1, 2, 5}, 7, [(0, 1), (3, 5), (6, 7)]),
+    ({0, 6}, 7, [(1, 6)]),
+    ({9}, 0, []),
+])
+def test_missing_runs(completed, count, runs):
+    assert missing_runs(completed, count) == runs
+
+
+def test_slice_checkpoint(tmp_path):
+    checkpoint = zone_checkpoint(str(tmp_path), "abc")
+    assert checkpoint.path == os.path.join(str(tmp_path), "checkpoints", "abc")
+    assert checkpoint.completed() == set()
+
+    rng = np.random.default_rng(0)
+    slab = rng.random((3, 2, 4, 6), dtype=np.float32)
+    checkpoint.save_slab(4, slab)
+    checkpoint.save(0, slab[0])
+    # A slice still being written is not finished.
+    with open(checkpoint.slice_path(9) + ".partial", "wb") as file:
+        file.write(b"\0")
+    assert checkpoint.completed() == {0, 4, 5, 6}
+    for offset in range(3):
+        np.testing.assert_array_equal(checkpoint.load(4 + offset), slab[offset])
+
+    # Clearing drops the checkpoints of every settings hash of the zone.
+    other = zone_checkpoint(str(tmp_path), "def")
+    other.save(1, slab[1])
+    checkpoint.clear()
+    assert checkpoint.completed() == set() and other.completed() == set()
+    assert not os.path.exists(os.path.join(str(tmp_path), "checkpoints"))
+
+
+@pytest.mark.parametrize("count, shard_count", [(10, 3), (5, 8), (1, 1), (64, 6)])
+def test_split_slabs_cover_every_slice(count, shard_count):
+    slabs = split_slabs(count, shard_count)
+    assert len(slabs) == min(shard_count, count)
+    assert slabs[0][0] == 0 and slabs[-1][1] == count
+    assert all(a[1] == b[0] for a, b in zip(slabs, slabs[1:]))
+    sizes = [stop - start for start, stop in slabs]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_save_shard_leaves_no_partial_file(tmp_path):
+    path = shard_output_path(str(tmp_path), 2)
+    assert path == os.path.join(str(tmp_path), "shard_2.npy")
+    results = np.arange(12, dtype=np.float32).reshape(2, 6)
+    save_shard(path, results)
+    assert os.listdir(str(tmp_path)) == ["shard_2.npy"]
+    np.testing.assert_array_equal(np.load(path), results)
+
+
+def worker(output_path, script):
+    # A shard process: runs script with the output path as argv[1].
+    return [sys.executable, "-c", script, output_path], output_path
+
+
+WRITE = "import sys, numpy; numpy.save(sys.argv[1], numpy.zeros(1))"
+# Fails on the first attempt only, remembered through a marker file next to the output.
+FLAKY = "import os, sys, numpy\nmarker = sys.argv[1] + '.tried'\nif not os.path.exists(marker):\n    open(marker, 'w').close()\n    sys.exit(3)\nnumpy.save(sys.argv[1], numpy.zeros(1))"
+
+
+def test_run_shards_retries_failed_shards(tmp_path):
+    shards = [worker(str(tmp_path / f"shard_{index}.npy"), FLAKY if index == 1 else WRITE) for index in range(3)]
+    done = []
+    run_shards(shards, max_workers=2, retries=1, on_done=done.append, poll_interval=0.01)
+    assert sorted(done) == [0, 1, 2]
+    assert all(os.path.exists(output_path) for _, output_path in shards)
+
+
+def test_run_shards_reports_every_failure(tmp_path):
+    # Exit code 0 without an output file counts as a failure too.
+    shards = [
+        worker(str(tmp_path / "shard_0.npy"), WRITE),
+        worker(str(tmp_path / "shard_1.npy"), "import sys; sys.exit(2)"),
+        worker(str(tmp_path / "shard_2.npy"), "pass"),
+    ]
+    done = []
+    with pytest.raises(ShardError) as error:
+        run_shards(shards, max_workers=3, retries=1, on_done=done.append, poll_interval=0.01)
+    assert done == [0]
+    assert [index for index, _ in error.value.failures] == [1, 2]
+    assert "exit code 2 after 2 attempts" in error.value.failures[0][1]
+    assert "2 of 3 bake shards failed" in str(error.value)
+    assert os.path.exists(shards[1][1] + ".log")
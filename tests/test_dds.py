@@ -0,0 +1,94 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from core.dds import DXGI_FORMAT_R11G11B10_FLOAT, pack_r11g11b10, read_dds, write_r11g11b10_volume_dds
+from texconv_references import VOLUME_REFERENCE, VOLUME_SOURCE, data_path, read_tiff, volume_source
+
+
+def float_bits(value):
+    return struct.unpack("<I", struct.pack("<f", value))[0]
+
+
+def reference_channel(bits, mantissa_bits):
+    # Scalar port of one channel of DirectXMath XMStoreFloat3PK, as compiled for x86: shifts are
+    # taken mod 32.
+    sign = bits & 0x80000000
+    value = bits & 0x7FFFFFFF
+    mask = (1 << (mantissa_bits + 5)) - 1
+    if (value & 0x7F800000) == 0x7F800000:
+        if value & 0x7FFFFF:
+            return mask
+        return 0 if sign else 0x1F << mantissa_bits
+    if sign or (mantissa_bits == 6 and value < 0x35800000):
+        return 0
+    if value > (0x477E0000 if mantissa_bits == 6 else 0x477C0000):
+        return (0x1F << mantissa_bits) - 1
+    if value < 0x38800000:
+        value = (0x800000 | (value & 0x7FFFFF)) >> ((113 - (value >> 23)) & 31)
+    else:
+        value = (value + 0xC8000000) & 0xFFFFFFFF
+    shift = 23 - mantissa_bits
+    return ((value + (1 << (shift - 1)) - 1 + ((value >> shift) & 1)) >> shift) & mask
+
+
+def reference_pixel(r, g, b):
+    return reference_channel(r, 6) | (reference_channel(g, 6) << 11) | (reference_channel(b, 5) << 22)
+
+
+# (r, g, b) -> packed R11G11B10_FLOAT, from the reference port above.
+GOLDEN = [
+    ((0.0, 0.0, 0.0), 0x00000000),
+    ((1.0, 1.0, 1.0), 0x781E03C0),
+    ((0.5, 0.25, 2.0), 0x801A0380),
+    ((65024.0, 64512.0, 64512.0), 0xF7FDF7BF),
+    ((1e9, 1e9, 1e9), 0xF7FDFFBF),
+    ((-1.0, -0.0, -5.0), 0x00000000),
+    ((6.1e-5, 3e-6, 1e-7), 0x00001840),
+    ((float("inf"), float("-inf"), float("nan")), 0xFFC007C0),
+]
+
+
+@pytest.mark.parametrize("rgb, packed", GOLDEN)
+def test_golden_vectors(rgb, packed):
+    assert int(pack_r11g11b10(np.array(rgb, dtype=np.float32))) == packed
+    assert reference_pixel(*(float_bits(value) for value in rgb)) == packed
+
+
+def test_matches_reference_on_random_bits():
+    rng = np.random.default_rng(0)
+    bits = rng.integers(0, 1 << 32, (20000, 3), dtype=np.uint64).astype(np.uint32)
+    # Also cover the normal and denormal ranges densely, not only huge and NaN patterns.
+    bits[::2] = rng.integers(0x30000000, 0x48000000, (10000, 3), dtype=np.uint64).astype(np.uint32)
+    packed = pack_r11g11b10(bits.view(np.float32))
+    flushed = (bits[:, 2] & 0x7FFFFFFF) < 0x29000000
+    for row, value in zip(bits[~flushed], packed[~flushed]):
+        assert int(value) == reference_pixel(*(int(channel) for channel in row))
+
+
+def test_tiny_blue_is_flushed_to_zero():
+    # Below 2^-45 the reference shift wraps around; those values are written as 0.
+    for value in (1e-14, 1e-20, 1e-38, 1e-45):
+        bits = float_bits(value)
+        assert bits < 0x29000000
+        assert int(pack_r11g11b10(np.array([0.0, 0.0, value], dtype=np.float32))) == 0
+    assert int(pack_r11g11b10(np.array([0.0, 0.0, 2.0 ** -44], dtype=np.float32))) == reference_pixel(0, 0, float_bits(2.0 ** -44))
+
+
+def test_volume_source_is_committed():
+    pytest.importorskip("tifffile")
+    np.testing.assert_array_equal(read_tiff(data_path(VOLUME_SOURCE)), volume_source())
+
+
+def test_volume_matches_texconv(tmp_path):
+    # texconv.exe output for the committed source TIFF, see tests/texconv_references.py.
+    if not os.path.exists(data_path(VOLUME_REFERENCE)):
+        pytest.skip("no texconv reference yet, run tests/texconv_references.py on Windows")
+    pytest.importorskip("tifffile")
+    path = str(tmp_path / "volume.dds")
+    write_r11g11b10_volume_dds(path, read_tiff(data_path(VOLUME_SOURCE)))
+
+    width, height, depth, dxgi_format, surfaces = read_dds(path)
+    assert read_dds(data_path(VOLUME_REFERENCE)) == (width, height, depth, DXGI_FORMAT_R11G11B10_FLOAT, surfaces)
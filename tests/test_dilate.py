@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from core.dilate import dilate_nearest
+
+
+def reference_dilate(volume, valid):
+    # The whole-volume float64 formulation the slab version replaces.
+    volume = volume.astype(np.float64)
+    valid = valid.copy()
+    shape = valid.shape
+    while not valid.all():
+        total = np.zeros(volume.shape)
+        count = np.zeros(shape, dtype=np.int32)
+        for axis in range(3):
+            for step in (1, -1):
+                shifted_valid = np.zeros(shape, dtype=bool)
+                shifted = np.zeros(volume.shape)
+                target = [slice(None)] * 3
+                source = [slice(None)] * 3
+                target[axis] = slice(max(step, 0), shape[axis] + min(step, 0))
+                source[axis] = slice(max(-step, 0), shape[axis] - max(step, 0))
+                shifted_valid[tuple(target)] = valid[tuple(source)]
+                shifted[tuple(target)] = volume[tuple(source)]
+                total += np.where(shifted_valid[..., None], shifted, 0.0)
+                count += shifted_valid
+        ring = ~valid & (count > 0)
+        volume[ring] = total[ring] / count[ring][:, None]
+        valid |= ring
+    return volume
+
+
+def random_volume(seed, shape=(7, 5, 6), fraction=0.1):
+    rng = np.random.default_rng(seed)
+    volume = rng.random(shape + (3,), dtype=np.float32)
+    valid = rng.random(shape) < fraction
+    volume[~valid] = np.nan
+    return volume, valid
+
+
+@pytest.mark.parametrize("slab_depth", [None, 1, 2, 3, 100])
+def test_matches_whole_volume_dilation(slab_depth):
+    volume, valid = random_volume(0)
+    expected = reference_dilate(volume, valid)
+    result = dilate_nearest(volume.copy(), valid, slab_depth)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, rtol=1e-6)
+
+
+def test_valid_cells_are_untouched():
+    volume, valid = random_volume(1, fraction=0.3)
+    original = volume.copy()
+    dilate_nearest(volume, valid, slab_depth=2)
+    np.testing.assert_array_equal(volume[valid], original[valid])
+    assert not np.isnan(volume).any()
+
+
+def test_single_probe_fills_everything():
+    volume = np.zeros((4, 4, 4, 3), dtype=np.float32)
+    valid = np.zeros((4, 4, 4), dtype=bool)
+    volume[2, 1, 3] = (0.25, 0.5, 1.0)
+    valid[2, 1, 3] = True
+    dilate_nearest(volume, valid, slab_depth=1)
+    np.testing.assert_array_equal(volume, np.broadcast_to(np.float32([0.25, 0.5, 1.0]), volume.shape))
+
+
+def test_memmap_is_filled_in_place(tmp_path):
+    source, valid = random_volume(2)
+    volume = np.lib.format.open_memmap(str(tmp_path / "volume.npy"), mode="w+", dtype=np.float32, shape=source.shape)
+    volume[:] = source
+    assert dilate_nearest(volume, valid, slab_depth=2) is volume
+    volume.flush()
+    np.testing.assert_allclose(np.load(str(tmp_path / "volume.npy")), reference_dilate(source, valid), rtol=1e-6)
+
+
+def test_nothing_valid_leaves_volume_alone():
+    volume = np.ones((2, 2, 2, 3), dtype=np.float32)
+    assert dilate_nearest(volume, np.zeros((2, 2, 2), dtype=bool)) is volume
+    np.testing.assert_array_equal(volume, 1.0)
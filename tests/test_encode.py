@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from core.dds import write_r11g11b10_volume_dds
+from core.encode import EncodeError, MappedArray, is_mapped_file, run_encode_jobs
+
+
+def create_memmap(path, shape=(4, 3, 2, 3)):
+    volume = np.lib.format.open_memmap(str(path), mode="w+", dtype=np.float32, shape=shape)
+    volume[...] = np.random.default_rng(0).random(shape, dtype=np.float32)
+    return volume
+
+
+def test_only_whole_memmaps_are_sent_by_path(tmp_path):
+    volume = create_memmap(tmp_path / "volume.npy")
+    assert is_mapped_file(volume)
+    assert not is_mapped_file(volume[1:])
+    assert not is_mapped_file(np.array(volume))
+
+    mapped = MappedArray(volume).load()
+    assert not mapped.flags.writeable
+    np.testing.assert_array_equal(mapped, volume)
+
+
+def test_mapped_array_checks_the_file(tmp_path):
+    mapped = MappedArray(create_memmap(tmp_path / "volume.npy"))
+    create_memmap(tmp_path / "volume.npy", shape=(2, 2, 2, 3))
+    with pytest.raises(ValueError):
+        mapped.load()
+
+
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_volumes_encode_the_same_in_workers(tmp_path, in_memory):
+    volume = create_memmap(tmp_path / "volume.npy")
+    write_r11g11b10_volume_dds(str(tmp_path / "reference.dds"), np.array(volume))
+    source = np.array(volume) if in_memory else volume
+    paths = [str(tmp_path / f"{index}.dds") for index in range(2)]
+    run_encode_jobs([(write_r11g11b10_volume_dds, (path, source)) for path in paths], 2)
+    reference = (tmp_path / "reference.dds").read_bytes()
+    assert all(open(path, "rb").read() == reference for path in paths)
+
+
+def test_failures_are_collected():
+    jobs = [(np.sqrt, (4.0,)), (np.reshape, (np.zeros(4), (3,))), (np.sqrt, (9.0,))]
+    with pytest.raises(EncodeError) as error:
+        run_encode_jobs(jobs, 2)
+    assert [index for index, _ in error.value.failures] == [1]
+    assert run_encode_jobs([jobs[0], jobs[2]], 2) == [2.0, 3.0]
@@ -0,0 +1,100 @@
+import struct
+
+import numpy as np
+import pytest
+
+from core.exr import EXR_FLOAT, EXR_HALF, EXR_MAGIC, get_exr_pass, read_exr_channels
+
+
+def attribute(name, type, value):
+    return name.encode() + b"\0" + type.encode() + b"\0" + struct.pack("<i", len(value)) + value
+
+
+def write_exr(path, channels, pixel_type=EXR_FLOAT, compression=0, origin=(0, 0), bottom_up=False):
+    # Single part scanline EXR like Blender writes with exr_codec 'NONE': channels sorted by name,
+    # one scanline per chunk. channels: {name: (height, width) array}, top row first.
+    names = sorted(channels)
+    height, width = channels[names[0]].shape
+    dtype = np.dtype("<f2" if pixel_type == EXR_HALF else "<f4")
+    x_min, y_min = origin
+    window = struct.pack("<4i", x_min, y_min, x_min + width - 1, y_min + height - 1)
+    channel_list = b"".join(name.encode() + b"\0" + struct.pack("<iB3xii", pixel_type, 0, 1, 1) for name in names) + b"\0"
+    header = b"".join([
+        struct.pack("<iI", EXR_MAGIC, 2),
+        attribute("channels", "chlist", channel_list),
+        attribute("compression", "compression", bytes([compression])),
+        attribute("dataWindow", "box2i", window),
+        attribute("displayWindow", "box2i", window),
+        attribute("lineOrder", "lineOrder", bytes([1 if bottom_up else 0])),
+        attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0)),
+        attribute("screenWindowCenter", "v2f", struct.pack("<2f", 0.0, 0.0)),
+        attribute("screenWindowWidth", "float", struct.pack("<f", 1.0)),
+        b"\0",
+    ])
+    chunks = {}
+    for row in range(height):
+        pixels = b"".join(channels[name][row].astype(dtype).tobytes() for name in names)
+        chunks[row] = struct.pack("<ii", y_min + row, len(pixels)) + pixels
+    order = range(height - 1, -1, -1) if bottom_up else range(height)
+    offsets = {}
+    position = len(header) + 8 * height
+    for row in order:
+        offsets[row] = position
+        position += len(chunks[row])
+    with open(path, "wb") as file:
+        file.write(header)
+        file.write(b"".join(struct.pack("<Q", offsets[row]) for row in range(height)))
+        file.write(b"".join(chunks[row] for row in order))
+
+
+def probe_channels(seed, height=3, width=4):
+    rng = np.random.default_rng(seed)
+    names = ["ViewLayer.Depth.Z", "ViewLayer.AO.R", "ViewLayer.AO.G", "ViewLayer.AO.B"]
+    names += [f"ViewLayer.{pass_name}.{c}" for pass_name, components in [("Normal", "XYZ"), ("DiffCol", "RGB")] for c in components]
+    return {name: rng.random((height, width), dtype=np.float32) for name in names}
+
+
+@pytest.mark.parametrize("bottom_up", [False, True])
+def test_reads_float_channels(tmp_path, bottom_up):
+    channels = probe_channels(0)
+    path = str(tmp_path / "face.exr")
+    write_exr(path, channels, bottom_up=bottom_up, origin=(5, -2))
+    result = read_exr_channels(path)
+    assert sorted(result) == sorted(channels)
+    for name, values in channels.items():
+        assert result[name].dtype == np.float32
+        np.testing.assert_array_equal(result[name], values)
+
+
+def test_reads_half_channels(tmp_path):
+    channels = probe_channels(1)
+    path = str(tmp_path / "face.exr")
+    write_exr(path, channels, pixel_type=EXR_HALF)
+    for name, values in read_exr_channels(path).items():
+        np.testing.assert_array_equal(values, channels[name].astype(np.float16).astype(np.float32))
+
+
+def test_pass_components_follow_the_requested_order(tmp_path):
+    # The file stores channels sorted by name (B, G, R and X, Y, Z), passes come back as asked.
+    channels = probe_channels(2)
+    path = str(tmp_path / "face.exr")
+    write_exr(path, channels)
+    result = read_exr_channels(path)
+    color = get_exr_pass(result, "ViewLayer", "DiffCol", "RGB")
+    assert color.shape == (3, 4, 3)
+    for index, component in enumerate("RGB"):
+        np.testing.assert_array_equal(color[..., index], channels[f"ViewLayer.DiffCol.{component}"])
+    normal = get_exr_pass(result, "ViewLayer", "Normal", "XYZ")
+    np.testing.assert_array_equal(normal[..., 2], channels["ViewLayer.Normal.Z"])
+
+
+def test_rejects_compressed_and_foreign_files(tmp_path):
+    path = str(tmp_path / "zip.exr")
+    write_exr(path, probe_channels(3), compression=3)
+    with pytest.raises(ValueError, match="compressed"):
+        read_exr_channels(path)
+    path = str(tmp_path / "face.png")
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n" + bytes(64))
+    with pytest.raises(ValueError, match="OpenEXR"):
+        read_exr_channels(path)
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pytest
+
+from core.hemisphere import HemisphereReducer
+
+
+def uv_sphere(segments=32, rings=16, radius=0.3):
+    # Vertex positions like bpy.ops.mesh.primitive_uv_sphere_add: the poles and one ring of
+    # segments per inner ring, so many vertices sit exactly on the median planes.
+    co = [(0.0, 0.0, radius)]
+    for ring in range(1, rings):
+        theta = math.pi * ring / rings
+        for segment in range(segments):
+            phi = 2 * math.pi * segment / segments
+            co.append((radius * math.sin(theta) * math.cos(phi), radius * math.sin(theta) * math.sin(phi), radius * math.cos(theta)))
+    co.append((0.0, 0.0, -radius))
+    return np.array(co, dtype=np.float32)
+
+
+def baseline_reduce(co, colors):
+    # Straight port of the per-vertex loop of the original bake operator for one probe.
+    vertices = [tuple(float(value) for value in vertex) for vertex in co]
+    median_x = sum([v[0] for v in vertices]) / len(vertices)
+    median_y = sum([v[1] for v in vertices]) / len(vertices)
+    median_z = sum([v[2] for v in vertices]) / len(vertices)
+
+    color_array = [[], [], [], [], [], []]
+    for index, v in enumerate(vertices):
+        color_array[0 if v[0] >= median_x else 1].append(colors[index])
+    for index, v in enumerate(vertices):
+        color_array[2 if v[1] >= median_y else 3].append(colors[index])
+    for index, v in enumerate(vertices):
+        color_array[4 if v[2] >= median_z else 5].append(colors[index])
+
+    # r_0, g_0, b_0 (volume 0) then r_1, g_1, b_1 (volume 1).
+    return [np.mean(np.mean(np.array(group), axis=0)[:3]) for group in color_array]
+
+
+@pytest.mark.parametrize("co", [
+    uv_sphere(),
+    uv_sphere(8, 4, 1.5),
+    np.random.default_rng(0).standard_normal((200, 3)).astype(np.float32),
+], ids=["uv_sphere", "small_sphere", "random_normals"])
+def test_reduce_matches_baseline_loop(co):
+    rng = np.random.default_rng(1)
+    probes = 5
+    colors = rng.random((probes, len(co), 4), dtype=np.float32)
+    reducer = HemisphereReducer(co)
+
+    results = reducer.reduce(colors.ravel())
+    assert results.shape == (probes, 6)
+    for probe in range(probes):
+        np.testing.assert_allclose(results[probe], baseline_reduce(co, colors[probe]), rtol=1e-5, atol=1e-6)
+
+
+def test_face_order():
+    # A probe lit from +X only: volume 0 red (+X) is brightest, -X is the darkest.
+    co = uv_sphere()
+    colors = np.zeros((len(co), 4), dtype=np.float32)
+    colors[:, :3] = np.maximum(co[:, :1], 0.0) / co[:, 0].max()
+    results = HemisphereReducer(co).reduce(colors.ravel())[0]
+    assert results[0] == results.max()
+    assert results[1] == pytest.approx(0.0)
+    assert all(0.0 < value < results[0] for value in results[2:])
+
+
+def test_reduce_into_out():
+    co = uv_sphere(8, 4)
+    reducer = HemisphereReducer(co)
+    colors = reducer.color_buffer(3)
+    colors[:] = np.random.default_rng(2).random(colors.size)
+    out = np.empty((4, 6), dtype=np.float32)
+    reducer.reduce(colors, out=out[1:])
+    np.testing.assert_allclose(out[1:], reducer.reduce(colors))
@@ -0,0 +1,28 @@
+import numpy as np
+
+from core.incremental import affected_probe_mask, changed_object_bounds
+
+
+def record(type, hash, bb_min=(0, 0, 0), bb_max=(1, 1, 1)):
+    return {"type": type, "hash": hash, "bb_min": list(bb_min), "bb_max": list(bb_max)}
+
+
+def test_changed_geometry_gives_old_and_new_bounds():
+    previous = {"wall": record('MESH', "a"), "sign": record('FONT', "b", (5, 5, 5), (6, 6, 6)), "gone": record('CURVE', "c")}
+    current = {"wall": record('MESH', "a"), "sign": record('FONT', "d", (7, 5, 5), (8, 6, 6)), "Empty/chair/3": record('MESH', "e")}
+    boxes = changed_object_bounds(previous, current)
+    assert sorted(boxes) == sorted([
+        ([5, 5, 5], [6, 6, 6]), ([7, 5, 5], [8, 6, 6]), ([0, 0, 0], [1, 1, 1]), ([0, 0, 0], [1, 1, 1]),
+    ])
+
+
+def test_changed_light_rebakes_everything():
+    assert changed_object_bounds({"sun": record('LIGHT', "a")}, {"sun": record('LIGHT', "b")}) is None
+    assert changed_object_bounds({}, {"lamp": record('LIGHT', "a")}) is None
+    assert changed_object_bounds({"sun": record('LIGHT', "a")}, {"sun": record('LIGHT', "a")}) == []
+
+
+def test_affected_probe_mask():
+    centers = np.stack(np.meshgrid(np.arange(5.0), [0.0], [0.0], indexing="ij"), axis=-1)
+    mask = affected_probe_mask(centers, [([1.0, -1.0, -1.0], [1.5, 1.0, 1.0])], 1.0)
+    np.testing.assert_array_equal(mask[:, 0, 0], [True, True, True, False, False])
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from core.postprocess import (
+    DEPTH_FAR, NORMAL_BACKGROUND, TOLERANCE, allocate_cube, load_cube, process_color_cube, process_depth_cube,
+    process_normal_cube,
+)
+from core.pyramid import box_pyramid
+
+
+def random_faces(seed, size=16, values=None):
+    rng = np.random.default_rng(seed)
+    if values is None:
+        return rng.integers(0, 65536, (6, size, size, 3), dtype=np.uint16)
+    # Mostly values near the thresholds, so every branch of the kernels is hit.
+    return rng.choice(np.array(values, dtype=np.uint16), (6, size, size, 3))
+
+
+def reference_color(faces, ao):
+    # The float formulation the kernels replace.
+    rgb = faces.astype(np.float64)
+    black = np.all(rgb <= TOLERANCE, axis=-1, keepdims=True)
+    rgb = np.where(black, 32767, rgb)
+    alpha = np.floor(ao[..., :1].astype(np.float64) * 0.5)
+    alpha = np.where(np.all(ao.astype(np.float64) * 0.5 <= TOLERANCE, axis=-1, keepdims=True), 65535, alpha)
+    return np.concatenate([rgb, alpha], axis=-1).astype(np.uint16)
+
+
+def test_color_kernel():
+    faces = random_faces(0, values=[0, 5, 10, 11, 20, 21, 1000, 65535])
+    ao = random_faces(1, values=[0, 10, 20, 21, 22, 40000])
+    cube = process_color_cube(load_cube(faces, allocate_cube(16, 16)), ao)
+    np.testing.assert_array_equal(cube, reference_color(faces, ao))
+
+
+def test_normal_kernel():
+    faces = random_faces(2, values=[0, NORMAL_BACKGROUND - 11, NORMAL_BACKGROUND - 10, NORMAL_BACKGROUND, NORMAL_BACKGROUND + 10, NORMAL_BACKGROUND + 11, 65535])
+    cube = process_normal_cube(load_cube(faces, allocate_cube(16, 16)))
+    background = np.all(np.abs(faces.astype(np.int64) - NORMAL_BACKGROUND) <= TOLERANCE, axis=-1, keepdims=True)
+    expected = np.where(background, 0, np.concatenate([faces, np.full(faces.shape[:3] + (1,), 65535)], axis=-1))
+    np.testing.assert_array_equal(cube, expected)
+
+
+def test_depth_kernel():
+    faces = random_faces(3, values=[0, DEPTH_FAR - 1, DEPTH_FAR])
+    cube = process_depth_cube(load_cube(faces, allocate_cube(16, 16, channels=1)))
+    np.testing.assert_array_equal(cube[..., 0], np.where(faces[..., 0] == DEPTH_FAR, DEPTH_FAR - TOLERANCE, faces[..., 0]))
+
+
+def test_pyramid_matches_box_means():
+    cube = load_cube(random_faces(4, size=32), allocate_cube(32, 32, channels=3))
+    sizes = [(32, 32), (16, 16), (4, 4), (8, 8), (1, 1)]
+    seen = []
+    for (width, height), level in box_pyramid(cube, sizes):
+        factor = 32 // width
+        expected = cube.astype(np.float64).reshape(6, height, factor, width, factor, 3).mean(axis=(2, 4))
+        np.testing.assert_allclose(level, expected, rtol=1e-6)
+        seen.append((width, height))
+    assert seen == sorted(set(sizes), reverse=True)
+
+
+def test_pyramid_upsamples_small_faces():
+    # Faces of a bake rendered at 50%: the 1024 level repeats pixels, the rest are box means.
+    cube = load_cube(random_faces(5, size=8), allocate_cube(8, 8, channels=3))
+    levels = {size: np.array(level) for size, level in box_pyramid(cube, [(16, 16), (8, 8), (4, 4)])}
+    np.testing.assert_array_equal(levels[(16, 16)], cube.repeat(2, axis=1).repeat(2, axis=2))
+    np.testing.assert_array_equal(levels[(8, 8)], cube)
+    np.testing.assert_allclose(levels[(4, 4)], cube.astype(np.float64).reshape(6, 4, 2, 4, 2, 3).mean(axis=(2, 4)), rtol=1e-6)
+
+
+def test_pyramid_rejects_uneven_sizes():
+    cube = load_cube(random_faces(6, size=8), allocate_cube(8, 8, channels=3))
+    with pytest.raises(ValueError):
+        list(box_pyramid(cube, [(12, 12)]))
+    with pytest.raises(ValueError):
+        list(box_pyramid(cube, [(3, 3)]))
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.probe_locations import (
+    decode_locations, encode_locations, get_probe_locations, is_legacy, migrate_zone_locations,
+    probe_locations_digest, set_probe_locations,
+)
+
+
+class Zone:
+    def __init__(self, probes_location_3d=""):
+        self.probes_location_3d = probes_location_3d
+
+
+def grid(nz=2, ny=3, nx=4):
+    return np.random.default_rng(0).uniform(-50, 50, (nz, ny, nx, 3)).astype(np.float32)
+
+
+def test_round_trip():
+    locations = grid()
+    text = encode_locations(locations)
+    assert text.startswith("f32le:2,3,4:")
+    decoded = decode_locations(text)
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, locations)
+    assert not decoded.flags.writeable
+
+
+def test_no_locations():
+    assert encode_locations(None) == ""
+    assert decode_locations("") is None
+    assert decode_locations("[]") is None
+
+
+def test_legacy_json_is_read():
+    locations = grid()
+    text = json.dumps(locations.tolist())
+    assert is_legacy(text)
+    np.testing.assert_array_equal(decode_locations(text), locations)
+
+
+def test_migration_keeps_the_digest():
+    legacy = Zone(json.dumps(grid().tolist()))
+    digest = probe_locations_digest(legacy)
+    assert migrate_zone_locations(legacy)
+    assert not is_legacy(legacy.probes_location_3d)
+    assert not migrate_zone_locations(legacy)
+    assert probe_locations_digest(legacy) == digest
+    np.testing.assert_array_equal(get_probe_locations(legacy), grid())
+
+
+def test_set_and_clear():
+    zone = Zone()
+    set_probe_locations(zone, grid(1, 1, 2))
+    assert get_probe_locations(zone).shape == (1, 1, 2, 3)
+    set_probe_locations(zone, None)
+    assert get_probe_locations(zone) is None
+    assert probe_locations_digest(zone) == ""
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        decode_locations("f64be:1,1,1:AAAA")
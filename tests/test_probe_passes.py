@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core.probe_passes import (
+    DEPTH_TO_MAX, DEPTH_TO_MIN, ao_pixels, encode_viewer_pass, linear_to_srgb, remap_depth, split_probe_passes, to_uint16,
+)
+from test_exr import probe_channels
+
+
+def test_remap_depth_clamps_like_map_range():
+    depth = np.array([-1.0, 0.0, 5.0, 10.0, 50.0], dtype=np.float32)
+    np.testing.assert_allclose(remap_depth(depth, 10.0), [DEPTH_TO_MIN, DEPTH_TO_MIN, 0.995, DEPTH_TO_MAX, DEPTH_TO_MAX])
+
+
+def test_linear_to_srgb():
+    np.testing.assert_allclose(linear_to_srgb(np.array([-0.5, 0.0, 0.0031308, 0.18, 1.0, 4.0])), [0.0, 0.0, 0.0404500, 0.4613561, 1.0, 1.0], atol=1e-6)
+
+
+def test_to_uint16_rounds_and_clamps():
+    np.testing.assert_array_equal(to_uint16(np.array([-1.0, 0.0, 0.5 / 65535, 1.5 / 65535, 0.5, 1.0, 2.0])), [0, 0, 1, 2, 32768, 65535, 65535])
+
+
+def test_split_probe_passes():
+    channels = probe_channels(0)
+    faces = split_probe_passes(channels, depth_max=2.0)
+    assert sorted(faces) == ["color", "depth", "normal"]
+    for image in faces.values():
+        assert image.shape == (3, 4, 3) and image.dtype == np.uint16
+
+    normal = np.stack([channels[f"ViewLayer.Normal.{c}"] for c in "XYZ"], axis=-1)
+    np.testing.assert_array_equal(faces["normal"], to_uint16(normal * 0.5 + 0.5))
+    color = np.stack([channels[f"ViewLayer.DiffCol.{c}"] for c in "RGB"], axis=-1)
+    np.testing.assert_array_equal(faces["color"], to_uint16(linear_to_srgb(color)))
+    depth = to_uint16(remap_depth(channels["ViewLayer.Depth.Z"], 2.0))
+    for index in range(3):
+        np.testing.assert_array_equal(faces["depth"][..., index], depth)
+
+
+def test_ao_pixels_are_bottom_row_first_rgba():
+    channels = probe_channels(1)
+    pixels = ao_pixels(channels)
+    assert pixels.shape == (3, 4, 4) and pixels.dtype == np.float32
+    ao = channels["ViewLayer.AO.R"]
+    for index in range(3):
+        np.testing.assert_array_equal(pixels[..., index], ao[::-1])
+    np.testing.assert_array_equal(pixels[..., 3], 1.0)
+
+
+def test_encode_viewer_pass():
+    rng = np.random.default_rng(2)
+    pixels = rng.random((3, 4, 4), dtype=np.float32)
+    np.testing.assert_array_equal(encode_viewer_pass("normal", pixels), to_uint16(pixels[::-1, :, :3]))
+    np.testing.assert_array_equal(encode_viewer_pass("color", pixels), to_uint16(linear_to_srgb(pixels[::-1, :, :3])))
+    with pytest.raises(ValueError):
+        encode_viewer_pass("ao", pixels)
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+from core.bcn import BC3_BLOCK, QUALITY_FAST, QUALITY_HIGH, decode_bc3_blocks, encode_bc3, image_to_blocks, psnr
+from core.dds import DXGI_FORMAT_BC3_UNORM, DXGI_FORMAT_R11G11B10_FLOAT, read_dds, write_cubemap_dds, write_r11g11b10_volume_dds
+
+# Snapshots of this add-on's own encoder output, to catch unintended changes; parity with texconv
+# is checked against real texconv outputs by the texconv tests. After an intended
+# encoder change, regenerate the snapshots with
+#     AMV_UPDATE_SNAPSHOTS=1 python -m pytest tests/test_snapshots.py
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshots")
+UPDATE = os.environ.get("AMV_UPDATE_SNAPSHOTS") == "1"
+
+
+def snapshot_volume():
+    # (4, 4, 8, 3): a range from 0 to 70000 (past the format maximum) over exponents, plus
+    # negatives and zeros in the last column.
+    values = np.geomspace(1e-6, 7e4, 4 * 4 * 8 * 3).astype(np.float32).reshape(4, 4, 8, 3)
+    values[..., -1, :] = [-1.0, 0.0, 1e-30]
+    return values
+
+
+def snapshot_faces():
+    # Six 8x8 RGBA faces in 0..255: gradients, a hard edge and a flat block.
+    y, x = np.mgrid[0:8, 0:8].astype(np.float32)
+    faces = np.empty((6, 8, 8, 4), dtype=np.float32)
+    for face in range(6):
+        faces[face, ..., 0] = x * 6 + face * 20
+        faces[face, ..., 1] = y * 4 + 60
+        faces[face, ..., 2] = np.where(x < 4, 30.0, 220.0)
+        faces[face, ..., 3] = (x + y) * 16
+    faces[5, :4, :4] = (12, 200, 90, 255)
+    return np.clip(faces, 0, 255)
+
+
+def check_snapshot(path, name):
+    snapshot = os.path.join(DATA, name)
+    with open(path, "rb") as file:
+        data = file.read()
+    if UPDATE:
+        os.makedirs(DATA, exist_ok=True)
+        with open(snapshot, "wb") as file:
+            file.write(data)
+    with open(snapshot, "rb") as file:
+        assert data == file.read(), f"{name} changed; regenerate it if the change is intended"
+
+
+def test_r11g11b10_volume(tmp_path):
+    path = str(tmp_path / "volume.dds")
+    write_r11g11b10_volume_dds(path, snapshot_volume())
+    check_snapshot(path, "volume_r11g11b10.dds")
+
+    width, height, depth, dxgi_format, surfaces = read_dds(path)
+    assert (width, height, depth, dxgi_format) == (8, 4, 4, DXGI_FORMAT_R11G11B10_FLOAT)
+    assert len(surfaces) == 4
+
+
+def test_bc3_cube(tmp_path):
+    path = str(tmp_path / "cube.dds")
+    faces = snapshot_faces()
+    write_cubemap_dds(path, [encode_bc3(face, QUALITY_FAST) for face in faces], 8, 8, DXGI_FORMAT_BC3_UNORM)
+    check_snapshot(path, "cube_bc3_fast.dds")
+
+    width, height, depth, dxgi_format, surfaces = read_dds(path)
+    assert (width, height, dxgi_format, len(surfaces)) == (8, 8, DXGI_FORMAT_BC3_UNORM, 6)
+    for face, surface in zip(faces, surfaces):
+        decoded = decode_bc3_blocks(np.frombuffer(surface, dtype=BC3_BLOCK))
+        assert psnr(image_to_blocks(face), decoded) > 30
+
+
+@pytest.mark.parametrize("quality", [QUALITY_FAST, QUALITY_HIGH])
+def test_bc3_flat_blocks_are_exact(quality):
+    # Colors 565 can hold exactly.
+    face = np.zeros((8, 8, 4), dtype=np.float32)
+    face[...] = (255, 0, 255, 200)
+    decoded = decode_bc3_blocks(np.frombuffer(encode_bc3(face, quality), dtype=BC3_BLOCK))
+    np.testing.assert_array_equal(decoded, image_to_blocks(face))
@@ -0,0 +1,86 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from core.zone_index import PlainZone, ZoneIndex, box_contains, box_distance, boxes_overlap, zone_bounds
+
+
+def random_zones(rng, count, max_extent=30.0):
+    low = rng.uniform(-100, 100, (count, 3))
+    extent = rng.uniform(0.5, max_extent, (count, 3))
+    zones = []
+    for index, (bb_min, size) in enumerate(zip(low, extent)):
+        bb_max = bb_min + size
+        # Some zones are drawn max to min, the index normalizes them.
+        if index % 5 == 0:
+            bb_min, bb_max = bb_max, bb_min
+        zones.append(PlainZone(index, tuple(bb_min), tuple(bb_max)))
+    return zones
+
+
+def brute_force_pairs(bounds):
+    return sorted(
+        (a, b) for a, b in itertools.combinations(sorted(bounds), 2) if boxes_overlap(bounds[a], bounds[b])
+    )
+
+
+@pytest.fixture(params=[(0, 40, 30.0), (1, 80, 10.0), (2, 25, 150.0)])
+def scene(request):
+    # Small, many tiny and a few oversized zones (more cells than MAX_ZONE_CELLS).
+    seed, count, max_extent = request.param
+    rng = np.random.default_rng(seed)
+    zones = random_zones(rng, count, max_extent)
+    index = ZoneIndex()
+    index.sync(zone_bounds(zones))
+    return rng, zone_bounds(zones), index
+
+
+def test_query_point_matches_brute_force(scene):
+    rng, bounds, index = scene
+    for point in rng.uniform(-130, 230, (500, 3)).tolist():
+        assert index.query_point(point) == sorted(key for key, box in bounds.items() if box_contains(box, point))
+
+
+def test_nearest_matches_brute_force(scene):
+    rng, bounds, index = scene
+    for point in rng.uniform(-400, 400, (500, 3)).tolist():
+        key, distance = index.nearest(point)
+        expected = min(box_distance(box, point) for box in bounds.values())
+        assert distance == pytest.approx(expected)
+        assert box_distance(bounds[key], point) == pytest.approx(expected)
+
+
+def test_overlapping_pairs_match_brute_force(scene):
+    _, bounds, index = scene
+    pairs = brute_force_pairs(bounds)
+    assert index.overlapping_pairs() == pairs
+    for key in bounds:
+        assert index.overlapping(key) == sorted({b for a, b in pairs if a == key} | {a for a, b in pairs if b == key})
+
+
+def test_sync_only_touches_changed_zones(scene):
+    rng, bounds, index = scene
+    bounds = dict(bounds)
+    moved = next(iter(bounds))
+    removed = list(bounds)[-1]
+    bounds[moved] = ((0.0, 0.0, 0.0), (5.0, 5.0, 5.0))
+    del bounds[removed]
+    bounds[1000] = ((-2.0, -2.0, -2.0), (1.0, 1.0, 1.0))
+
+    assert index.sync(bounds) == {moved, removed, 1000}
+    assert index.sync(bounds) == set()
+    assert index.overlapping_pairs() == brute_force_pairs(bounds)
+    for point in rng.uniform(-130, 230, (200, 3)).tolist():
+        assert index.query_point(point) == sorted(key for key, box in bounds.items() if box_contains(box, point))
+
+
+def test_touching_zones_do_not_overlap():
+    index = ZoneIndex()
+    index.sync(zone_bounds([PlainZone(0, (0, 0, 0), (4, 4, 4)), PlainZone(1, (4, 0, 0), (8, 4, 4))]))
+    assert index.overlapping_pairs() == []
+    assert index.query_point((4, 2, 2)) == [0, 1]
+
+
+def test_empty_index():
+    assert ZoneIndex().nearest((0, 0, 0)) is None
@@ -0,0 +1,88 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.benchmark import synthetic_probe_faces  # noqa: E402
+
+# Sources of the texconv parity tests, and the script writing their references with the add-on's
+# own texconv.exe, called the way the original TIFF pipeline called it. texconv only runs on
+# Windows; from the add-on folder:
+#     python tests/texconv_references.py
+# writes the source TIFFs and the texconv DDS files into tests/data/texconv, to be committed.
+
+ADDON = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXCONV = os.path.join(ADDON, "[CONVERTER]", "texconv.exe")
+DATA = os.path.join(ADDON, "tests", "data", "texconv")
+
+VOLUME_SOURCE = "volume_source.tiff"
+VOLUME_REFERENCE = "volume_r11g11b10.dds"
+FACE_NAMES = ["x-", "x+", "y-", "y+", "z-", "z+"]
+FACE_SOURCES = [f"face_{name}.tiff" for name in FACE_NAMES]
+FACE_REFERENCES = [f"face_{name}_bc3.dds" for name in FACE_NAMES]
+
+
+def data_path(name):
+    return os.path.join(DATA, name)
+
+
+def volume_source():
+    # (4, 4, 8, 3) AMV volume: probe colors over the whole exponent range up to past the format
+    # maximum, plus negatives, zeros and a value below the blue flush threshold in the last column.
+    values = np.geomspace(1e-6, 7e4, 4 * 4 * 8 * 3).astype(np.float32).reshape(4, 4, 8, 3)
+    values[..., -1, :] = [-1.0, 0.0, 1e-30]
+    return values
+
+
+def face_sources():
+    # Six 64x64 probe-like RGBA faces in the uint16 units of the bake's TIFFs.
+    return np.rint(synthetic_probe_faces(64, seed=0) * (65535.0 / 255.0)).astype(np.uint16)
+
+
+def read_tiff(path):
+    import tifffile
+    return tifffile.imread(path)
+
+
+def write_tiff(path, array):
+    import tifffile
+    # Same call as the original bake: one float32 RGB page per z-slice.
+    tifffile.imwrite(path, array)
+
+
+def run_texconv(source, reference, *args):
+    with tempfile.TemporaryDirectory() as folder:
+        subprocess.run([TEXCONV, *args, "-y", "-m", "1", "-o", folder, source], check=True)
+        produced = os.path.join(folder, os.path.splitext(os.path.basename(source))[0] + ".dds")
+        shutil.move(produced, reference)
+
+
+def write_sources():
+    os.makedirs(DATA, exist_ok=True)
+    write_tiff(data_path(VOLUME_SOURCE), volume_source())
+    for name, face in zip(FACE_SOURCES, face_sources()):
+        write_tiff(data_path(name), face)
+
+
+def write_references():
+    run_texconv(data_path(VOLUME_SOURCE), data_path(VOLUME_REFERENCE), "-f", "R11G11B10_FLOAT")
+    # One DDS per face: texconv only reads the first page of a multi-page TIFF.
+    for source, reference in zip(FACE_SOURCES, FACE_REFERENCES):
+        run_texconv(data_path(source), data_path(reference), "-f", "BC3_UNORM")
+
+
+def main():
+    write_sources()
+    if sys.platform != "win32":
+        print("Sources written; texconv.exe only runs on Windows, the references were not updated.")
+        return 1
+    write_references()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,8 @@
 import bpy
-import numpy as np
+import addon_utils
 from mathutils import Vector, Quaternion
 
 
-def bbox_center(min_coords, max_coords):
-    center = np.array(min_coords) + np.array(max_coords)
-    center /= 2
-    return center
-
-def rotate_point_around_center(point, center, angle):
-    rotation_matrix = np.array([[np.cos(angle), -np.sin(angle)],
-                                [np.sin(angle), np.cos(angle)]])
-    translated_point = point - center
-    rotated_point = np.dot(rotation_matrix, translated_point)
-    return rotated_point + center
-
-def rotate_bbox(bbox, center, angle):
-    rotated_bbox = []
-    for point in bbox:
-        rotated_point = point.copy()
-        rotated_point[0], rotated_point[1] = rotate_point_around_center(point[:2], center[:2], angle)[:2]
-        rotated_bbox.append(rotated_point)
-    return np.array(rotated_bbox)
-
-def bbox_dimensions(bbox):
-    min_coords = np.min(bbox, axis=0)
-    max_coords = np.max(bbox, axis=0)
-    return (max_coords - min_coords) / 2
-
-
-def calculate_sphere_counts(interval, min_bound, max_bound):
-    for i in range(3):
-        if min_bound[i] > max_bound[i]:
-            min_bound[i], max_bound[i] = max_bound[i], min_bound[i]
-    num_spheres = [round((max_bound[i] - min_bound[i]) / interval) for i in range(3)]
-    return tuple(num_spheres)
-
-
 def setup_bake_settings():
     scene = bpy.context.scene
     scene.render.engine = 'CYCLES'
@@ -66,76 +32,27 @@ def setup_bake_settings():
     scene.cycles.device = 'CPU'
 
 
+def ensure_addon_enabled():
+    # Background Blender processes (batch bakes, bake shards) need the add-on registered before
+    # the scene's zone properties exist.
+    if not addon_utils.check(__package__)[1]:
+        addon_utils.enable(__package__, default_set=False)
+
+
+def update_bake_progress(scene, current, total):
+    scene.proggress = f"{total}/{current}"
+    if bpy.app.background:
+        # No UI to refresh, and carriage returns only clutter batch logs.
+        print(f"{current}/{total} spheres created")
+    else:
+        print(f"{current}/{total} spheres created", end='\r')
+        bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
+
+
 def update_light_strength(self, context):
     if "Emission" in bpy.data.worlds["World"].node_tree.nodes:
         bpy.data.worlds["World"].node_tree.nodes["Emission"].inputs[1].default_value = self.light_strength
 
-def rot(x, k):
-    return ((x << k) & 0xFFFFFFFF) | (x >> (32 - k))
-
-def mix(a, b, c):
-    a = (a - c) & 0xFFFFFFFF; a ^= rot(c, 4); c = (c + b) & 0xFFFFFFFF
-    b = (b - a) & 0xFFFFFFFF; b ^= rot(a, 6); a = (a + c) & 0xFFFFFFFF
-    c = (c - b) & 0xFFFFFFFF; c ^= rot(b, 8); b = (b + a) & 0xFFFFFFFF
-    a = (a - c) & 0xFFFFFFFF; a ^= rot(c, 16); c = (c + b) & 0xFFFFFFFF
-    b = (b - a) & 0xFFFFFFFF; b ^= rot(a, 19); a = (a + c) & 0xFFFFFFFF
-    c = (c - b) & 0xFFFFFFFF; c ^= rot(b, 4); b = (b + a) & 0xFFFFFFFF
-    return a, b, c
-
-def final(a, b, c):
-    c ^= b; c = (c - rot(b, 14)) & 0xFFFFFFFF
-    a ^= c; a = (a - rot(c, 11)) & 0xFFFFFFFF
-    b ^= a; b = (b - rot(a, 25)) & 0xFFFFFFFF
-    c ^= b; c = (c - rot(b, 16)) & 0xFFFFFFFF
-    a ^= c; a = (a - rot(c, 4)) & 0xFFFFFFFF
-    b ^= a; b = (b - rot(a, 14)) & 0xFFFFFFFF
-    c ^= b; c = (c - rot(b, 24)) & 0xFFFFFFFF
-    return a, b, c
-
-def compute_probe_hash(k, initval = 0):
-    length = len(k)
-    a = b = c = (0xdeadbeef + (length << 2) + initval) & 0xFFFFFFFF
-
-    while length > 3:
-        a = (a + k[0]) & 0xFFFFFFFF
-        b = (b + k[1]) & 0xFFFFFFFF
-        c = (c + k[2]) & 0xFFFFFFFF
-        a, b, c = mix(a, b, c)
-        length -= 3
-        k = k[3:]
-
-    if length == 3:
-        c = (c + k[2]) & 0xFFFFFFFF
-    if length >= 2:
-        b = (b + k[1]) & 0xFFFFFFFF
-    if length >= 1:
-        a = (a + k[0]) & 0xFFFFFFFF
-        a, b, c = final(a, b, c)
-
-    return c
-
-def gen_hash(text):
-    if text is None:
-        return 0
-    h = 0
-    for char in text:
-        h += ord(char)
-        h &= 0xFFFFFFFF
-        h += (h << 10)
-        h &= 0xFFFFFFFF
-        h ^= (h >> 6)
-        h &= 0xFFFFFFFF
-    
-    h += (h << 3)
-    h &= 0xFFFFFFFF
-    h ^= (h >> 11)
-    h &= 0xFFFFFFFF
-    h += (h << 15)
-    h &= 0xFFFFFFFF
-
-    return h & 0xFFFFFFFF
-
-
 ######################################################
 ################ SOLLUMZ CODE <3 <3 ###################
 ######################################################